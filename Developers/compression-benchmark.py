@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+#
+# Copyright (c) 2018, Riverbank Computing Limited
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import argparse
+import marshal
+import os
+import sys
+import time
+import zlib
+
+
+def error(message, error_code=1):
+    """ Display an error message and quit. """
+
+    sys.stderr.write(
+            "{0}: {1}.\n".format(os.path.basename(sys.argv[0]), message))
+
+    sys.exit(error_code)
+
+
+def progress(message):
+    """ Display a progress message. """
+
+    sys.stdout.write(message + "...\n")
+
+
+def freeze_modules(source_dir, optimize):
+    """ Return the list of marshalled code objects of the Python source files
+    in a directory in the same way that pyqtdeploy-build freezes them.
+    """
+
+    modules = []
+
+    for dir_path, _, file_names in os.walk(source_dir):
+        for file_name in file_names:
+            if not file_name.endswith('.py'):
+                continue
+
+            py_file_name = os.path.join(dir_path, file_name)
+
+            with open(py_file_name, 'rb') as f:
+                source = f.read()
+
+            try:
+                co = compile(source,
+                        os.path.relpath(py_file_name, source_dir), 'exec',
+                        optimize=optimize)
+            except (SyntaxError, ValueError):
+                # Ignore test files that are deliberately invalid.
+                continue
+
+            modules.append(marshal.dumps(co))
+
+    return modules
+
+
+def time_per_module(func, modules, repeat):
+    """ Return the mean time in microseconds taken to call a function for each
+    module.
+    """
+
+    best = None
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+
+        for module in modules:
+            func(module)
+
+        elapsed = time.perf_counter() - start
+
+        if best is None or elapsed < best:
+            best = elapsed
+
+    return best * 1000000 / len(modules)
+
+
+# Parse the command line.
+parser = argparse.ArgumentParser(
+        description="Measure the trade off between the size of frozen Python "
+                "modules and the time taken to import them at each level of "
+                "compression supported by pyqtdeploy-build.")
+parser.add_argument('--opt',
+        help="the optimisation level used to compile the modules [default: 2]",
+        metavar="LEVEL", type=int, choices=range(3), default=2)
+parser.add_argument('--repeat',
+        help="the number of times each timing is repeated [default: 5]",
+        metavar="N", type=int, default=5)
+parser.add_argument('source_dir',
+        help="the directory containing the Python source files [default: "
+                "the host standard library]",
+        nargs='?', default=os.path.dirname(os.__file__))
+
+args = parser.parse_args()
+
+if args.repeat < 1:
+    error("the number of repeats must be at least 1")
+
+if not os.path.isdir(args.source_dir):
+    error("{0} is not a directory".format(args.source_dir))
+
+progress("Freezing the modules in {0}".format(args.source_dir))
+modules = freeze_modules(args.source_dir, args.opt)
+
+if len(modules) == 0:
+    error("{0} does not contain any Python source files".format(
+            args.source_dir))
+
+total_size = sum([len(m) for m in modules])
+
+# Unmarshalling is always done and is the baseline for the import latency.
+progress("Timing unmarshalling {0} modules".format(len(modules)))
+unmarshal_us = time_per_module(marshal.loads, modules, args.repeat)
+
+print()
+print("Level  Size (KB)  Ratio  Compress (us)  Uncompress (us)  Import (us)")
+print("{0:5}  {1:9}  {2:5.2f}  {3:13.1f}  {4:15.1f}  {5:11.1f}".format(0,
+        total_size // 1024, 1.0, 0.0, 0.0, unmarshal_us))
+
+for level in range(1, 10):
+    # A module is only stored compressed if it gets smaller.  The extra 4
+    # bytes are the uncompressed size added by qCompress().
+    compressed = []
+    stored = []
+
+    for module in modules:
+        data = zlib.compress(module, level)
+
+        if len(data) + 4 < len(module):
+            compressed.append(data)
+        else:
+            stored.append(module)
+
+    size = sum([len(c) + 4 for c in compressed]) + sum(
+            [len(s) for s in stored])
+
+    compress_us = time_per_module(lambda m: zlib.compress(m, level), modules,
+            args.repeat)
+
+    if compressed:
+        uncompress_us = time_per_module(zlib.decompress, compressed,
+                args.repeat) * len(compressed) / len(modules)
+    else:
+        uncompress_us = 0.0
+
+    print("{0:5}  {1:9}  {2:5.2f}  {3:13.1f}  {4:15.1f}  {5:11.1f}".format(
+            level, size // 1024, total_size / size, compress_us,
+            uncompress_us, unmarshal_us + uncompress_us))
@@ -25,7 +25,7 @@
 
 
 # Publish the package's API.  These are for the tools.
-from .builder import Builder
+from .builder import Builder, BuildOptions
 from .message_handler import MessageHandler
 from .project import Project
 from .sysroot import Sysroot
@@ -25,4 +25,5 @@
 
 
 # Publish the sub-package's API.
+from .build_options import BuildOptions
 from .builder import Builder
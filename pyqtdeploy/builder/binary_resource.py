@@ -0,0 +1,154 @@
+# Copyright (c) 2017, Riverbank Computing Limited
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import struct
+import zlib
+
+
+# The flags of a node of the resource tree.
+_COMPRESSED = 0x01
+_DIRECTORY = 0x02
+
+# The language and country of every file (QLocale::C and QLocale::AnyCountry).
+_LANGUAGE_C = 1
+_ANY_COUNTRY = 0
+
+
+def write_binary_resource(file_name, contents):
+    """ Write a Qt binary resource file (in version 1 of the format written by
+    rcc -binary) and return its contents.  contents is a sequence of 3-tuples
+    of the name of a file in the resource (using '/' as the separator), the
+    file's data and a 2-tuple of the zlib compression level (-1 meaning the
+    default) and the minimum percentage reduction in size for the compressed
+    data to be used, or None if the file is never compressed.
+    """
+
+    # Build the tree of directories.  A directory is a dict and a file is a
+    # 2-tuple of its data and compression.
+    root = {}
+
+    for name, data, compression in contents:
+        parts = name.split('/')
+        directory = root
+
+        for part in parts[:-1]:
+            directory = directory.setdefault(part, {})
+
+        directory[parts[-1]] = (data, compression)
+
+    names = bytearray()
+    name_offsets = {}
+    payload = bytearray()
+
+    def name_offset(name):
+        """ Return the offset of a name in the names section. """
+
+        offset = name_offsets.get(name)
+
+        if offset is None:
+            offset = name_offsets[name] = len(names)
+
+            encoded = name.encode('utf-16-be')
+            names.extend(struct.pack('>HI', len(encoded) // 2, qt_hash(name)))
+            names.extend(encoded)
+
+        return offset
+
+    # The nodes are written breadth first with the children of a directory
+    # being contiguous and sorted by the hash of their names.  The root node
+    # is always first.
+    tree = bytearray()
+    queue = [(None, root)]
+    nr_nodes = 1
+
+    while queue:
+        name, node = queue.pop(0)
+
+        offset = 0 if name is None else name_offset(name)
+
+        if isinstance(node, dict):
+            children = sorted(node.items(), key=lambda c: qt_hash(c[0]))
+
+            tree.extend(
+                    struct.pack('>IHII', offset, _DIRECTORY, len(children),
+                            nr_nodes))
+
+            queue.extend(children)
+            nr_nodes += len(children)
+        else:
+            data, compression = node
+            flags = 0
+
+            if compression is not None and len(data) != 0:
+                level, threshold = compression
+                compressed = struct.pack('>I', len(data)) + zlib.compress(data,
+                        level)
+
+                saving = len(data) - len(compressed)
+
+                if 100 * saving >= threshold * len(data):
+                    data = compressed
+                    flags |= _COMPRESSED
+
+            tree.extend(
+                    struct.pack('>IHHHI', offset, flags, _ANY_COUNTRY,
+                            _LANGUAGE_C, len(payload)))
+
+            payload.extend(struct.pack('>I', len(data)))
+            payload.extend(data)
+
+    # The header is followed by the payload, the names and the tree.
+    header_size = 20
+    payload_offset = header_size
+    names_offset = payload_offset + len(payload)
+    tree_offset = names_offset + len(names)
+
+    resource = bytearray(b'qres')
+    resource.extend(
+            struct.pack('>IIII', 1, tree_offset, payload_offset,
+                    names_offset))
+    resource.extend(payload)
+    resource.extend(names)
+    resource.extend(tree)
+
+    with open(file_name, 'wb') as f:
+        f.write(resource)
+
+    return bytes(resource)
+
+
+def qt_hash(name):
+    """ Return the hash of a name in the same way as Qt's qt_hash(). """
+
+    h = 0
+    encoded = name.encode('utf-16-be')
+
+    for i in range(0, len(encoded), 2):
+        h = ((h << 4) + ((encoded[i] << 8) | encoded[i + 1])) & 0xffffffff
+        h ^= (h & 0xf0000000) >> 23
+        h &= 0x0fffffff
+
+    return h
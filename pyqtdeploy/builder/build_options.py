@@ -0,0 +1,84 @@
+# Copyright (c) 2017, Riverbank Computing Limited
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+class BuildOptions:
+    """ Encapsulate the optional behaviour of a build. """
+
+    def __init__(self):
+        """ Initialise the object. """
+
+        # The number of files to freeze concurrently, None meaning one per
+        # CPU.
+        self.jobs = None
+
+        # The name of the directory containing the cache of frozen code, None
+        # meaning no cache is used.
+        self.cache_dir = None
+
+        # The maximum size of the cache in megabytes, None meaning the default.
+        self.cache_size = None
+
+        # Set if only those files in the build directory whose contents have
+        # changed are updated and any files left over from a previous
+        # incremental build are removed.  The build directory cannot also be
+        # cleaned.
+        self.incremental = False
+
+        # Set if all frozen Python modules are placed in a single packed
+        # archive rather than being individual resources.
+        self.packed = False
+
+        # Set if the application records the time taken to import each module
+        # and writes a report when it exits.
+        self.profile_imports = False
+
+        # Set if the standard library and PyQt modules specified in the project
+        # are replaced by those found by analysing the imports of the
+        # application.
+        self.auto_stdlib = False
+
+        # The name of a file containing a report produced by the import
+        # profiler (or by Python's -X importtime option).  Any standard library
+        # module that is only implicitly required and was not imported is
+        # omitted.
+        self.import_trace = None
+
+        # The optional sequence of things ('docstrings', 'filenames' or
+        # 'lines') to strip from the frozen Python code.
+        self.strip = None
+
+        # The zlib compression level (0 to 9) used for the frozen Python code,
+        # None meaning that rcc decides.
+        self.compress = None
+
+        # Set if the files written to the build directory are always the same
+        # for the same inputs and a manifest of their hashes is written.
+        self.reproducible = False
+
+        # Set if a single binary resource is written and linked directly into
+        # the application rather than .qrc files that are converted to C++ by
+        # rcc.
+        self.binary_resource = False
@@ -25,24 +25,34 @@
 
 
 import csv
+import filecmp
 import glob
+import hashlib
+import json
 import os
 import shlex
 import shutil
+import struct
+import zlib
 
-from PyQt5.QtCore import (QByteArray, QCoreApplication, QDir, QFile,
-        QFileDevice, QFileInfo, QProcess, QTemporaryDir, QTextCodec)
+from PyQt5.QtCore import (QCoreApplication, QDir, QFile,
+        QFileDevice, QFileInfo, QProcess, QProcessEnvironment, QTemporaryDir,
+        QTextCodec)
 
 from ..file_utilities import (create_file, get_embedded_dir,
         get_embedded_file_for_version, read_embedded_file)
 from ..metadata import (external_libraries_metadata, get_python_metadata,
         pyqt4_metadata, pyqt5_metadata)
-from ..project import QrcDirectory
+from ..project import QrcDirectory, analyse_imports
+from ..project.import_analyser import _INTERPRETER_MODULES
 from ..platforms import Architecture, Platform
 from ..user_exception import UserException
 from ..version import PYQTDEPLOY_HEXVERSION
 from ..windows import get_py_install_path
 
+from .binary_resource import write_binary_resource
+from .build_options import BuildOptions
+
 
 class Builder:
     """ The builder for a project. """
@@ -53,14 +63,24 @@ class Builder:
         self._project = project
         self._message_handler = message_handler
 
+        # The commands that have been started and not yet waited for.
+        self._processes = []
+
         self._host = Architecture.architecture()
         self._target = Architecture.architecture(target_arch_name)
 
-    def build(self, opt, nr_resources, clean, sysroot, build_dir, include_dir, interpreter, python_library, source_dir, standard_library_dir):
-        """ Build the project in a given directory.  Raise a UserException if
-        there is an error.
+    def build(self, opt, nr_resources, clean, sysroot, build_dir,
+            include_dir, interpreter, python_library, source_dir,
+            standard_library_dir, options=None):
+        """ Build the project in a given directory.  nr_resources is the number
+        of .qrc files to generate, 0 meaning it is chosen automatically.
+        options is an optional BuildOptions instance describing any other
+        behaviour of the build.  Raise a UserException if there is an error.
         """
 
+        if options is None:
+            options = BuildOptions()
+
         project = self._project
 
         py_major, py_minor, py_patch = project.python_target_version
@@ -81,6 +101,11 @@ class Builder:
             raise UserException(
                     "There was an error creating a temporary directory")
 
+        # Find the required standard library and PyQt modules if requested.
+        if options.auto_stdlib:
+            with self._message_handler.phase("analyse imports"):
+                self._analyse_imports(options.jobs)
+
         # Get the names of the required Python modules, extension modules and
         # libraries.
         metadata = get_python_metadata(project.python_target_version)
@@ -100,6 +125,11 @@ class Builder:
             elif not module.core:
                 required_ext[name] = module
 
+        # Omit any modules that weren't imported when the application was run.
+        if options.import_trace is not None:
+            self._prune_modules(required_py, required_modules,
+                    options.import_trace)
+
         # Initialise and check we have the information we need.
         if len(required_ext) != 0:
             if source_dir is None:
@@ -156,16 +186,29 @@ class Builder:
 
         self._build_dir = os.path.abspath(build_dir)
 
+        if clean and options.incremental:
+            raise UserException(
+                    "An incremental build cannot clean the build directory")
+
         # Remove any build directory if required.
         if clean:
             native_build_dir = QDir.toNativeSeparators(self._build_dir)
             self._message_handler.progress_message(
                     "Cleaning {0}".format(native_build_dir))
-            shutil.rmtree(native_build_dir, ignore_errors=True)
+
+            with self._message_handler.phase("clean"):
+                shutil.rmtree(native_build_dir, ignore_errors=True)
 
         # Now start the build.
         self._create_directory(self._build_dir)
 
+        # An incremental build is done in a staging directory that is then
+        # used to update the real build directory.
+        if options.incremental:
+            final_build_dir = self._build_dir
+            self._build_dir = temp_dir.path() + '/build'
+            self._create_directory(self._build_dir)
+
         # Create the job file and writer.
         job_filename = QDir.toNativeSeparators(temp_dir.path() + '/jobs.csv')
         job_file = open(job_filename, 'w', newline='')
@@ -176,12 +219,13 @@ class Builder:
         # original source.  We continue to use a local copy of _bootstrap.py
         # as it still needs to be frozen and we don't want to depend on an
         # external source.
-        self._freeze_bootstrap('bootstrap', py_version, self._build_dir,
-                temp_dir, job_writer)
+        with self._message_handler.phase("bootstrap", self._build_dir):
+            self._freeze_bootstrap('bootstrap', py_version, self._build_dir,
+                    temp_dir, job_writer)
 
-        if py_version >= 0x030500:
-            self._freeze_bootstrap('bootstrap_external', py_version,
-                    self._build_dir, temp_dir, job_writer)
+            if py_version >= 0x030500:
+                self._freeze_bootstrap('bootstrap_external', py_version,
+                        self._build_dir, temp_dir, job_writer)
 
         # Freeze any main application script.
         if project.application_script != '':
@@ -198,14 +242,13 @@ class Builder:
         version_f.close()
 
         # Generate the application resource.
-        resource_names = self._generate_resource(
-                self._build_dir + '/resources', required_py,
-                standard_library_dir, job_writer, nr_resources)
+        resources_dir = self._build_dir + '/resources'
 
-        # Write the .pro file.
-        self._write_qmake(py_version, required_ext, required_libraries,
-                include_dir, python_library, standard_library_dir, source_dir,
-                job_writer, opt, resource_names)
+        with self._message_handler.phase("generate resources",
+                self._build_dir):
+            resource_contents, packed_modules = self._generate_resource(
+                    resources_dir, required_py, standard_library_dir,
+                    job_writer, options.packed)
 
         # Run the freeze jobs.
         job_file.close()
@@ -215,7 +258,194 @@ class Builder:
         freeze = self._copy_lib_file(self._get_lib_file_name('freeze.python'),
                 temp_dir.path(), dst_file_name='freeze.py')
 
-        self._run_freeze(freeze, interpreter, job_filename, opt)
+        with self._message_handler.phase("freeze", self._build_dir):
+            self._run_freeze(freeze, interpreter, job_filename, opt, options)
+
+        if options.packed:
+            with self._message_handler.phase("write packed archive",
+                    self._build_dir):
+                self._write_packed_archive(resources_dir, packed_modules,
+                        options.compress)
+
+        # The .qrc files are written when the sizes of all their contents are
+        # known.
+        if options.binary_resource:
+            with self._message_handler.phase("write binary resource",
+                    self._build_dir):
+                self._write_binary_resource(resources_dir, resource_contents,
+                        options.compress)
+
+            resource_names = []
+        else:
+            with self._message_handler.phase("write .qrc", self._build_dir):
+                resource_names = self._write_resources(resources_dir,
+                        resource_contents, nr_resources, options.compress)
+
+        # Write the .pro file.
+        with self._message_handler.phase("write .pro", self._build_dir):
+            self._write_qmake(py_version, required_ext, required_libraries,
+                    include_dir, python_library, standard_library_dir,
+                    source_dir, job_writer, opt, resource_names, options)
+
+        if options.incremental:
+            with self._message_handler.phase("update build directory",
+                    final_build_dir):
+                self._update_build_dir(self._build_dir, final_build_dir)
+
+            self._build_dir = final_build_dir
+        elif options.reproducible:
+            build_dir = QDir.toNativeSeparators(self._build_dir)
+
+            with self._message_handler.phase("write manifest", build_dir):
+                self._write_manifest(build_dir, build_dir,
+                        self._get_build_files(build_dir))
+
+    # The name of the file in the build directory containing the names and
+    # SHA-256 hashes of the files created by the last incremental or
+    # reproducible build.
+    _manifest_file_name = 'pyqtdeploy.manifest'
+
+    def _get_build_files(self, build_dir):
+        """ Return the sorted list of the names of the files in a build
+        directory relative to the directory, excluding any manifest.
+        """
+
+        build_files = []
+
+        for dir_path, _, file_names in os.walk(build_dir):
+            rel_dir = os.path.relpath(dir_path, build_dir)
+
+            for file_name in file_names:
+                if rel_dir != '.':
+                    file_name = os.path.join(rel_dir, file_name)
+                elif file_name == self._manifest_file_name:
+                    continue
+
+                build_files.append(file_name.replace(os.sep, '/'))
+
+        build_files.sort()
+
+        return build_files
+
+    def _write_manifest(self, build_dir, src_dir, build_files):
+        """ Write the manifest of a build directory.  Each line contains the
+        SHA-256 hash of a file (read from a source directory) and its name in
+        the same format as sha256sum.
+        """
+
+        manifest = os.path.join(build_dir, self._manifest_file_name)
+
+        # sha256sum expects '\n' line endings on every platform.
+        try:
+            f = open(manifest, 'wt', encoding='UTF-8', newline='\n')
+        except Exception as e:
+            raise UserException("Unable to create file {0}".format(manifest),
+                    str(e))
+
+        with f:
+            for file_name in build_files:
+                hasher = hashlib.sha256()
+
+                with open(os.path.join(src_dir, file_name), 'rb') as bf:
+                    for chunk in iter(lambda: bf.read(65536), b''):
+                        hasher.update(chunk)
+
+                f.write('{0}  {1}\n'.format(hasher.hexdigest(), file_name))
+
+    @staticmethod
+    def _read_manifest_names(manifest):
+        """ Return the set of file names in a manifest which may have been
+        written by an earlier version that didn't include hashes.
+        """
+
+        try:
+            with open(manifest) as f:
+                lines = f.read().split('\n')
+        except FileNotFoundError:
+            return set()
+
+        names = set()
+
+        for line in lines:
+            if len(line) > 66 and line[64:66] == '  ':
+                line = line[66:]
+
+            if line:
+                names.add(line)
+
+        return names
+
+    def _update_build_dir(self, staging_dir, build_dir):
+        """ Update a build directory from a staging directory so that only
+        those files that have changed are replaced and any stale files are
+        removed.
+        """
+
+        staging_dir = QDir.toNativeSeparators(staging_dir)
+        build_dir = QDir.toNativeSeparators(build_dir)
+
+        # Get the names of the files created relative to the staging directory.
+        produced = self._get_build_files(staging_dir)
+
+        # Replace those files that have changed.
+        nr_updated = 0
+
+        for file_name in produced:
+            src_file = os.path.join(staging_dir, file_name)
+            dst_file = os.path.join(build_dir, file_name)
+
+            if os.path.isfile(dst_file) and filecmp.cmp(src_file, dst_file,
+                    shallow=False):
+                continue
+
+            self._message_handler.verbose_message(
+                    "Updating {0}".format(dst_file))
+
+            try:
+                os.makedirs(os.path.dirname(dst_file), exist_ok=True)
+                shutil.copyfile(src_file, dst_file)
+            except Exception as e:
+                raise UserException("Unable to update {0}".format(dst_file),
+                        str(e))
+
+            nr_updated += 1
+
+        # Remove any files created by the previous build but not by this one.
+        stale = self._read_manifest_names(
+                os.path.join(build_dir, self._manifest_file_name))
+        stale.difference_update(produced)
+
+        for file_name in sorted(stale):
+            stale_file = os.path.join(build_dir, file_name)
+
+            self._message_handler.verbose_message(
+                    "Removing stale file {0}".format(stale_file))
+
+            try:
+                os.remove(stale_file)
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                raise UserException("Unable to remove {0}".format(stale_file),
+                        str(e))
+
+            # Remove any directories that are now empty.
+            stale_dir = os.path.dirname(stale_file)
+
+            while stale_dir != build_dir:
+                try:
+                    os.rmdir(stale_dir)
+                except OSError:
+                    break
+
+                stale_dir = os.path.dirname(stale_dir)
+
+        # Record what this build created.
+        self._write_manifest(build_dir, staging_dir, produced)
+
+        self._message_handler.progress_message(
+                "{0} of {1} files in {2} were updated".format(nr_updated,
+                        len(produced), build_dir))
 
     def _freeze_bootstrap(self, name, py_version, build_dir, temp_dir, job_writer):
         """ Freeze a version dependent bootstrap script. """
@@ -227,8 +457,12 @@ class Builder:
         self._freeze(job_writer, build_dir + '/frozen_' + name + '.h',
                 bootstrap, 'pyqtdeploy_' + name, as_c=True)
 
-    def _generate_resource(self, resources_dir, required_py, standard_library_dir, job_writer, nr_resources):
-        """ Generate the application resource. """
+    def _generate_resource(self, resources_dir, required_py,
+            standard_library_dir, job_writer, packed):
+        """ Generate the application resource and return a 2-tuple of the
+        sorted list of the contents of the resource and the list of frozen
+        modules that will be placed in the packed archive.
+        """
 
         project = self._project
 
@@ -298,35 +532,523 @@ class Builder:
                         QDir.toNativeSeparators(pyqt_dst_dir + '/uic'),
                         copy_function=copy_freeze)
 
-        # Write the .qrc files.
-        if nr_resources == 1:
-            resource_names = [self._write_resource(resources_dir,
-                    resource_contents)]
+        # Sort the contents for reproduceable output as the order in which
+        # directories are walked depends on the file system.
+        resource_contents.sort()
+
+        # Write the index of the modules in the resource.
+        self._write_module_index(resource_contents)
+
+        # Replace the frozen modules with the packed archive if required.
+        if packed:
+            packed_modules = [c for c in resource_contents
+                    if c.endswith('.pyo')]
+            resource_contents = [self._packed_archive_name] + [
+                    c for c in resource_contents if not c.endswith('.pyo')]
         else:
-            resource_names = []
+            packed_modules = []
+
+        return resource_contents, packed_modules
+
+    # The minimum size of the contents of a resource when the number of
+    # resources is chosen automatically.
+    _min_resource_size = 1024 * 1024
+
+    def _write_resources(self, resources_dir, resource_contents, nr_resources,
+            compress):
+        """ Write the .qrc files and return the list of their names.  The
+        contents are split between nr_resources files (0 meaning the number is
+        chosen according to the total size of the contents and the number of
+        CPUs) so that each has roughly the same total size and each file's
+        contents are contiguous (so that the contents of a package tend to be
+        in the same resource).  compress is the compression level of the
+        frozen modules.
+        """
 
-            nr_files = len(resource_contents)
+        sizes = [os.path.getsize(os.path.join(resources_dir, c))
+                for c in resource_contents]
+        total_size = sum(sizes)
 
-            if nr_resources > nr_files:
-                nr_resources = nr_files
+        if nr_resources == 0:
+            min_size = self._min_resource_size
+            nr_resources = min(os.cpu_count() or 1,
+                    (total_size + min_size - 1) // min_size)
 
-            per_resource = (nr_files + nr_resources - 1) // nr_resources
-            start = 0
+        nr_resources = max(1, min(nr_resources, len(resource_contents)))
 
-            for r in range(nr_resources):
-                end = start + per_resource
-                if end > nr_files:
-                    end = nr_files
+        if nr_resources == 1:
+            return [self._write_resource(resources_dir, resource_contents,
+                    compress)]
 
+        # Each content goes in the resource containing the mid-point of its
+        # share of the total size.  This means that no resource is larger than
+        # its share by more than the size of a single content.
+        shards = [[] for _ in range(nr_resources)]
+        offset = 0
+
+        for content, size in zip(resource_contents, sizes):
+            shard = ((offset + size // 2) * nr_resources) // max(total_size, 1)
+            shards[min(shard, nr_resources - 1)].append(content)
+            offset += size
+
+        resource_names = []
+
+        for shard in shards:
+            if shard:
                 resource_names.append(
-                        self._write_resource(resources_dir,
-                                resource_contents[start:end], r))
-                start += per_resource
+                        self._write_resource(resources_dir, shard, compress,
+                                len(resource_names)))
+
+        self._message_handler.verbose_message(
+                "Split {0} bytes between {1} resources".format(total_size,
+                        len(resource_names)))
 
         return resource_names
 
-    def _write_resource(self, resources_dir, resource_contents, nr=-1):
-        """ Write a single resource file and return its basename. """
+    # The kinds of entry in the module index.  Where a name is of more than
+    # one kind the largest takes precedence.
+    _index_namespace = 1
+    _index_package = 2
+    _index_module = 3
+
+    def _analyse_imports(self, jobs):
+        """ Update the project's standard library and PyQt modules from those
+        imported by the application.
+        """
+
+        project = self._project
+
+        self._message_handler.progress_message(
+                "Analysing the imports of the application")
+
+        standard_library, pyqt_modules, missing = analyse_imports(project,
+                jobs=jobs)
+
+        project.standard_library = standard_library
+        project.pyqt_modules = pyqt_modules
+
+        self._message_handler.verbose_message(
+                "Found standard library modules: {0}".format(
+                        ' '.join(standard_library)))
+        self._message_handler.verbose_message(
+                "Found PyQt modules: {0}".format(' '.join(pyqt_modules)))
+
+        if missing:
+            self._message_handler.progress_message(
+                    "Imported modules that will not be embedded: {0}".format(
+                            ' '.join(missing)))
+
+    def _prune_modules(self, required_py, required_modules, import_trace):
+        """ Remove the standard library modules that are only implicitly
+        required and were not imported according to an import trace.
+        """
+
+        imported = self._read_import_trace(import_trace)
+
+        pruned = {}
+
+        for name, module in list(required_py.items()):
+            # Never omit anything the interpreter itself needs, anything the
+            # user asked for or anything we can't match against the trace.
+            if module.core or name.split('.')[0] in _INTERPRETER_MODULES:
+                continue
+
+            if required_modules[name] or '*' in name:
+                continue
+
+            if name not in imported:
+                pruned[name] = module
+                del required_py[name]
+
+        # Make sure the parent packages of any remaining modules are kept.
+        for name in list(required_py.keys()):
+            parts = name.split('.')
+
+            for i in range(1, len(parts)):
+                parent = '.'.join(parts[:i])
+
+                if parent in pruned:
+                    required_py[parent] = pruned.pop(parent)
+
+        self._message_handler.progress_message(
+                "Omitting {0} standard library modules that were not "
+                "imported".format(len(pruned)))
+
+        for name in sorted(pruned):
+            self._message_handler.verbose_message(
+                    "Omitting {0}".format(name))
+
+    @staticmethod
+    def _read_import_trace(import_trace):
+        """ Return the set of the names of the modules imported according to an
+        import trace.
+        """
+
+        try:
+            with open(import_trace) as f:
+                trace = f.read()
+        except Exception as e:
+            raise UserException(
+                    "unable to read the import trace {0}".format(import_trace),
+                    str(e))
+
+        imported = set()
+
+        if import_trace.endswith('.json'):
+            try:
+                for entry in json.loads(trace):
+                    imported.add(entry['module'])
+            except Exception as e:
+                raise UserException(
+                        "{0} is not a valid JSON import trace".format(
+                                import_trace),
+                        str(e))
+        else:
+            # This is the format produced by -X importtime.  There may be
+            # other output mixed in.
+            for line in trace.split('\n'):
+                if not line.startswith('import time:'):
+                    continue
+
+                fields = line[len('import time:'):].split('|')
+                if len(fields) != 3:
+                    continue
+
+                try:
+                    int(fields[0])
+                    int(fields[1])
+                except ValueError:
+                    # This is the heading.
+                    continue
+
+                imported.add(fields[2].strip())
+
+        # Importing a module imports its parent packages.
+        for name in list(imported):
+            parts = name.split('.')
+
+            for i in range(1, len(parts)):
+                imported.add('.'.join(parts[:i]))
+
+        return imported
+
+    def _write_module_index(self, resource_contents):
+        """ Write the header file containing the static hash table that maps
+        the resource path of every embedded module, package and directory
+        (which may be a namespace package) to its kind and whether or not it
+        is imported lazily.
+        """
+
+        lazy_paths = [name.replace('.', '/')
+                for name in self._project.get_lazy_imports()]
+
+        kinds = {}
+
+        def add_kind(name, kind):
+            if kinds.get(name, 0) < kind:
+                kinds[name] = kind
+
+        for content in resource_contents:
+            parts = content.split('/')
+
+            for i in range(1, len(parts)):
+                add_kind('/'.join(parts[:i]), self._index_namespace)
+
+            if content.endswith('.pyo'):
+                add_kind(content[:-4], self._index_module)
+
+                if parts[-1] == '__init__.pyo':
+                    add_kind('/'.join(parts[:-1]), self._index_package)
+
+        for lazy_path in lazy_paths:
+            if lazy_path not in kinds:
+                raise UserException(
+                        "'{0}' is imported lazily but is not an embedded "
+                        "module or package".format(
+                                lazy_path.replace('/', '.')))
+
+        # Use open addressing with linear probing and a load factor of no more
+        # than 0.5.
+        size = 8
+        while size < len(kinds) * 2:
+            size *= 2
+
+        table = [None] * size
+
+        # Sort the names so that the table is reproduceable.
+        for name in sorted(kinds.keys()):
+            encoded = name.encode('utf-8')
+
+            i = self._fnv1a(encoded) & (size - 1)
+            while table[i] is not None:
+                i = (i + 1) & (size - 1)
+
+            lazy = any([name == p or name.startswith(p + '/')
+                    for p in lazy_paths])
+
+            table[i] = (encoded, kinds[name], int(lazy))
+
+        f = self._create_file(self._build_dir + '/pyqtdeploy_module_index.h')
+
+        f.write('''// The index of embedded modules generated by pyqtdeploy.
+
+#define PYQTDEPLOY_MODULE_INDEX_SIZE    {0}
+
+static const ModuleIndexEntry module_index[PYQTDEPLOY_MODULE_INDEX_SIZE] = {{
+'''.format(size))
+
+        for entry in table:
+            if entry is None:
+                f.write('    {0, 0, 0},\n')
+            else:
+                encoded, kind, lazy = entry
+                f.write('    {{"{0}", {1}, {2}}},\n'.format(
+                        self._c_string(encoded), kind, lazy))
+
+        f.write('};\n')
+
+        f.close()
+
+    @staticmethod
+    def _fnv1a(data):
+        """ Return the 32 bit FNV-1a hash of some bytes.  This must be the
+        same as the implementation in pdytools_module.cpp.
+        """
+
+        h = 0x811c9dc5
+
+        for b in data:
+            h = ((h ^ b) * 0x01000193) & 0xffffffff
+
+        return h
+
+    @staticmethod
+    def _c_string(data):
+        """ Return the contents of a C string literal for some bytes. """
+
+        return ''.join(
+                [chr(b) if 32 <= b < 127 and b not in b'"\\?'
+                        else '\\{0:03o}'.format(b)
+                        for b in data])
+
+    # The name of the packed archive of frozen modules in the resources
+    # directory.
+    _packed_archive_name = 'pyqtdeploy.pdya'
+
+    # The magic string and version number of the packed archive format.
+    _packed_archive_magic = b'PDYA'
+    _packed_archive_version = 2
+
+    def _write_packed_archive(self, resources_dir, packed_modules, compress):
+        """ Write the packed archive containing a number of frozen modules
+        (which are then removed).  The archive starts with a header of the
+        magic string, the format version and the number of entries.  This is
+        followed by the entries, sorted by name, each of which is the offset
+        and length of the name, the offset and length of the data and the
+        uncompressed length of the data (or 0 if the data isn't compressed).
+        All offsets are from the start of the archive and all numbers are 32
+        bit little endian.  The names are UTF-8 encoded and followed by the
+        data.  If compress is a compression level other than 0 then the data
+        of each module is compressed in the format used by qCompress() if it
+        gets any smaller.
+        """
+
+        archive_name = resources_dir + '/' + self._packed_archive_name
+
+        self._message_handler.progress_message(
+                "Packing {0} frozen modules into {1}".format(
+                        len(packed_modules),
+                        QDir.toNativeSeparators(archive_name)))
+
+        # Sort by the encoded name so that the runtime can do a simple binary
+        # search.
+        modules = sorted([(m.encode('utf-8'), m) for m in packed_modules])
+
+        header_size = 12
+        entries_size = 20 * len(modules)
+
+        names = b''.join([name for name, _ in modules])
+
+        name_offset = header_size + entries_size
+        data_offset = name_offset + len(names)
+
+        entries = []
+        data = []
+
+        for name, module in modules:
+            module_file = QDir.toNativeSeparators(
+                    resources_dir + '/' + module)
+
+            try:
+                with open(module_file, 'rb') as f:
+                    code = f.read()
+
+                os.remove(module_file)
+            except Exception as e:
+                raise UserException(
+                        "Unable to read frozen module {0}".format(
+                                module_file),
+                        str(e))
+
+            uncompressed_size = 0
+
+            if compress:
+                compressed = struct.pack('>I', len(code)) + zlib.compress(
+                        code, compress)
+
+                if len(compressed) < len(code):
+                    uncompressed_size = len(code)
+                    code = compressed
+
+            entries.append(struct.pack('<5I', name_offset, len(name),
+                    data_offset, len(code), uncompressed_size))
+            data.append(code)
+
+            name_offset += len(name)
+            data_offset += len(code)
+
+        try:
+            with open(QDir.toNativeSeparators(archive_name), 'wb') as f:
+                f.write(self._packed_archive_magic)
+                f.write(struct.pack('<2I', self._packed_archive_version,
+                        len(modules)))
+                f.write(b''.join(entries))
+                f.write(names)
+                f.write(b''.join(data))
+        except Exception as e:
+            raise UserException(
+                    "Unable to write {0}".format(
+                            QDir.toNativeSeparators(archive_name)),
+                    str(e))
+
+        # Remove any directories that are now empty.
+        for dir_path, _, _ in os.walk(QDir.toNativeSeparators(resources_dir),
+                topdown=False):
+            try:
+                os.rmdir(dir_path)
+            except OSError:
+                pass
+
+    # The name of the binary resource file and the stem of the files that link
+    # it into the application.
+    _binary_resource_name = 'pyqtdeploy.rcc'
+    _binary_resource_stem = 'pyqtdeploy_resource'
+
+    def _write_binary_resource(self, resources_dir, resource_contents,
+            compress):
+        """ Write the binary resource and the source files that link it into
+        the application.  compress is the compression level of the frozen
+        modules.
+        """
+
+        contents = []
+
+        for content in resource_contents:
+            with open(os.path.join(resources_dir, content), 'rb') as f:
+                data = f.read()
+
+            # Apply the same compression as the .qrc files would.
+            if content == self._packed_archive_name:
+                compression = None
+            elif compress is not None and content.endswith('.pyo'):
+                compression = (compress, 1)
+            else:
+                compression = (-1, 70)
+
+            contents.append((content, data, compression))
+
+        rcc_name = QDir.toNativeSeparators(
+                resources_dir + '/' + self._binary_resource_name)
+
+        self._message_handler.verbose_message(
+                "Writing {0}".format(rcc_name))
+
+        try:
+            resource = write_binary_resource(rcc_name, contents)
+        except OSError as e:
+            raise UserException("Unable to write {0}".format(rcc_name),
+                    str(e))
+
+        # Include the hash of the resource so that the files that link it are
+        # recompiled when it changes.
+        digest = hashlib.sha256(resource).hexdigest()
+        stem = self._build_dir + '/' + self._binary_resource_stem
+
+        if self._target.platform.name == 'win':
+            f = self._create_file(stem + '.rc')
+            f.write('''// The SHA-256 hash of the resource is {0}.
+
+PYQTDEPLOY_RCC RCDATA "resources\\\\{1}"
+'''.format(digest, self._binary_resource_name))
+            f.close()
+
+        f = self._create_file(stem + '.cpp')
+        f.write('''// The SHA-256 hash of the resource is {0}.
+
+#include <QResource>
+
+#if defined(Q_OS_WIN)
+#include <windows.h>
+#else
+#define PDY_STR(s)      PDY_STR2(s)
+#define PDY_STR2(s)     #s
+#define PDY_SYMBOL      \\
+        PDY_STR(__USER_LABEL_PREFIX__) "pyqtdeploy_resource_data"
+
+#if defined(__APPLE__)
+#define PDY_SECTION     ".const_data\\n"
+#define PDY_END_SECTION ".text\\n"
+#else
+#define PDY_SECTION     ".pushsection .rodata\\n"
+#define PDY_END_SECTION ".popsection\\n"
+#endif
+
+// Include the resource in the object file.
+__asm__(
+    PDY_SECTION
+    ".p2align 4\\n"
+    ".globl " PDY_SYMBOL "\\n"
+    PDY_SYMBOL ":\\n"
+    ".incbin \\"" PYQTDEPLOY_RCC_FILE "\\"\\n"
+    PDY_END_SECTION
+);
+
+extern "C" const unsigned char pyqtdeploy_resource_data[];
+#endif
+
+
+// Register the resource and return true if there was no error.
+bool pdytools_register_resource()
+{{
+#if defined(Q_OS_WIN)
+    // RT_RCDATA is 10.
+    HRSRC rcdata = FindResourceW(NULL, L"PYQTDEPLOY_RCC",
+            MAKEINTRESOURCEW(10));
+    if (!rcdata)
+        return false;
+
+    HGLOBAL handle = LoadResource(NULL, rcdata);
+    if (!handle)
+        return false;
+
+    const unsigned char *data = static_cast<const unsigned char *>(
+            LockResource(handle));
+    if (!data)
+        return false;
+
+    return QResource::registerResourceData(data);
+#else
+    return QResource::registerResourceData(pyqtdeploy_resource_data);
+#endif
+}}
+'''.format(digest))
+        f.close()
+
+    def _write_resource(self, resources_dir, resource_contents, compress,
+            nr=-1):
+        """ Write a single resource file and return its basename.  compress is
+        the compression level of any frozen modules.
+        """
 
         suffix = '' if nr < 0 else str(nr)
         basename = 'pyqtdeploy{0}.qrc'.format(suffix)
@@ -339,7 +1061,18 @@ class Builder:
 ''')
 
         for content in resource_contents:
-            f.write('        <file>{0}</file>\n'.format(content))
+            if content == self._packed_archive_name:
+                # Make sure rcc never compresses the archive so that the
+                # frozen modules can be read directly from it.
+                f.write('        <file threshold="100">{0}</file>\n'.format(
+                        content))
+            elif compress is not None and content.endswith('.pyo'):
+                # Compress every frozen module that gets any smaller.
+                f.write(
+                        '        <file compress="{0}" threshold="1">{1}'
+                        '</file>\n'.format(compress, content))
+            else:
+                f.write('        <file>{0}</file>\n'.format(content))
 
         f.write('''    </qresource>
 </RCC>
@@ -396,8 +1129,12 @@ class Builder:
         ('.y',      'YACCSOURCES')
     )
 
-    def _write_qmake(self, py_version, required_ext, required_libraries, include_dir, python_library, standard_library_dir, source_dir, job_writer, opt, resource_names):
-        """ Create the .pro file for qmake. """
+    def _write_qmake(self, py_version, required_ext, required_libraries,
+            include_dir, python_library, standard_library_dir, source_dir,
+            job_writer, opt, resource_names, options):
+        """ Create the .pro file for qmake.  resource_names is empty if a
+        binary resource is being used.
+        """
 
         project = self._project
         target_platform = self._target.platform.name
@@ -633,7 +1370,8 @@ class Builder:
 
         external_libs = project.external_libraries.get(target_platform, [])
 
-        for required_lib in required_libraries:
+        # Sort them for reproduceable output.
+        for required_lib in sorted(required_libraries):
             defines = includepath = libs = ''
 
             for xlib in external_libs:
@@ -682,14 +1420,40 @@ class Builder:
             self._write_used_values(f, used_config, 'CONFIG')
 
         # Specify the resource files.
-        f.write('\n')
-        f.write('RESOURCES = \\\n')
-        f.write(' \\\n'.join(['    resources/{0}'.format(n) for n in resource_names]))
-        f.write('\n')
+        if options.binary_resource:
+            f.write('\n')
+
+            if target_platform == 'win':
+                f.write('RC_FILE = {0}.rc\n'.format(
+                        self._binary_resource_stem))
+            else:
+                # The .incbin directive needs the absolute name of the file.
+                f.write(
+                        'DEFINES += PYQTDEPLOY_RCC_FILE='
+                        '\\\\\\"$$PWD/resources/{0}\\\\\\"\n'.format(
+                                self._binary_resource_name))
+        else:
+            f.write('\n')
+            f.write('RESOURCES = \\\n')
+            f.write(' \\\n'.join(
+                    ['    resources/{0}'.format(n) for n in resource_names]))
+            f.write('\n')
+
+        if options.reproducible and not options.binary_resource:
+            # Stop rcc (from Qt v5.8) embedding the modification times of the
+            # files.
+            f.write('''
+greaterThan(QT_MAJOR_VERSION, 4) {
+    greaterThan(QT_MINOR_VERSION, 7) {
+        QMAKE_RESOURCE_FLAGS += --format-version 1
+    }
+}
+''')
 
         # Specify the defines.
         defines = []
-        headers = ['pyqtdeploy_version.h', 'frozen_bootstrap.h']
+        headers = ['pyqtdeploy_version.h', 'pyqtdeploy_module_index.h',
+                'frozen_bootstrap.h']
 
         if py_version >= 0x030500:
             headers.append('frozen_bootstrap_external.h')
@@ -701,6 +1465,15 @@ class Builder:
         if opt:
             defines.append('PYQTDEPLOY_OPTIMIZED')
 
+        if options.packed:
+            defines.append('PYQTDEPLOY_PACKED_RESOURCE')
+
+        if options.profile_imports:
+            defines.append('PYQTDEPLOY_PROFILE_IMPORTS')
+
+        if options.binary_resource:
+            defines.append('PYQTDEPLOY_BINARY_RESOURCE')
+
         if defines or used_defines:
             f.write('\n')
 
@@ -717,6 +1490,10 @@ class Builder:
         # Specify the source files and header files.
         f.write('\n')
         f.write('SOURCES = pyqtdeploy_main.cpp pyqtdeploy_start.cpp pdytools_module.cpp\n')
+
+        if options.binary_resource:
+            f.write('SOURCES += {0}.cpp\n'.format(
+                    self._binary_resource_stem))
         self._write_used_values(f, used_sources, 'SOURCES')
         self._write_main(py_version, used_inittab, used_defines)
         self._copy_lib_file('pyqtdeploy_start.cpp', self._build_dir)
@@ -768,7 +1545,8 @@ class Builder:
                 else:
                     f.write('lessThan(QT_MAJOR_VERSION, 5) {\n')
 
-            f.write('%s%s += %s\n' % (indent, name, ' '.join(values)))
+            # Sort them for reproduceable output.
+            f.write('%s%s += %s\n' % (indent, name, ' '.join(sorted(values))))
 
             if indent:
                 f.write('}\n')
@@ -807,7 +1585,8 @@ class Builder:
         if py_version >= 0x030500:
             dlls.append('vcruntime140.dll')
 
-        for module in modules:
+        # Sort them for reproduceable output.
+        for module in sorted(modules, key=lambda m: m.pyd):
             dlls.append(module.pyd)
 
             if module.dlls is not None:
@@ -1207,7 +1986,7 @@ static struct _inittab %s[] = {
 
         job_writer.writerow([out_file, in_file, name, conversion])
 
-    def _run_freeze(self, freeze, interpreter, job_filename, opt):
+    def _run_freeze(self, freeze, interpreter, job_filename, opt, options):
         """ Run the accumlated freeze jobs. """
 
         # On Windows the interpreter name is simply 'python'.  So in order to
@@ -1227,53 +2006,158 @@ static struct _inittab %s[] = {
             argv.append('-O')
 
         argv.append(freeze)
+
+        if options.jobs is not None:
+            argv.append('--jobs')
+            argv.append(str(options.jobs))
+
+        if options.cache_dir is not None:
+            argv.append('--cache-dir')
+            argv.append(
+                    QDir.toNativeSeparators(
+                            os.path.abspath(options.cache_dir)))
+
+            if options.cache_size is not None:
+                argv.append('--cache-size')
+                argv.append(str(options.cache_size))
+
+        if options.strip:
+            # Later versions have a different format of line number table that
+            # freeze doesn't know how to strip.
+            if ('lines' in options.strip and
+                    self._get_interpreter_hexversion(argv[0]) >= 0x030a0000):
+                raise UserException(
+                        "Line number tables can only be stripped when the "
+                        "host interpreter is Python v3.9 or earlier")
+
+            argv.append('--strip')
+            argv.append(','.join(sorted(set(options.strip))))
+
+        if options.reproducible:
+            argv.append('--reproducible')
+
+            # Make the order of the contents of any frozenset constants the
+            # same for every build.
+            environment = {'PYTHONHASHSEED': '0'}
+        else:
+            environment = None
+
         argv.append(job_filename)
 
-        self.run(argv, "Unable to freeze files")
+        self.run(argv, "Unable to freeze files", environment=environment)
+
+    @staticmethod
+    def _get_interpreter_hexversion(interpreter):
+        """ Return the encoded version of a host interpreter. """
 
-    def run(self, argv, error_message, in_build_dir=False):
-        """ Execute a command and capture the output. """
+        process = QProcess()
+        process.start(interpreter,
+                ['-c', 'import sys; print(sys.hexversion)'])
+
+        if (process.waitForFinished(-1) and
+                process.exitStatus() == QProcess.NormalExit and
+                process.exitCode() == 0):
+            try:
+                return int(bytes(process.readAllStandardOutput()).decode())
+            except ValueError:
+                pass
+
+        raise UserException(
+                "Unable to determine the version of {0}".format(interpreter),
+                process.errorString())
+
+    def run(self, argv, error_message, in_build_dir=False, environment=None):
+        """ Execute a command and wait for it to finish.  environment is an
+        optional dict of environment variables to set for the command.
+        """
+
+        self.wait(self.start(argv, error_message, in_build_dir=in_build_dir,
+                environment=environment))
+
+    def start(self, argv, error_message, in_build_dir=False, environment=None):
+        """ Start a command and return an object that is passed to wait().
+        Any number of commands may be running at the same time.  Each line of
+        stdout is a progress message and each line of stderr is a verbose
+        progress message.  environment is an optional dict of environment
+        variables to set for the command.
+        """
 
         if in_build_dir:
-            saved_cwd = os.getcwd()
-            native_build_dir = QDir.toNativeSeparators(self._build_dir)
-            os.chdir(native_build_dir)
+            working_dir = QDir.toNativeSeparators(self._build_dir)
+
             self._message_handler.verbose_message(
-                    "{0} is now the current directory".format(
-                            native_build_dir))
+                    "Running '{0}' in {1}".format(' '.join(argv),
+                            working_dir))
         else:
-            saved_cwd = None
+            working_dir = None
 
-        self._message_handler.verbose_message(
-                "Running '{0}'".format(' '.join(argv)))
-
-        QCoreApplication.processEvents()
+            self._message_handler.verbose_message(
+                    "Running '{0}'".format(' '.join(argv)))
 
-        process = QProcess()
+        process = _Process(argv, error_message, working_dir, environment,
+                self._message_handler)
 
-        process.readyReadStandardOutput.connect(
-                lambda: self._message_handler.progress_message(
-                        QTextCodec.codecForLocale().toUnicode(
-                                process.readAllStandardOutput()).strip()))
+        self._processes.append(process)
 
-        stderr_output = QByteArray()
-        process.readyReadStandardError.connect(
-                lambda: stderr_output.append(process.readAllStandardError()))
+        return process
 
-        process.start(argv[0], argv[1:])
-        finished = process.waitForFinished()
+    def wait(self, *processes):
+        """ Wait for a number of commands started by start() to finish while
+        continuing to handle events.  There is no timeout.  If a command fails,
+        or is cancelled, then the others are killed and a UserException is
+        raised.
+        """
 
-        if saved_cwd is not None:
-            os.chdir(saved_cwd)
-            self._message_handler.verbose_message(
-                    "{0} is now the current directory".format(saved_cwd))
+        running = list(processes)
+        failed = None
+
+        with self._message_handler.phase(
+                "run " + ' '.join(
+                        [os.path.basename(p.argv[0]) for p in processes])):
+            try:
+                while running:
+                    # Allow a GUI to remain responsive and call cancel().
+                    QCoreApplication.processEvents()
+
+                    for process in list(running):
+                        if process.poll(self._POLL_INTERVAL):
+                            running.remove(process)
+
+                            try:
+                                process.check()
+                            except UserException as e:
+                                if failed is None:
+                                    failed = e
+
+                                    for other in running:
+                                        other.kill()
+            finally:
+                # Kill anything left running if handling events raised an
+                # exception.
+                for process in running:
+                    process.kill()
+                    process.poll(-1)
+
+                for process in processes:
+                    if process in self._processes:
+                        self._processes.remove(process)
+
+        if failed is not None:
+            raise failed
+
+    def cancel(self, *processes):
+        """ Cancel a number of commands started by start(), or all those that
+        have not yet been waited for if none are given.  It is intended to be
+        called while handling events.  Commands started afterwards are not
+        affected.
+        """
 
-        if not finished:
-            raise UserException(error_message, process.errorString())
+        for process in (processes or self._processes):
+            process.cancel()
 
-        if process.exitStatus() != QProcess.NormalExit or process.exitCode() != 0:
-            raise UserException(error_message,
-                    QTextCodec.codecForLocale().toUnicode(stderr_output).strip())
+    # The time in milliseconds to wait for a command to finish before handling
+    # any events.
+    _POLL_INTERVAL = 50
 
     @staticmethod
     def _get_lib_file_name(file_name):
@@ -1330,3 +2214,133 @@ static struct _inittab %s[] = {
             raise UserException(
                     "Unable to create the '{0}' directory".format(dir_name),
                     str(e))
+
+
+class _Process:
+    """ Encapsulate a command started by a Builder. """
+
+    def __init__(self, argv, error_message, working_dir, environment,
+            message_handler):
+        """ Initialise the object and start the command. """
+
+        self.argv = argv
+
+        # Set if the command has been cancelled.
+        self._cancelled = False
+
+        self._error_message = error_message
+        self._message_handler = message_handler
+
+        # Any incomplete lines of output.
+        self._stdout = b''
+        self._stderr = b''
+
+        # The lines written to stderr are used to describe any failure.
+        self._stderr_lines = []
+
+        self._process = QProcess()
+
+        if working_dir is not None:
+            self._process.setWorkingDirectory(working_dir)
+
+        if environment:
+            process_environment = QProcessEnvironment.systemEnvironment()
+
+            for name, value in environment.items():
+                process_environment.insert(name, value)
+
+            self._process.setProcessEnvironment(process_environment)
+
+        self._process.readyReadStandardOutput.connect(self._read_stdout)
+        self._process.readyReadStandardError.connect(self._read_stderr)
+
+        self._process.start(argv[0], argv[1:])
+
+    def check(self):
+        """ Handle any remaining output of a finished command and raise a
+        UserException if it failed.
+        """
+
+        self._read_stdout()
+        self._read_stderr()
+
+        # Flush any incomplete lines.
+        self._stdout = self._handle_lines(self._stdout + b'\n',
+                self._stdout_line)
+        self._stderr = self._handle_lines(self._stderr + b'\n',
+                self._stderr_line)
+
+        if self._cancelled:
+            raise UserException("The build was cancelled")
+
+        if self._process.error() == QProcess.FailedToStart:
+            raise UserException(self._error_message,
+                    self._process.errorString())
+
+        if (self._process.exitStatus() != QProcess.NormalExit or
+                self._process.exitCode() != 0):
+            raise UserException(self._error_message,
+                    '\n'.join(self._stderr_lines))
+
+    def cancel(self):
+        """ Cancel the command. """
+
+        self._cancelled = True
+        self.kill()
+
+    def kill(self):
+        """ Kill the command. """
+
+        self._process.kill()
+
+    def poll(self, msecs):
+        """ Wait for up to a number of milliseconds for the command to finish
+        (handling any output in the meantime) and return True if it has
+        finished.
+        """
+
+        if self._process.state() != QProcess.NotRunning:
+            self._process.waitForFinished(msecs)
+
+        return self._process.state() == QProcess.NotRunning
+
+    @staticmethod
+    def _handle_lines(data, handler):
+        """ Pass each complete line of some output to a handler and return any
+        incomplete line.
+        """
+
+        lines = data.split(b'\n')
+
+        for line in lines[:-1]:
+            line = QTextCodec.codecForLocale().toUnicode(line).rstrip()
+
+            if line:
+                handler(line)
+
+        return lines[-1]
+
+    def _read_stderr(self):
+        """ Handle the output written to stderr. """
+
+        self._stderr = self._handle_lines(
+                self._stderr + bytes(self._process.readAllStandardError()),
+                self._stderr_line)
+
+    def _read_stdout(self):
+        """ Handle the output written to stdout. """
+
+        self._stdout = self._handle_lines(
+                self._stdout + bytes(self._process.readAllStandardOutput()),
+                self._stdout_line)
+
+    def _stderr_line(self, line):
+        """ Handle a line written to stderr. """
+
+        self._stderr_lines.append(line)
+        self._message_handler.verbose_message(line)
+
+    def _stdout_line(self, line):
+        """ Handle a line written to stdout. """
+
+        self._message_handler.progress_message(line)
@@ -24,6 +24,8 @@
 // POSSIBILITY OF SUCH DAMAGE.
 
 
+#include <string.h>
+
 #include <Python.h>
 #include <marshal.h>
 #include <structmember.h>
@@ -36,6 +38,20 @@
 #include <QStringList>
 #include <QVector>
 
+#include <QResource>
+
+#if defined(PYQTDEPLOY_PACKED_RESOURCE)
+#include <QtEndian>
+#endif
+
+#if defined(PYQTDEPLOY_PROFILE_IMPORTS)
+#include <stdio.h>
+
+#include <QElapsedTimer>
+#include <QHash>
+#include <QList>
+#endif
+
 #include "pyqtdeploy_version.h"
 
 
@@ -190,6 +206,86 @@ static PyTypeObject QrcImporter_Type = {
 #endif
 };
 
+
+#if PY_VERSION_HEX >= 0x03050000
+// The loader object structure used to implement lazy imports.  It is wrapped
+// by an importlib.util.LazyLoader which requires an exec_module() method.
+typedef struct _qrcloader
+{
+    PyObject_HEAD
+
+    // The importer that found the module.
+    PyObject *importer;
+} QrcLoader;
+
+
+// C linkage forward declarations.
+static void qrcloader_dealloc(PyObject *self);
+static PyObject *qrcloader_create_module(PyObject *self, PyObject *spec);
+static PyObject *qrcloader_exec_module(PyObject *self, PyObject *module);
+
+
+// The method table.
+static PyMethodDef qrcloader_methods[] = {
+    {"create_module", qrcloader_create_module, METH_O, NULL},
+    {"exec_module", qrcloader_exec_module, METH_O, NULL},
+    {NULL, NULL, 0, NULL}
+};
+
+
+// The loader type structure.
+static PyTypeObject QrcLoader_Type = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    "pdytools.qrcloader",
+    sizeof (QrcLoader),
+    0,                                          // tp_itemsize
+    qrcloader_dealloc,                          // tp_dealloc
+    0,                                          // tp_print
+    0,                                          // tp_getattr
+    0,                                          // tp_setattr
+    0,                                          // tp_reserved
+    0,                                          // tp_repr
+    0,                                          // tp_as_number
+    0,                                          // tp_as_sequence
+    0,                                          // tp_as_mapping
+    0,                                          // tp_hash
+    0,                                          // tp_call
+    0,                                          // tp_str
+    0,                                          // tp_getattro
+    0,                                          // tp_setattro
+    0,                                          // tp_as_buffer
+    Py_TPFLAGS_DEFAULT,                         // tp_flags
+    0,                                          // tp_doc
+    0,                                          // tp_traverse
+    0,                                          // tp_clear
+    0,                                          // tp_richcompare
+    0,                                          // tp_weaklistoffset
+    0,                                          // tp_iter
+    0,                                          // tp_iternext
+    qrcloader_methods,                          // tp_methods
+    0,                                          // tp_members
+    0,                                          // tp_getset
+    0,                                          // tp_base
+    0,                                          // tp_dict
+    0,                                          // tp_descr_get
+    0,                                          // tp_descr_set
+    0,                                          // tp_dictoffset
+    0,                                          // tp_init
+    0,                                          // tp_alloc
+    0,                                          // tp_new
+    0,                                          // tp_free
+    0,                                          // tp_is_gc
+    0,                                          // tp_bases
+    0,                                          // tp_mro
+    0,                                          // tp_cache
+    0,                                          // tp_subclasses
+    0,                                          // tp_weaklist
+    0,                                          // tp_del
+    0,                                          // tp_version_tag
+    0,                                          // tp_finalize
+};
+#endif
+
 }
 
 
@@ -203,16 +299,61 @@ enum ModuleType {
 };
 
 
+// The kinds of entry in the module index.  These must be the same as those
+// used by the builder.
+enum ModuleIndexKind {
+    ModuleIndexNotFound,
+    ModuleIndexNamespace,
+    ModuleIndexPackage,
+    ModuleIndexModule
+};
+
+
+// An entry in the module index.
+struct ModuleIndexEntry
+{
+    // The resource path of the module, package or directory (without the
+    // leading ":/" or any extension).  It is 0 if the entry is not used.
+    const char *name;
+
+    // The kind of the entry.
+    int kind;
+
+    // Set if the module is imported lazily.
+    int lazy;
+};
+
+
+// The index of the embedded modules generated by the builder.
+#include "pyqtdeploy_module_index.h"
+
+
 // The internal API.
 void pdytools_init_executable_dir(const QString &argv0);
 const QDir &pdytools_get_executable_dir();
+#if defined(PYQTDEPLOY_PROFILE_IMPORTS)
+void pdytools_profile_begin();
+void pdytools_profile_end(const QString &fqmn);
+#endif
 
 
 // Other forward declarations.
 static ModuleType find_module(QrcImporter *self, const QString &fqmn,
         QString &pathname, QString &filename);
-static bool read_data(const QString &filename, QByteArray &data);
+static ModuleType locate_module(QrcImporter *self, const QString &fqmn,
+        QString &pathname, QString &filename);
+static PyObject *load_qrc_module(PyObject *self, PyObject *py_fqmn,
+        PyObject *args);
+static bool get_file_data(const QString &filename, const char **data,
+        Py_ssize_t *size, QByteArray &buffer);
 static PyObject *get_code_object(const QString &filename);
+static const ModuleIndexEntry *find_module_index(const QString &pathname);
+#if PY_VERSION_HEX >= 0x03050000
+static PyObject *make_lazy_loader(PyObject *importer);
+static PyObject *exec_qrc_module(PyObject *self, PyObject *module,
+        PyObject *py_fqmn);
+#endif
+static bool is_resource_dir(const QString &pathname);
 static void raise_import_error(const QString &fqmn);
 static QString str_to_qstring(PyObject *str);
 static PyObject *qstring_to_str(const QString &qstring);
@@ -222,6 +363,202 @@ static PyObject *qstring_to_str(const QString &qstring);
 static QDir *executable_dir = 0;
 
 
+#if defined(PYQTDEPLOY_PROFILE_IMPORTS)
+// The phases of an import that are timed.
+enum ProfilePhase {
+    ProfileRead,
+    ProfileUnmarshal,
+    ProfileExec
+};
+
+
+// The profile of a completed import.
+struct ImportProfile
+{
+    // The fully qualified module name.
+    QString fqmn;
+
+    // The number of imports in progress when this one was started.
+    int depth;
+
+    // The times spent, in nanoseconds, finding, reading, unmarshalling and
+    // executing the module.  The execution time includes any nested imports.
+    qint64 find_ns;
+    qint64 read_ns;
+    qint64 unmarshal_ns;
+    qint64 exec_ns;
+
+    // The total time, in nanoseconds, excluding and including nested imports.
+    qint64 self_ns;
+    qint64 cumulative_ns;
+};
+
+
+// An import in progress.
+struct ImportFrame
+{
+    qint64 start_ns;
+    qint64 children_ns;
+    qint64 phase_ns[ProfileExec + 1];
+};
+
+
+// The clock used for all timings.
+static QElapsedTimer *profile_clock = 0;
+
+// The completed imports in the order in which they completed.
+static QList<ImportProfile> *import_profiles = 0;
+
+// The stack of imports in progress.
+static QList<ImportFrame> *import_frames = 0;
+
+// The total time spent finding each module.
+static QHash<QString, qint64> *find_times = 0;
+
+
+// Return the current time in nanoseconds.
+static qint64 profile_now()
+{
+    return profile_clock->nsecsElapsed();
+}
+
+
+// Record the time spent finding a module.
+static void profile_find(const QString &fqmn, qint64 start_ns)
+{
+    (*find_times)[fqmn] += profile_now() - start_ns;
+}
+
+
+// Record the time spent in a phase of the current import.
+static void profile_phase(ProfilePhase phase, qint64 start_ns)
+{
+    if (!import_frames->isEmpty())
+        import_frames->last().phase_ns[phase] += profile_now() - start_ns;
+}
+
+
+// Start an import.
+void pdytools_profile_begin()
+{
+    ImportFrame frame;
+
+    frame.start_ns = profile_now();
+    frame.children_ns = 0;
+
+    for (int p = 0; p <= ProfileExec; ++p)
+        frame.phase_ns[p] = 0;
+
+    import_frames->append(frame);
+}
+
+
+// Complete the current import.
+void pdytools_profile_end(const QString &fqmn)
+{
+    ImportFrame frame = import_frames->takeLast();
+    qint64 cumulative_ns = profile_now() - frame.start_ns;
+
+    if (!import_frames->isEmpty())
+        import_frames->last().children_ns += cumulative_ns;
+
+    ImportProfile profile;
+
+    profile.fqmn = fqmn;
+    profile.depth = import_frames->size();
+    profile.find_ns = find_times->value(fqmn);
+    profile.read_ns = frame.phase_ns[ProfileRead];
+    profile.unmarshal_ns = frame.phase_ns[ProfileUnmarshal];
+    profile.exec_ns = frame.phase_ns[ProfileExec];
+    profile.self_ns = cumulative_ns - frame.children_ns;
+    profile.cumulative_ns = cumulative_ns;
+
+    import_profiles->append(profile);
+}
+
+
+// Write the profile of all imports.  The report is written to the file named
+// by the PYQTDEPLOY_PROFILE_IMPORTS environment variable, or stderr if it is
+// not set.  It is JSON if the file name ends with .json, otherwise it is in
+// the same format as that produced by Python's -X importtime option.  Note
+// that this is called after the interpreter has been finalised.
+static void write_import_profile()
+{
+    QByteArray report_name = qgetenv("PYQTDEPLOY_PROFILE_IMPORTS");
+    FILE *report = stderr;
+    bool json = false;
+
+    if (!report_name.isEmpty())
+    {
+        report = fopen(report_name.constData(), "w");
+
+        if (!report)
+            return;
+
+        json = report_name.endsWith(".json");
+    }
+
+    if (json)
+        fprintf(report, "[\n");
+    else
+        fprintf(report,
+                "import time: self [us] | cumulative | imported package\n");
+
+    for (int i = 0; i < import_profiles->size(); ++i)
+    {
+        const ImportProfile &profile = import_profiles->at(i);
+        QByteArray fqmn = profile.fqmn.toUtf8();
+
+        if (json)
+        {
+            // Module names don't need escaping but be safe.
+            fqmn.replace('\\', "\\\\");
+            fqmn.replace('"', "\\\"");
+
+            fprintf(report,
+                    "  {\"module\": \"%s\", \"depth\": %d, "
+                    "\"find_us\": %lld, \"read_us\": %lld, "
+                    "\"unmarshal_us\": %lld, \"exec_us\": %lld, "
+                    "\"self_us\": %lld, \"cumulative_us\": %lld}%s\n",
+                    fqmn.constData(), profile.depth,
+                    profile.find_ns / 1000, profile.read_ns / 1000,
+                    profile.unmarshal_ns / 1000, profile.exec_ns / 1000,
+                    profile.self_ns / 1000, profile.cumulative_ns / 1000,
+                    (i + 1 < import_profiles->size() ? "," : ""));
+        }
+        else
+        {
+            fprintf(report, "import time: %9lld | %10lld | %*s%s\n",
+                    profile.self_ns / 1000, profile.cumulative_ns / 1000,
+                    profile.depth * 2, "", fqmn.constData());
+        }
+    }
+
+    if (json)
+        fprintf(report, "]\n");
+
+    if (report == stderr)
+        fflush(report);
+    else
+        fclose(report);
+}
+
+
+// Initialise the import profiler.
+static void init_import_profile()
+{
+    profile_clock = new QElapsedTimer;
+    profile_clock->start();
+
+    import_profiles = new QList<ImportProfile>;
+    import_frames = new QList<ImportFrame>;
+    find_times = new QHash<QString, qint64>;
+
+    Py_AtExit(write_import_profile);
+}
+#endif
+
+
 // The importer initialisation function.
 static int qrcimporter_init(PyObject *self, PyObject *args, PyObject *kwds)
 {
@@ -241,7 +578,7 @@ static int qrcimporter_init(PyObject *self, PyObject *args, PyObject *kwds)
 
     QString *q_path = new QString(str_to_qstring(path));
 
-    if (!q_path->startsWith(QChar(':')) || !QFileInfo(*q_path).isDir())
+    if (!q_path->startsWith(QChar(':')) || !is_resource_dir(*q_path))
     {
         delete q_path;
 
@@ -298,6 +635,22 @@ static PyObject *qrcimporter_find_loader(PyObject *self, PyObject *args)
     {
     case ModuleIsModule:
     case ModuleIsPackage:
+#if PY_VERSION_HEX >= 0x03050000
+        // A lazily imported module gets its own loader.
+        if (find_module_index(pathname)->lazy)
+        {
+            PyObject *lazy_loader = make_lazy_loader(self);
+            if (!lazy_loader)
+                return NULL;
+
+            result = Py_BuildValue("N[]", lazy_loader);
+            break;
+        }
+#endif
+
+        result = Py_BuildValue("O[]", self);
+        break;
+
     case ModuleIsAdjacentExtensionModule:
         result = Py_BuildValue("O[]", self);
         break;
@@ -403,11 +756,29 @@ static PyObject *qrcimporter_find_module(PyObject *self, PyObject *args)
 // Implement the standard load_module() method for the importer.
 static PyObject *qrcimporter_load_module(PyObject *self, PyObject *args)
 {
-    PyObject *py_fqmn, *code, *py_filename, *mod_dict;
+    PyObject *py_fqmn;
 
     if (!PyArg_ParseTuple(args, PYQTDEPLOY_PARSE_STR ":qrcimporter.load_module", &py_fqmn))
         return NULL;
 
+#if defined(PYQTDEPLOY_PROFILE_IMPORTS)
+    pdytools_profile_begin();
+    PyObject *mod = load_qrc_module(self, py_fqmn, args);
+    pdytools_profile_end(str_to_qstring(py_fqmn));
+
+    return mod;
+#else
+    return load_qrc_module(self, py_fqmn, args);
+#endif
+}
+
+
+// Load a module.
+static PyObject *load_qrc_module(PyObject *self, PyObject *py_fqmn,
+        PyObject *args)
+{
+    PyObject *code, *py_filename, *mod_dict;
+
     QString fqmn = str_to_qstring(py_fqmn);
     QString pathname, filename;
 
@@ -544,6 +915,11 @@ static PyObject *qrcimporter_load_module(PyObject *self, PyObject *args)
     if (!py_filename)
         goto error;
 
+#if defined(PYQTDEPLOY_PROFILE_IMPORTS)
+    {
+        qint64 start_ns = profile_now();
+#endif
+
 #if PY_MAJOR_VERSION >= 3
     mod = PyImport_ExecCodeModuleObject(py_fqmn, code, py_filename, NULL);
 #else
@@ -551,6 +927,11 @@ static PyObject *qrcimporter_load_module(PyObject *self, PyObject *args)
             PyString_AS_STRING(py_filename));
 #endif
 
+#if defined(PYQTDEPLOY_PROFILE_IMPORTS)
+        profile_phase(ProfileExec, start_ns);
+    }
+#endif
+
     Py_DECREF(py_filename);
     Py_DECREF(code);
 
@@ -641,23 +1022,208 @@ static PyObject *qrcimporter_get_data(PyObject *self, PyObject *args)
         return NULL;
 
     QString filename = str_to_qstring(py_filename);
-    QByteArray data;
+    const char *data;
+    Py_ssize_t size;
+    QByteArray buffer;
 
-    if (!read_data(filename, data))
+    if (!get_file_data(filename, &data, &size, buffer))
         return NULL;
 
 #if PY_MAJOR_VERSION >= 3
-    return PyBytes_FromStringAndSize(data.constData(), data.size());
+    return PyBytes_FromStringAndSize(data, size);
+#else
+    return PyString_FromStringAndSize(data, size);
+#endif
+}
+
+
+#if PY_VERSION_HEX >= 0x03050000
+// The loader deallocation function.
+static void qrcloader_dealloc(PyObject *self)
+{
+    Py_XDECREF(((QrcLoader *)self)->importer);
+
+    PyObject_Del(self);
+}
+
+
+// Implement the standard create_module() method for the loader.
+static PyObject *qrcloader_create_module(PyObject *self, PyObject *spec)
+{
+    // Use the default module creation.
+    Py_RETURN_NONE;
+}
+
+
+// Implement the standard exec_module() method for the loader.
+static PyObject *qrcloader_exec_module(PyObject *self, PyObject *module)
+{
+    PyObject *py_fqmn = PyObject_GetAttrString(module, "__name__");
+    if (!py_fqmn)
+        return NULL;
+
+    if (!PyUnicode_Check(py_fqmn))
+    {
+        Py_DECREF(py_fqmn);
+        PyErr_SetString(PyExc_TypeError,
+                "qrcloader.exec_module: module name must be a str");
+        return NULL;
+    }
+
+#if defined(PYQTDEPLOY_PROFILE_IMPORTS)
+    pdytools_profile_begin();
+    PyObject *result = exec_qrc_module(self, module, py_fqmn);
+    pdytools_profile_end(str_to_qstring(py_fqmn));
 #else
-    return PyString_FromStringAndSize(data.constData(), data.size());
+    PyObject *result = exec_qrc_module(self, module, py_fqmn);
 #endif
+
+    Py_DECREF(py_fqmn);
+
+    return result;
+}
+
+
+// Execute the code of a lazily imported module in an existing module object.
+static PyObject *exec_qrc_module(PyObject *self, PyObject *module,
+        PyObject *py_fqmn)
+{
+    QString fqmn = str_to_qstring(py_fqmn);
+    QString pathname, filename;
+
+    ModuleType mt = find_module((QrcImporter *)((QrcLoader *)self)->importer,
+            fqmn, pathname, filename);
+
+    if (mt != ModuleIsModule && mt != ModuleIsPackage)
+    {
+        raise_import_error(fqmn);
+        return NULL;
+    }
+
+    PyObject *mod_dict = PyModule_GetDict(module);
+    if (!mod_dict)
+        return NULL;
+
+    if (mt == ModuleIsPackage)
+    {
+        // The spec was created without knowing that the module is a package
+        // so add __path__ and fix __package__ and the spec before the code
+        // gets executed.
+        PyObject *py_pathname = qstring_to_str(pathname);
+        if (!py_pathname)
+            return NULL;
+
+        PyObject *path_list = Py_BuildValue("[N]", py_pathname);
+        if (!path_list)
+            return NULL;
+
+        int rc = PyDict_SetItemString(mod_dict, "__path__", path_list);
+
+        if (rc == 0)
+            rc = PyDict_SetItemString(mod_dict, "__package__", py_fqmn);
+
+        if (rc == 0)
+        {
+            PyObject *spec = PyDict_GetItemString(mod_dict, "__spec__");
+
+            if (spec && spec != Py_None)
+                rc = PyObject_SetAttrString(spec,
+                        "submodule_search_locations", path_list);
+        }
+
+        Py_DECREF(path_list);
+
+        if (rc != 0)
+            return NULL;
+    }
+
+    PyObject *py_filename = qstring_to_str(filename);
+    if (!py_filename)
+        return NULL;
+
+    int rc = PyDict_SetItemString(mod_dict, "__file__", py_filename);
+    Py_DECREF(py_filename);
+
+    if (rc != 0)
+        return NULL;
+
+    if (!PyDict_GetItemString(mod_dict, "__builtins__"))
+        if (PyDict_SetItemString(mod_dict, "__builtins__",
+                PyEval_GetBuiltins()) != 0)
+            return NULL;
+
+    PyObject *code = get_code_object(filename);
+    if (!code)
+        return NULL;
+
+    PyObject *result = PyEval_EvalCode(code, mod_dict, mod_dict);
+    Py_DECREF(code);
+
+    if (!result)
+        return NULL;
+
+    Py_DECREF(result);
+
+    Py_RETURN_NONE;
+}
+
+
+// Return an importlib.util.LazyLoader for a module found by an importer.
+static PyObject *make_lazy_loader(PyObject *importer)
+{
+    static PyObject *lazy_loader_type = 0;
+
+    if (!lazy_loader_type)
+    {
+        PyObject *util_module = PyImport_ImportModule("importlib.util");
+        if (!util_module)
+            return NULL;
+
+        lazy_loader_type = PyObject_GetAttrString(util_module, "LazyLoader");
+        Py_DECREF(util_module);
+
+        if (!lazy_loader_type)
+            return NULL;
+    }
+
+    QrcLoader *loader = PyObject_New(QrcLoader, &QrcLoader_Type);
+    if (!loader)
+        return NULL;
+
+    Py_INCREF(importer);
+    loader->importer = importer;
+
+    PyObject *lazy_loader = PyObject_CallFunctionObjArgs(lazy_loader_type,
+            (PyObject *)loader, NULL);
+
+    Py_DECREF((PyObject *)loader);
+
+    return lazy_loader;
 }
+#endif
 
 
 // Find a fully qualified module name handled by an importer and return its
 // type, path name and file name.
 static ModuleType find_module(QrcImporter *self, const QString &fqmn,
         QString &pathname, QString &filename)
+{
+#if defined(PYQTDEPLOY_PROFILE_IMPORTS)
+    qint64 start_ns = profile_now();
+    ModuleType mt = locate_module(self, fqmn, pathname, filename);
+    profile_find(fqmn, start_ns);
+
+    return mt;
+#else
+    return locate_module(self, fqmn, pathname, filename);
+#endif
+}
+
+
+// Locate a fully qualified module name handled by an importer and return its
+// type, path name and file name.
+static ModuleType locate_module(QrcImporter *self, const QString &fqmn,
+        QString &pathname, QString &filename)
 {
     QStringList fqmn_parts = fqmn.split(QChar('.'));
     QString fqmn_last = fqmn_parts.takeLast();
@@ -668,17 +1234,23 @@ static ModuleType find_module(QrcImporter *self, const QString &fqmn,
 
     pathname = *self->path + fqmn_last;
 
-    // See if it is an ordinary module.
-    filename = pathname + ".pyo";
+    // A single lookup of the index tells us if the module is embedded.
+    const ModuleIndexEntry *entry = find_module_index(pathname);
+    int kind = (entry ? entry->kind : ModuleIndexNotFound);
 
-    if (QFileInfo(filename).isFile())
+    // See if it is an ordinary module.
+    if (kind == ModuleIndexModule)
+    {
+        filename = pathname + ".pyo";
         return ModuleIsModule;
+    }
 
     // See if it is a package.
-    filename = pathname + "/__init__.pyo";
-
-    if (QFileInfo(filename).isFile())
+    if (kind == ModuleIndexPackage)
+    {
+        filename = pathname + "/__init__.pyo";
         return ModuleIsPackage;
+    }
 
     // See if it is an adjacent extension module.  Allow for the fact that we
     // can be called before we have set the executable directory.
@@ -709,19 +1281,298 @@ static ModuleType find_module(QrcImporter *self, const QString &fqmn,
     }
 
     // See if it is a namespace.
-    filename = pathname;
-
-    if (QFileInfo(filename).isDir())
+    if (kind == ModuleIndexNamespace)
+    {
+        filename = pathname;
         return ModuleIsNamespace;
+    }
 
     // Nothing was found.
     return ModuleNotFound;
 }
 
 
-// Get the data from a file.
-static bool read_data(const QString &filename, QByteArray &data)
+// Return the module index entry for a resource path name or 0 if there is
+// none.
+static const ModuleIndexEntry *find_module_index(const QString &pathname)
+{
+    if (!pathname.startsWith(QLatin1String(":/")))
+        return 0;
+
+    QByteArray name = pathname.mid(2).toUtf8();
+
+    // This must be the same as the hash function used by the builder.
+    quint32 hash = 0x811c9dc5;
+
+    for (int i = 0; i < name.size(); ++i)
+    {
+        hash ^= static_cast<uchar>(name.at(i));
+        hash *= 0x01000193;
+    }
+
+    const quint32 mask = PYQTDEPLOY_MODULE_INDEX_SIZE - 1;
+
+    for (quint32 i = hash & mask; module_index[i].name; i = (i + 1) & mask)
+        if (strcmp(module_index[i].name, name.constData()) == 0)
+            return &module_index[i];
+
+    return 0;
+}
+
+
+// Return true if a compressed resource was compressed using zlib and so can be
+// uncompressed by qUncompress().  From Qt v5.13 rcc may use zstd instead.
+static bool is_zlib_compressed(const QResource &resource)
+{
+#if QT_VERSION >= 0x050d00
+    return (resource.compressionAlgorithm() == QResource::ZlibCompression);
+#else
+    return resource.isCompressed();
+#endif
+}
+
+
+#if defined(PYQTDEPLOY_PACKED_RESOURCE)
+// The packed archive of frozen modules.  It starts with a header of the magic
+// string "PDYA", the format version and the number of entries.  This is
+// followed by the entries, sorted by name, each of which is the offset and
+// length of the name, the offset and length of the data and the uncompressed
+// length of the data (or 0 if the data isn't compressed).  Compressed data is
+// in the format used by qCompress().  All offsets are from the start of the
+// archive and all numbers are 32 bit little endian.
+static const char packed_archive_name[] = ":/pyqtdeploy.pdya";
+static const uchar packed_archive_magic[] = {'P', 'D', 'Y', 'A'};
+static const quint32 packed_archive_version = 2;
+static const int packed_header_size = 12;
+static const int packed_entry_size = 20;
+
+static const uchar *packed_archive = 0;
+static quint32 packed_nr_entries = 0;
+
+
+// Make the packed archive available if it hasn't already been done and return
+// true if there is one.
+static bool init_packed_archive()
+{
+    static bool initialised = false;
+
+    if (initialised)
+        return (packed_archive != 0);
+
+    initialised = true;
+
+    QResource resource(QString::fromLatin1(packed_archive_name));
+
+    if (!resource.isValid())
+        return false;
+
+    const uchar *archive = resource.data();
+    qint64 archive_size = resource.size();
+
+    // The builder makes sure the archive isn't compressed but handle it
+    // anyway.  Note that the uncompressed copy is never freed.
+    if (resource.isCompressed())
+    {
+        QByteArray *uncompressed;
+
+        if (is_zlib_compressed(resource))
+        {
+            uncompressed = new QByteArray(
+                    qUncompress(archive, int(archive_size)));
+        }
+        else
+        {
+            // Let QFile handle any other compression algorithm.
+            QFile afile(QString::fromLatin1(packed_archive_name));
+
+            if (!afile.open(QIODevice::ReadOnly))
+                return false;
+
+            uncompressed = new QByteArray(afile.readAll());
+        }
+
+        archive = reinterpret_cast<const uchar *>(uncompressed->constData());
+        archive_size = uncompressed->size();
+    }
+
+    if (archive_size < packed_header_size ||
+            memcmp(archive, packed_archive_magic,
+                    sizeof (packed_archive_magic)) != 0 ||
+            qFromLittleEndian<quint32>(archive + 4) != packed_archive_version)
+        return false;
+
+    packed_archive = archive;
+    packed_nr_entries = qFromLittleEndian<quint32>(archive + 8);
+
+    return true;
+}
+
+
+// Return a pointer to an entry of the packed archive.
+static inline const uchar *packed_entry(quint32 index)
+{
+    return packed_archive + packed_header_size + index * packed_entry_size;
+}
+
+
+// Compare the name of an entry of the packed archive with a name, optionally
+// only comparing the leading part of the entry's name.
+static int compare_packed_name(quint32 index, const QByteArray &name,
+        bool prefix)
+{
+    const uchar *entry = packed_entry(index);
+    const uchar *entry_name = packed_archive +
+            qFromLittleEndian<quint32>(entry);
+    quint32 entry_len = qFromLittleEndian<quint32>(entry + 4);
+    quint32 name_len = name.size();
+
+    if (prefix && entry_len > name_len)
+        entry_len = name_len;
+
+    int res = memcmp(entry_name, name.constData(), qMin(entry_len, name_len));
+
+    if (res == 0 && entry_len != name_len)
+        res = (entry_len < name_len ? -1 : 1);
+
+    return res;
+}
+
+
+// Return the index of the first entry of the packed archive whose name is not
+// less than a name.
+static quint32 packed_lower_bound(const QByteArray &name)
+{
+    quint32 low = 0, high = packed_nr_entries;
+
+    while (low < high)
+    {
+        quint32 mid = low + (high - low) / 2;
+
+        if (compare_packed_name(mid, name, false) < 0)
+            low = mid + 1;
+        else
+            high = mid;
+    }
+
+    return low;
+}
+
+
+// Return the name of a file in the packed archive corresponding to a resource
+// file name or directory name.
+static QByteArray packed_name(const QString &name)
+{
+    // Remove the leading ":/" and any trailing '/'.
+    int len = name.length() - 2;
+
+    if (name.endsWith(QChar('/')))
+        --len;
+
+    return name.mid(2, len).toUtf8();
+}
+
+
+// Get the data of a file in the packed archive, uncompressing it into a buffer
+// if necessary.  Return true if it was found.
+static bool find_packed_data(const QString &filename, const char **data,
+        Py_ssize_t *size, QByteArray &buffer)
+{
+    if (!filename.startsWith(QLatin1String(":/")) || !init_packed_archive())
+        return false;
+
+    QByteArray name = packed_name(filename);
+    quint32 index = packed_lower_bound(name);
+
+    if (index >= packed_nr_entries ||
+            compare_packed_name(index, name, false) != 0)
+        return false;
+
+    const uchar *entry = packed_entry(index);
+
+    const uchar *entry_data = packed_archive +
+            qFromLittleEndian<quint32>(entry + 8);
+    quint32 entry_size = qFromLittleEndian<quint32>(entry + 12);
+
+    if (qFromLittleEndian<quint32>(entry + 16) != 0)
+    {
+        buffer = qUncompress(entry_data, int(entry_size));
+
+        *data = buffer.constData();
+        *size = buffer.size();
+    }
+    else
+    {
+        *data = reinterpret_cast<const char *>(entry_data);
+        *size = entry_size;
+    }
+
+    return true;
+}
+#endif
+
+
+// See if a resource directory exists.
+static bool is_resource_dir(const QString &pathname)
 {
+#if defined(PYQTDEPLOY_PACKED_RESOURCE)
+    // A directory exists in the packed archive if any name starts with it.
+    if (pathname.startsWith(QLatin1String(":/")) && init_packed_archive())
+    {
+        QByteArray prefix = packed_name(pathname);
+
+        if (!prefix.isEmpty())
+            prefix.append('/');
+
+        quint32 index = packed_lower_bound(prefix);
+
+        if (index < packed_nr_entries &&
+                compare_packed_name(index, prefix, true) == 0)
+            return true;
+    }
+#endif
+
+    return QFileInfo(pathname).isDir();
+}
+
+
+// Get a pointer to the contents of a file and its size.  Embedded resources
+// are used in place where possible, otherwise the contents are read into a
+// buffer.
+static bool get_file_data(const QString &filename, const char **data,
+        Py_ssize_t *size, QByteArray &buffer)
+{
+#if defined(PYQTDEPLOY_PACKED_RESOURCE)
+    if (find_packed_data(filename, data, size, buffer))
+        return true;
+#endif
+
+    if (filename.startsWith(QChar(':')))
+    {
+        QResource resource(filename);
+
+        // Any compression algorithm other than zlib is handled by QFile.
+        if (resource.isValid() && resource.data())
+        {
+            if (!resource.isCompressed())
+            {
+                *data = reinterpret_cast<const char *>(resource.data());
+                *size = resource.size();
+
+                return true;
+            }
+
+            if (is_zlib_compressed(resource))
+            {
+                buffer = qUncompress(resource.data(), int(resource.size()));
+
+                *data = buffer.constData();
+                *size = buffer.size();
+
+                return true;
+            }
+        }
+    }
+
     QFile mfile(filename);
 
     if (!mfile.open(QIODevice::ReadOnly))
@@ -731,10 +1582,13 @@ static bool read_data(const QString &filename, QByteArray &data)
         return false;
     }
 
-    data = mfile.readAll();
+    buffer = mfile.readAll();
 
     mfile.close();
 
+    *data = buffer.constData();
+    *size = buffer.size();
+
     return true;
 }
 
@@ -742,12 +1596,30 @@ static bool read_data(const QString &filename, QByteArray &data)
 // Get the code object from a file.
 static PyObject *get_code_object(const QString &filename)
 {
-    QByteArray data;
+    const char *data;
+    Py_ssize_t size;
+    QByteArray buffer;
+
+#if defined(PYQTDEPLOY_PROFILE_IMPORTS)
+    qint64 start_ns = profile_now();
+#endif
 
-    if (!read_data(filename, data))
+    if (!get_file_data(filename, &data, &size, buffer))
         return NULL;
 
-    return PyMarshal_ReadObjectFromString(data.data(), data.size());
+#if defined(PYQTDEPLOY_PROFILE_IMPORTS)
+    profile_phase(ProfileRead, start_ns);
+    start_ns = profile_now();
+
+    PyObject *code = PyMarshal_ReadObjectFromString(const_cast<char *>(data),
+            size);
+
+    profile_phase(ProfileUnmarshal, start_ns);
+
+    return code;
+#else
+    return PyMarshal_ReadObjectFromString(const_cast<char *>(data), size);
+#endif
 }
 
 
@@ -828,12 +1700,21 @@ PYQTDEPLOY_TYPE PYQTDEPLOY_INIT()
 {
     PyObject *mod;
 
+#if defined(PYQTDEPLOY_PROFILE_IMPORTS)
+    init_import_profile();
+#endif
+
     // Just in case we are linking against Python as a Windows DLL.
     QrcImporter_Type.tp_new = PyType_GenericNew;
 
     if (PyType_Ready(&QrcImporter_Type) < 0)
         PYQTDEPLOY_FATAL("Failed to initialise pdytools.qrcimporter type");
 
+#if PY_VERSION_HEX >= 0x03050000
+    if (PyType_Ready(&QrcLoader_Type) < 0)
+        PYQTDEPLOY_FATAL("Failed to initialise pdytools.qrcloader type");
+#endif
+
 #if PY_MAJOR_VERSION >= 3
     mod = PyModule_Create(&pdytoolsmodule);
 #else
@@ -70,6 +70,13 @@ extern "C" void initpdytools(void);
 // The internal API.
 void pdytools_init_executable_dir(const QString &argv0);
 const QDir &pdytools_get_executable_dir();
+#if defined(PYQTDEPLOY_PROFILE_IMPORTS)
+void pdytools_profile_begin();
+void pdytools_profile_end(const QString &fqmn);
+#endif
+#if defined(PYQTDEPLOY_BINARY_RESOURCE)
+bool pdytools_register_resource();
+#endif
 
 
 // We use Qt as the source of the locale information, partly because it
@@ -132,6 +139,19 @@ int pyqtdeploy_start(int argc, char **argv,
         return 1;
     }
 
+#if defined(PYQTDEPLOY_BINARY_RESOURCE)
+    // Register the resource linked into the executable.
+    if (!pdytools_register_resource())
+    {
+#if defined(WIDE_ARGV)
+        fwprintf(stderr, L"%s: unable to register the resource\n", w_argv[0]);
+#else
+        fprintf(stderr, "%s: unable to register the resource\n", argv[0]);
+#endif
+        return 1;
+    }
+#endif
+
     // Initialise some Python globals.
     Py_FrozenFlag = 1;
     Py_NoSiteFlag = 1;
@@ -265,8 +285,17 @@ int pyqtdeploy_start(int argc, char **argv,
     Py_DECREF(py_filename);
 
     // Import the main module.
+#if defined(PYQTDEPLOY_PROFILE_IMPORTS)
+    pdytools_profile_begin();
+    int rc = PyImport_ImportFrozenModule(CONST_CAST(main_module));
+    pdytools_profile_end(QString::fromLatin1(main_module));
+
+    if (rc < 0)
+        return handle_exception();
+#else
     if (PyImport_ImportFrozenModule(CONST_CAST(main_module)) < 0)
         return handle_exception();
+#endif
 #else
     // Import the main module.
     PyObject *mod, *main_module_obj;
@@ -105,6 +105,17 @@ class ApplicationPage(QWidget):
                 textEdited=self._sys_path_changed)
         form.addRow("sys.path", self._sys_path_edit)
 
+        self._lazy_imports_edit = QLineEdit(
+                placeholderText="Lazily imported modules and packages",
+                whatsThis="A space separated list of the names of modules and "
+                        "packages that are imported lazily, i.e. a module is "
+                        "only executed when one of its attributes is first "
+                        "accessed. A package name includes all its "
+                        "sub-packages and modules. This requires Python v3.5 "
+                        "or later.",
+                textEdited=self._lazy_imports_changed)
+        form.addRow("Lazy imports", self._lazy_imports_edit)
+
         layout.addLayout(form, 0, 0)
 
         options_layout = BetterForm()
@@ -159,6 +170,7 @@ class ApplicationPage(QWidget):
         self._script_edit.setText(project.application_script)
         self._entry_point_edit.setText(project.application_entry_point)
         self._sys_path_edit.setText(project.sys_path)
+        self._lazy_imports_edit.setText(project.lazy_imports)
         self._package_edit.configure(project.application_package, project)
 
         blocked = self._py_version_edit.blockSignals(True)
@@ -234,6 +246,12 @@ class ApplicationPage(QWidget):
         self.project.sys_path = value.strip()
         self.project.modified = True
 
+    def _lazy_imports_changed(self, value):
+        """ Invoked when the user edits the lazily imported modules. """
+
+        self.project.lazy_imports = value.strip()
+        self.project.modified = True
+
     def _package_changed(self):
         """ Invoked when the user edits the application package. """
 
@@ -157,6 +157,9 @@ class ProjectGUI(QMainWindow):
         application_page.python_target_version_changed.connect(
                 standard_library_page.python_target_version_changed)
 
+        standard_library_page.pyqt_modules_changed.connect(
+                pyqt_page.pyqt_modules_changed)
+
         self.setCentralWidget(tabs)
 
     def _about(self):
@@ -65,6 +65,14 @@ class PyQtPage(QStackedWidget):
         self._pyqt4_page = _PyQtVersionPage(pyqt4_metadata)
         self.addWidget(self._pyqt4_page)
 
+    @pyqtSlot()
+    def pyqt_modules_changed(self):
+        """ Configure the page after the project's PyQt modules have been
+        changed elsewhere.
+        """
+
+        self._update_page()
+
     @pyqtSlot(bool)
     def set_pyqt_version(self, is_pyqt5):
         """ Configure the page according to the PyQt version. """
@@ -24,15 +24,19 @@
 # POSSIBILITY OF SUCH DAMAGE.
 
 
-from PyQt5.QtCore import pyqtSlot, Qt
+from PyQt5.QtCore import pyqtSignal, pyqtSlot, Qt
 from PyQt5.QtGui import QStandardItem, QStandardItemModel
-from PyQt5.QtWidgets import (QCheckBox, QGroupBox, QSplitter, QTabWidget,
-        QTreeView, QTreeWidget, QTreeWidgetItem, QTreeWidgetItemIterator,
-        QVBoxLayout, QWidget)
+from PyQt5.QtWidgets import (QApplication, QCheckBox, QGroupBox, QHBoxLayout,
+        QMessageBox, QPushButton, QSplitter, QTabWidget, QTreeView,
+        QTreeWidget, QTreeWidgetItem, QTreeWidgetItemIterator, QVBoxLayout,
+        QWidget)
 
 from ..metadata import external_libraries_metadata, get_python_metadata
 from ..platforms import Architecture, Platform
-from ..project import ExternalLibrary
+from ..project import ExternalLibrary, analyse_imports
+from ..user_exception import UserException
+
+from .exception_handlers import handle_user_exception
 
 
 class StandardLibraryPage(QSplitter):
@@ -41,6 +45,9 @@ class StandardLibraryPage(QSplitter):
     # The page's label.
     label = "Standard Library"
 
+    # Emitted when the project's PyQt modules are changed by the page.
+    pyqt_modules_changed = pyqtSignal()
+
     @property
     def project(self):
         """ The project property getter. """
@@ -82,6 +89,19 @@ class StandardLibraryPage(QSplitter):
 
         stdlib_layout.addWidget(self._stdlib_edit)
 
+        scan_imports = QPushButton("Scan imports",
+                whatsThis="Analyse the imports made by the application script "
+                        "or entry point and the application package (and any "
+                        "other packages that they import) and check only "
+                        "those standard library packages and modules, and "
+                        "PyQt modules, that are imported.",
+                clicked=self._scan_imports)
+
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+        button_layout.addWidget(scan_imports)
+        stdlib_layout.addLayout(button_layout)
+
         stdlib_pane.setLayout(stdlib_layout)
         self.addWidget(stdlib_pane)
 
@@ -229,6 +249,39 @@ class StandardLibraryPage(QSplitter):
 
         project.modified = True
 
+    def _scan_imports(self):
+        """ Invoked to set the modules from those imported by the application.
+        """
+
+        project = self._project
+
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+
+        try:
+            # Qt's threads make it unsafe to fork the GUI.
+            standard_library, pyqt_modules, missing = analyse_imports(project,
+                    use_threads=True)
+        except UserException as e:
+            QApplication.restoreOverrideCursor()
+            handle_user_exception(e, "Scan Imports", self)
+            return
+
+        QApplication.restoreOverrideCursor()
+
+        project.standard_library = standard_library
+        project.pyqt_modules = pyqt_modules
+
+        self._update_stdlib_editor()
+        self.pyqt_modules_changed.emit()
+
+        project.modified = True
+
+        if missing:
+            QMessageBox.information(self, "Scan Imports",
+                    "The following imported modules are not part of the "
+                    "application, the standard library or PyQt: {0}.".format(
+                            ', '.join(missing)))
+
 
 class _PlatformGui(QWidget):
     """ The platform-specific GUI. """
@@ -24,13 +24,22 @@
 # POSSIBILITY OF SUCH DAMAGE.
 
 
+import contextlib
+import json
 import os
 import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
 
 
 class MessageHandler:
     """ The MessageHandler class handles progress and verbose progress
-    messages.  This base implementation issues messages to the console.
+    messages and the spans of any phases being traced.  This base
+    implementation issues messages to the console.
     """
 
     def __init__(self, quiet, verbose):
@@ -42,6 +51,109 @@ class MessageHandler:
         self.quiet = quiet
         self.verbose = verbose
 
+        # The spans of the completed phases, None if tracing is disabled.
+        self.spans = None
+
+        # Set if the files written by each phase are counted.
+        self._count_files = False
+
+    def enable_tracing(self, count_files=False):
+        """ Enable the recording of the spans of phases.  If count_files is
+        set then the files written by each phase are also counted.  This means
+        scanning the phase's output directory at the start and end of each
+        phase which can take longer than the phase itself.
+        """
+
+        self.spans = []
+        self._count_files = count_files
+
+    @contextlib.contextmanager
+    def phase(self, name, output_dir=None):
+        """ A context manager that records a span for a phase if tracing is
+        enabled.  A span is a dict containing the wall and CPU (of the process
+        and of any sub-processes) times taken by the phase and the peak RSS at
+        the end of it.  If output_dir is specified and files are being counted
+        then the span also contains the number of files written to the
+        directory (or any sub-directory) and their total size.
+        """
+
+        if self.spans is None:
+            yield
+            return
+
+        if not self._count_files:
+            output_dir = None
+
+        if output_dir is not None:
+            before = _snapshot(output_dir)
+
+        start = time.time()
+        start_wall = time.perf_counter()
+        start_times = os.times()
+
+        try:
+            yield
+        finally:
+            end_wall = time.perf_counter()
+            end_times = os.times()
+
+            cpu = ((end_times.user - start_times.user) +
+                    (end_times.system - start_times.system))
+            children_cpu = (
+                    (end_times.children_user - start_times.children_user) +
+                    (end_times.children_system - start_times.children_system))
+
+            span = {
+                'name':         name,
+                'pid':          os.getpid(),
+                'start':        start,
+                'wall':         round(end_wall - start_wall, 6),
+                'cpu':          round(cpu, 6),
+                'children_cpu': round(children_cpu, 6),
+                'peak_rss':     _peak_rss(),
+            }
+
+            if output_dir is not None:
+                changed = _changed_files(before, _snapshot(output_dir))
+                span['files'] = len(changed)
+                span['bytes'] = sum(changed)
+
+            self.spans.append(span)
+
+            self.verbose_message(
+                    "{0} took {1:.2f}s (CPU {2:.2f}s)".format(name,
+                            span['wall'], cpu + children_cpu))
+
+    def add_spans(self, spans):
+        """ Add a sequence of spans created by another process. """
+
+        self.spans.extend(spans)
+
+    def write_trace(self, file_name):
+        """ Write the spans to a file in the Chrome trace event format.  The
+        other values of a span are the arguments of the corresponding event.
+        """
+
+        events = []
+
+        for span in sorted(self.spans, key=lambda s: s['start']):
+            args = {k: v for k, v in span.items()
+                    if k not in ('name', 'pid', 'start', 'wall')}
+
+            events.append({
+                'name':     span['name'],
+                'ph':       'X',
+                'ts':       int(span['start'] * 1000000),
+                'dur':      int(span['wall'] * 1000000),
+                'pid':      span['pid'],
+                'tid':      span['pid'],
+                'args':     args,
+            })
+
+        with open(file_name, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f,
+                    indent=1)
+
     def progress_message(self, message):
         """ Handle a progress message. """
 
@@ -59,7 +171,8 @@ class MessageHandler:
         message to somewhere other that stdout.
         """
 
-        print(message)
+        # Flush so that messages from concurrent builds are not held back.
+        print(message, flush=True)
 
     @classmethod
     def error(cls, message):
@@ -75,3 +188,48 @@ class MessageHandler:
             self.error("{0}: {1}".format(e.text, e.detail))
         else:
             self.error(e.text)
+
+
+def _changed_files(before, after):
+    """ Return the list of the sizes of the files that are new or have changed
+    between two snapshots.
+    """
+
+    return [state[0] for name, state in after.items()
+            if before.get(name) != state]
+
+
+def _peak_rss():
+    """ Return the peak resident set size in bytes of the process or of any
+    sub-process, or None if it is not known.
+    """
+
+    if resource is None:
+        return None
+
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+
+    # macOS reports bytes rather than kilobytes.
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _snapshot(dir_name):
+    """ Return a snapshot of the files in a directory as a dict of the (size,
+    modification time) of each file keyed by its name.
+    """
+
+    snapshot = {}
+
+    for dir_path, _, file_names in os.walk(dir_name):
+        for file_name in file_names:
+            path = os.path.join(dir_path, file_name)
+
+            try:
+                st = os.lstat(path)
+            except OSError:
+                continue
+
+            snapshot[path] = (st.st_size, st.st_mtime_ns)
+
+    return snapshot
@@ -28,4 +28,5 @@
 from .external_libs_metadata import *
 from .pyqt4 import *
 from .pyqt5 import *
-from .python_metadata import *
+from .python_metadata_table import get_python_metadata
+from .stdlib_module import supported_python_versions
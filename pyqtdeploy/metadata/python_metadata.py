@@ -24,88 +24,8 @@
 # POSSIBILITY OF SUCH DAMAGE.
 
 
-__all__ = ['ExtensionModule', 'get_python_metadata',
-        'supported_python_versions']
-
-
-# The latest supported version in each minor branch.
-_supported_branches = (
-    (3, 6, 5),
-    (3, 5, 5),
-    (3, 4, 8),
-    (3, 3, 7),
-    (2, 7, 15))
-
-
-# All supported versions.
-def _get_supported_versions():
-    for major, minor, patch in _supported_branches:
-        for p in range(patch, -1, -1):
-            yield (major, minor, p)
-
-supported_python_versions = tuple(_get_supported_versions())
-
-
-class StdlibModule:
-    """ Encapsulate the meta-data for a module in the standard library. """
-
-    def __init__(self, internal, target, deps, hidden_deps, core, builtin, defines, xlib, modules, source, libs, includepath, pyd, dlls):
-        """ Initialise the object. """
-
-        # Set if the module is internal.
-        self.internal = internal
-
-        # The target platform(s) of the module.
-        self.target = target
-
-        # The sequence of modules that this one is dependent on.
-        self.deps = (deps, ) if isinstance(deps, str) else deps
-
-        # The sequence of additional modules that this one is dependent on.
-        # These dependencies are hidden from the user and (most importantly)
-        # further sub-dependencies are ignored.  The use case is the warnings
-        # module in Python v3 which is a dependency of the core (for a simple
-        # function that should never be called) but drags in a lot of other
-        # stuff.
-        self.hidden_deps = (hidden_deps, ) if isinstance(hidden_deps, str) else hidden_deps
-
-        # Set if the module is always compiled in to the interpreter library
-        # (if it is an extension module) or if it is required (if it is a
-        # Python module).
-        self.core = core
-
-        # Set if the module is a core Python module that is embedded as a
-        # builtin.
-        self.builtin = builtin
-
-        # The sequence of (possibly scoped) DEFINES to add to the .pro file.
-        self.defines = (defines, ) if isinstance(defines, str) else defines
-
-        # The internal identifier of a required external library.
-        self.xlib = xlib
-
-        # The sequence of modules or sub-packages if this is a package,
-        # otherwise None.
-        self.modules = (modules, ) if isinstance(modules, str) else modules
-
-        # The sequence of (possibly scoped) source files relative to the
-        # Modules directory if this is an extension module, otherwise None.
-        self.source = (source, ) if isinstance(source, str) else source
-
-        # The sequence of (possibly scoped) LIBS to add to the .pro file.
-        self.libs = (libs, ) if isinstance(libs, str) else libs
-
-        # The sequence of (possibly scoped) directories relative to the Modules
-        # directory to add to INCLUDEPATH.
-        self.includepath = (includepath, ) if isinstance(includepath, str) else includepath
-
-        # The name of the extension module if it is implemented as a .pyd file
-        # included in the Windows installer from python.org.
-        self.pyd = pyd
-
-        # The sequence of additional DLLs needed by the extension module and
-        # included in the Windows installer from python.org.
-        self.dlls = (dlls, ) if isinstance(dlls, str) else dlls
+from .stdlib_module import (StdlibModule, supported_python_versions,
+        version_from_tuple)
 
 
 class VersionedModule:
@@ -4700,47 +4620,30 @@ _metadata = {
 }
 
 
-# Meta-data is read-only so we cache and re-use it if possible.
-_metadata_cache = {}
-
-
-def get_python_metadata(version):
-    """ Return the dict of StdlibModule instances for a particular version of
-    Python.  It is assumed that the version is valid.
+def get_python_metadata_records(nr):
+    """ Return a dict, keyed by module name, of the StdlibModule records for a
+    particular encoded version of Python.
     """
 
-    nr = _version_from_tuple(version)
-
-    # Use the cached value if there is one.
-    version_metadata = _metadata_cache.get(nr)
-    if version_metadata is not None:
-        return version_metadata
-
-    _metadata_cache[nr] = version_metadata = {}
+    version_metadata = {}
 
     for name, versions in _metadata.items():
         if not isinstance(versions, tuple):
             versions = (versions, )
 
         for versioned_module in versions:
-            min_nr = _version_from_tuple(versioned_module.min_version)
+            min_nr = version_from_tuple(versioned_module.min_version)
 
             if nr >= min_nr:
-                max_nr = _version_from_tuple(versioned_module.max_version)
+                max_nr = version_from_tuple(versioned_module.max_version)
 
                 if nr <= max_nr:
-                    version_metadata[name] = versioned_module.module
+                    version_metadata[name] = versioned_module.module.record
                     break
 
     return version_metadata
 
 
-def _version_from_tuple(version):
-    """ Convert a 3-tuple version to an integer. """
-
-    return (version[0] << 16) + (version[1] << 8) + version[2]
-
-
 if __name__ == '__main__':
 
     def check_modules(names, metadata, unused):
@@ -4773,11 +4676,11 @@ if __name__ == '__main__':
                 versions = (versions, )
 
             # Check the version numbers.
-            nr = _version_from_tuple((major, minor, patch))
+            nr = version_from_tuple((major, minor, patch))
             matches = []
             for module in versions:
-                min_nr = _version_from_tuple(module.min_version)
-                max_nr = _version_from_tuple(module.max_version)
+                min_nr = version_from_tuple(module.min_version)
+                max_nr = version_from_tuple(module.max_version)
 
                 if min_nr > max_nr:
                     print("Module '{0}' version numbers are swapped".format(name))
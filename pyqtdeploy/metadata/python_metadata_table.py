@@ -0,0 +1,166 @@
+# Copyright (c) 2018, Riverbank Computing Limited
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import hashlib
+import marshal
+import os
+import struct
+import tempfile
+
+from .stdlib_module import (StdlibModule, supported_python_versions,
+        version_from_tuple)
+
+
+# The meta-data in python_metadata.py is expensive to import so a compiled
+# version is kept in a table file which is created by write_table() when
+# pyqtdeploy is built.  The file starts with the size of a marshalled header as
+# a little-endian 32-bit integer.  The header is a tuple of the format version,
+# the SHA-256 hash of the contents of python_metadata.py that the table was
+# compiled from, and a dict, keyed by encoded Python version, of the offset
+# (relative to the end of the header) and length of a marshalled dict of the
+# StdlibModule records of each module.  The format version must be incremented
+# if the layout or the StdlibModule attributes change.
+_TABLE_FORMAT = 2
+
+_metadata_dir = os.path.dirname(os.path.abspath(__file__))
+_source_name = os.path.join(_metadata_dir, 'python_metadata.py')
+_table_name = os.path.join(_metadata_dir, 'python_metadata.table')
+
+
+# Meta-data is read-only so we cache and re-use it if possible.
+_metadata_cache = {}
+
+
+def get_python_metadata(version):
+    """ Return the dict of StdlibModule instances for a particular version of
+    Python.  It is assumed that the version is valid.
+    """
+
+    nr = version_from_tuple(version)
+
+    # Use the cached value if there is one.
+    version_metadata = _metadata_cache.get(nr)
+    if version_metadata is not None:
+        return version_metadata
+
+    records = _read_records(nr)
+    if records is None:
+        # Fall back to the (slower) source.
+        from .python_metadata import get_python_metadata_records
+
+        records = get_python_metadata_records(nr)
+
+    _metadata_cache[nr] = version_metadata = {name: StdlibModule(*record)
+            for name, record in records.items()}
+
+    return version_metadata
+
+
+def write_table(table_name):
+    """ Compile python_metadata.py and atomically write the records of all
+    supported versions of Python to a table file.  This is done when
+    pyqtdeploy is built rather than when it is used because it may be
+    installed in a directory that is read-only or shared between users.
+    """
+
+    from .python_metadata import get_python_metadata_records
+
+    # Many versions have identical meta-data so it is only written once.
+    index = {}
+    offsets = {}
+    blobs = []
+    offset = 0
+
+    for version in supported_python_versions:
+        version_nr = version_from_tuple(version)
+        data = marshal.dumps(get_python_metadata_records(version_nr))
+
+        data_offset = offsets.get(data)
+        if data_offset is None:
+            offsets[data] = data_offset = offset
+            blobs.append(data)
+            offset += len(data)
+
+        index[version_nr] = (data_offset, len(data))
+
+    header = marshal.dumps((_TABLE_FORMAT, _source_hash(), index))
+
+    table_dir = os.path.dirname(os.path.abspath(table_name))
+    fd, temp_name = tempfile.mkstemp(dir=table_dir)
+
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(struct.pack('<I', len(header)))
+            f.write(header)
+
+            for data in blobs:
+                f.write(data)
+
+        # mkstemp() creates the file so that it can only be read by the user.
+        os.chmod(temp_name, 0o644)
+
+        os.replace(temp_name, table_name)
+    except:
+        os.remove(temp_name)
+        raise
+
+
+def _read_records(nr):
+    """ Return the records for an encoded version of Python from the table
+    file or None if the table file is missing, out of date or doesn't contain
+    the version.
+    """
+
+    try:
+        with open(_table_name, 'rb') as f:
+            header_size, = struct.unpack('<I', f.read(4))
+            table_format, source_hash, index = marshal.loads(
+                    f.read(header_size))
+
+            if table_format != _TABLE_FORMAT:
+                return None
+
+            # If python_metadata.py is missing (eg. if pyqtdeploy has itself
+            # been deployed without it) then the table is authoritative.
+            # Otherwise it must have been compiled from the same source.
+            if os.path.exists(_source_name):
+                if source_hash != _source_hash():
+                    return None
+
+            offset, length = index[nr]
+
+            f.seek(4 + header_size + offset)
+
+            return marshal.loads(f.read(length))
+    except (OSError, EOFError, KeyError, TypeError, ValueError, struct.error):
+        return None
+
+
+def _source_hash():
+    """ Return the SHA-256 hash of the contents of python_metadata.py. """
+
+    with open(_source_name, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
@@ -0,0 +1,127 @@
+# Copyright (c) 2018, Riverbank Computing Limited
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+# The latest supported version in each minor branch.
+_supported_branches = (
+    (3, 6, 5),
+    (3, 5, 5),
+    (3, 4, 8),
+    (3, 3, 7),
+    (2, 7, 15))
+
+
+# All supported versions.
+def _get_supported_versions():
+    for major, minor, patch in _supported_branches:
+        for p in range(patch, -1, -1):
+            yield (major, minor, p)
+
+supported_python_versions = tuple(_get_supported_versions())
+
+
+def version_from_tuple(version):
+    """ Convert a 3-tuple version to an integer. """
+
+    return (version[0] << 16) + (version[1] << 8) + version[2]
+
+
+class StdlibModule:
+    """ Encapsulate the meta-data for a module in the standard library. """
+
+    # The names of the attributes in the order they are passed to __init__()
+    # and stored in a record.
+    __slots__ = ('internal', 'target', 'deps', 'hidden_deps', 'core',
+            'builtin', 'defines', 'xlib', 'modules', 'source', 'libs',
+            'includepath', 'pyd', 'dlls')
+
+    def __init__(self, internal, target, deps, hidden_deps, core, builtin,
+            defines, xlib, modules, source, libs, includepath, pyd, dlls):
+        """ Initialise the object. """
+
+        # Set if the module is internal.
+        self.internal = internal
+
+        # The target platform(s) of the module.
+        self.target = target
+
+        # The sequence of modules that this one is dependent on.
+        self.deps = (deps, ) if isinstance(deps, str) else deps
+
+        # The sequence of additional modules that this one is dependent on.
+        # These dependencies are hidden from the user and (most importantly)
+        # further sub-dependencies are ignored.  The use case is the warnings
+        # module in Python v3 which is a dependency of the core (for a simple
+        # function that should never be called) but drags in a lot of other
+        # stuff.
+        self.hidden_deps = ((hidden_deps, ) if isinstance(hidden_deps, str)
+                else hidden_deps)
+
+        # Set if the module is always compiled in to the interpreter library
+        # (if it is an extension module) or if it is required (if it is a
+        # Python module).
+        self.core = core
+
+        # Set if the module is a core Python module that is embedded as a
+        # builtin.
+        self.builtin = builtin
+
+        # The sequence of (possibly scoped) DEFINES to add to the .pro file.
+        self.defines = (defines, ) if isinstance(defines, str) else defines
+
+        # The internal identifier of a required external library.
+        self.xlib = xlib
+
+        # The sequence of modules or sub-packages if this is a package,
+        # otherwise None.
+        self.modules = (modules, ) if isinstance(modules, str) else modules
+
+        # The sequence of (possibly scoped) source files relative to the
+        # Modules directory if this is an extension module, otherwise None.
+        self.source = (source, ) if isinstance(source, str) else source
+
+        # The sequence of (possibly scoped) LIBS to add to the .pro file.
+        self.libs = (libs, ) if isinstance(libs, str) else libs
+
+        # The sequence of (possibly scoped) directories relative to the Modules
+        # directory to add to INCLUDEPATH.
+        self.includepath = ((includepath, ) if isinstance(includepath, str)
+                else includepath)
+
+        # The name of the extension module if it is implemented as a .pyd file
+        # included in the Windows installer from python.org.
+        self.pyd = pyd
+
+        # The sequence of additional DLLs needed by the extension module and
+        # included in the Windows installer from python.org.
+        self.dlls = (dlls, ) if isinstance(dlls, str) else dlls
+
+    @property
+    def record(self):
+        """ The tuple of attribute values from which an equivalent instance can
+        be created.
+        """
+
+        return tuple([getattr(self, name) for name in self.__slots__])
@@ -25,5 +25,6 @@
 
 
 # Publish the sub-package's API.
+from .import_analyser import analyse_imports
 from .project import (ExtensionModule, ExternalLibrary, Project, QrcDirectory,
         QrcFile, QrcPackage)
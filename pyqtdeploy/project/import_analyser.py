@@ -0,0 +1,353 @@
+# Copyright (c) 2017, Riverbank Computing Limited
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import ast
+import concurrent.futures
+import os
+import re
+
+from PyQt5.QtCore import QFileInfo
+
+from ..metadata import get_python_metadata, pyqt4_metadata, pyqt5_metadata
+from ..user_exception import UserException
+
+from .project import QrcDirectory
+
+
+# The minimum number of files to parse before it is worth doing so
+# concurrently.
+_MIN_CONCURRENT_FILES = 16
+
+# The modules that are part of every interpreter and so have no meta-data.
+_INTERPRETER_MODULES = ('__builtin__', '__main__', '_frozen_importlib',
+        '_frozen_importlib_external', 'builtins', 'sys')
+
+
+def analyse_imports(project, jobs=None, use_threads=False):
+    """ Find the standard library and PyQt modules imported by a project's
+    application script or entry point and application package, following
+    imports of any other modules in the application package and the other
+    packages.  jobs is the maximum number of files to parse concurrently, None
+    meaning one per CPU.  The files are parsed in separate processes unless
+    use_threads is set, which must be used if Qt has started any threads (eg.
+    in a GUI) because it isn't safe to fork the process.  Return a 3-tuple of
+    the sorted list of standard library module names, the sorted list of PyQt
+    module names and the sorted list of the names of any imported top-level
+    modules (including the module of the entry point) that could not be found.
+    Raise a UserException if there is an error.
+    """
+
+    # Find all the modules that will be embedded from source.
+    local_modules = {}
+
+    application_roots = []
+    imported = set()
+
+    if project.application_package.name is not None:
+        fi = QFileInfo(project.path_from_user(
+                project.application_package.name))
+
+        package_parts = []
+        if project.application_package.name != '':
+            package_parts.append(fi.completeBaseName())
+
+        _add_package_modules(local_modules,
+                project.application_package.contents,
+                fi.canonicalFilePath(), package_parts)
+
+        # Every module of the application package is analysed.
+        application_roots.extend(local_modules.keys())
+
+    for package in project.other_packages:
+        _add_package_modules(local_modules, package.contents,
+                project.path_from_user(package.name), [])
+
+    if project.application_script != '':
+        local_modules['__main__'] = (
+                project.path_from_user(project.application_script), False)
+        application_roots.append('__main__')
+    elif project.application_entry_point != '':
+        entry_module = project.application_entry_point.split(':')[0].strip()
+        application_roots.append(entry_module)
+
+        # Make sure the entry point's module is reported if it isn't part of
+        # the application.
+        imported.add(entry_module)
+
+    # Follow the imports a wave at a time so that the files in each wave can
+    # be parsed concurrently.
+    seen = set()
+    wave = []
+
+    def add_to_wave(name):
+        # Importing a module also imports its parent packages.
+        parts = name.split('.')
+
+        for i in range(1, len(parts) + 1):
+            module_name = '.'.join(parts[:i])
+
+            if module_name in local_modules and module_name not in seen:
+                seen.add(module_name)
+                path, is_package = local_modules[module_name]
+                wave.append((module_name, path, is_package))
+
+    for name in application_roots:
+        add_to_wave(name)
+
+    executor = None
+
+    try:
+        while wave:
+            jobs_wave = wave
+            wave = []
+
+            # Parsing concurrently is only worth it for larger waves.
+            if jobs != 1 and len(jobs_wave) >= _MIN_CONCURRENT_FILES:
+                if executor is None:
+                    if use_threads:
+                        executor = concurrent.futures.ThreadPoolExecutor(
+                                jobs)
+                    else:
+                        executor = concurrent.futures.ProcessPoolExecutor(
+                                jobs)
+
+                results = executor.map(_parse_imports, jobs_wave,
+                        chunksize=8)
+            else:
+                results = map(_parse_imports, jobs_wave)
+
+            for path, names, error in results:
+                if error is not None:
+                    raise UserException("unable to read {0}".format(path),
+                            detail=error)
+
+                for name in names:
+                    imported.add(name)
+                    add_to_wave(name)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    # Classify the imported names.
+    metadata = get_python_metadata(project.python_target_version)
+
+    if project.application_is_pyqt5:
+        pyqt_package = 'PyQt5'
+        pyqt_metadata = pyqt5_metadata
+    else:
+        pyqt_package = 'PyQt4'
+        pyqt_metadata = pyqt4_metadata
+
+    local_packages = set([name.split('.')[0] for name in local_modules])
+
+    standard_library = set()
+    pyqt_modules = set()
+    missing = set()
+
+    for name in imported:
+        parts = name.split('.')
+
+        if parts[0] in local_packages or parts[0] in _INTERPRETER_MODULES:
+            continue
+
+        if parts[0] == pyqt_package:
+            if len(parts) > 1 and parts[1] in pyqt_metadata:
+                pyqt_modules.add(parts[1])
+
+            continue
+
+        if name == 'sip':
+            pyqt_modules.add('sip')
+            continue
+
+        # Use the most specific module that is in the standard library.  Note
+        # that the name may be of an object in a module rather than a
+        # sub-module.
+        for i in range(len(parts), 0, -1):
+            module_name = '.'.join(parts[:i])
+            module = metadata.get(module_name)
+
+            if module is not None:
+                # Internal, core and builtin modules are included
+                # automatically when needed.
+                if not (module.internal or module.core or module.builtin):
+                    standard_library.add(module_name)
+
+                break
+        else:
+            missing.add(parts[0])
+
+    return sorted(standard_library), sorted(pyqt_modules), sorted(missing)
+
+
+def _add_package_modules(local_modules, contents, src_dir, package_parts):
+    """ Add the included Python modules of a package's contents to a dict
+    keyed by module name.
+    """
+
+    for content in contents:
+        if not content.included:
+            continue
+
+        if isinstance(content, QrcDirectory):
+            _add_package_modules(local_modules, content.contents,
+                    src_dir + '/' + content.name,
+                    package_parts + [content.name])
+        else:
+            base_name, ext = os.path.splitext(content.name)
+
+            if ext not in ('.py', '.pyw'):
+                continue
+
+            path = src_dir + '/' + content.name
+
+            if base_name == '__init__':
+                if package_parts:
+                    local_modules['.'.join(package_parts)] = (path, True)
+            else:
+                local_modules['.'.join(package_parts + [base_name])] = (path,
+                        False)
+
+
+def _parse_imports(job):
+    """ Return a 3-tuple of the name of a module's source file, the list of
+    absolute names that it imports and the text of any error.  Note that this
+    may be run in a separate process.
+    """
+
+    module_name, path, is_package = job
+
+    try:
+        with open(path, 'rb') as f:
+            source = f.read()
+    except OSError as e:
+        return path, None, str(e)
+
+    package = module_name if is_package else module_name.rpartition('.')[0]
+
+    try:
+        tree = ast.parse(source, path)
+    except (SyntaxError, ValueError):
+        # The source is probably for a different version of Python so fall
+        # back to a simple scan.
+        return path, _scan_imports(source, package), None
+
+    names = []
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                names.append(alias.name)
+
+        elif isinstance(node, ast.ImportFrom):
+            _add_from_import(names, node.module, node.level, package,
+                    [alias.name for alias in node.names])
+
+        elif isinstance(node, ast.Call):
+            # Handle calls to importlib.import_module() and __import__() with
+            # a literal name.
+            func = node.func
+
+            if isinstance(func, ast.Attribute):
+                func_name = func.attr
+            elif isinstance(func, ast.Name):
+                func_name = func.id
+            else:
+                continue
+
+            if func_name in ('import_module', '__import__') and node.args:
+                arg = node.args[0]
+
+                # Python v3.8 and later use Constant rather than Str.
+                if type(arg).__name__ in ('Constant', 'Str'):
+                    value = getattr(arg, 'value', getattr(arg, 's', None))
+
+                    if isinstance(value, str) and not value.startswith('.'):
+                        names.append(value)
+
+    return path, names, None
+
+
+# The regular expressions used to scan source code that cannot be parsed.
+_import_re = re.compile(r'^\s*import\s+([^#;\n]+)', re.MULTILINE)
+_from_import_re = re.compile(
+        r'^\s*from\s+(\.*)\s*([\w.]*)\s+import\s+\(?([^#;\n)]+)',
+        re.MULTILINE)
+
+
+def _scan_imports(source, package):
+    """ Return the list of absolute names imported by some source code using a
+    simple line based scan.
+    """
+
+    text = source.decode('utf8', errors='replace')
+    names = []
+
+    for m in _import_re.finditer(text):
+        for name in m.group(1).split(','):
+            name = name.split()
+            if name:
+                names.append(name[0])
+
+    for m in _from_import_re.finditer(text):
+        imported = []
+        for name in m.group(3).split(','):
+            name = name.split()
+            if name:
+                imported.append(name[0])
+
+        _add_from_import(names, m.group(2), len(m.group(1)), package,
+                imported)
+
+    return names
+
+
+def _add_from_import(names, module, level, package, imported):
+    """ Add the absolute names imported by a 'from' import to a list. """
+
+    if level > 0:
+        # Resolve the relative import.
+        parts = package.split('.') if package else []
+
+        if level - 1 > len(parts):
+            return
+
+        parts = parts[:len(parts) - (level - 1)]
+
+        if module:
+            parts.append(module)
+
+        module = '.'.join(parts)
+
+    if not module or module == '__future__':
+        return
+
+    names.append(module)
+
+    # Any of the imported names may be sub-modules.
+    for name in imported:
+        if name != '*':
+            names.append(module + '.' + name)
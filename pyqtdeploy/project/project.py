@@ -29,10 +29,12 @@ from xml.etree.ElementTree import Element, ElementTree, SubElement
 
 from PyQt5.QtCore import QDir, QFileInfo, QObject, pyqtSignal
 
-from ..metadata import get_python_metadata, supported_python_versions
+from ..metadata import supported_python_versions
 from ..platforms import Platform
 from ..user_exception import UserException
 
+from .stdlib_resolver import get_stdlib_resolver
+
 
 class Project(QObject):
     """ The encapsulation of a project. """
@@ -42,7 +44,7 @@ class Project(QObject):
     min_version = 4
 
     # The current project version.
-    version = 7
+    version = 8
 
     # Emitted when the modification state of the project changes.
     modified_changed = pyqtSignal(bool)
@@ -97,6 +99,7 @@ class Project(QObject):
         self.application_script = ''
         self.application_entry_point = ''
         self.external_libraries = {}
+        self.lazy_imports = ''
         self.other_extension_modules = []
         self.other_packages = []
         self.pyqt_modules = []
@@ -197,6 +200,17 @@ class Project(QObject):
 
         return fi
 
+    def get_lazy_imports(self):
+        """ Return the list of the names of the modules and packages that are
+        imported lazily.  Lazy imports are only supported by Python v3.5 and
+        later.
+        """
+
+        if self.python_target_version < (3, 5, 0):
+            return []
+
+        return self.lazy_imports.split()
+
     def get_stdlib_requirements(self, include_hidden=False):
         """ Return a 2-tuple of the required Python standard library modules
         and the required external libraries.  The modules are a dict with the
@@ -205,79 +219,32 @@ class Project(QObject):
         required.  The libraries are a set of well known library names.
         """
 
-        # Work out the dependencies.
-        metadata = get_python_metadata(self.python_target_version)
-        all_modules = {name: _DepState(module)
-                for name, module in metadata.items()}
+        # Lazy imports are implemented using importlib.util.LazyLoader.
+        implicit = ['importlib.util'] if self.get_lazy_imports() else []
 
-        visit = 0
-        for name in all_modules.keys():
-            self._set_dependency_state(all_modules, name, visit)
-            visit += 1
+        resolver = get_stdlib_resolver(self.python_target_version)
+        required, explicit = resolver.resolve(self.standard_library, implicit)
 
         # Extract the required modules and libraries.
         required_modules = {}
         required_libraries = set()
 
-        for name, dep_state in all_modules.items():
-            if dep_state.explicit:
-                explicit = True
-            elif dep_state.implicit:
-                explicit = False
-            else:
-                continue
+        for name in required:
+            module = resolver.metadata[name]
 
             # Handle any hidden dependencies if required.
             if include_hidden:
-                for hidden_dep in dep_state.module.hidden_deps:
+                for hidden_dep in module.hidden_deps:
                     if hidden_dep not in required_modules:
                         required_modules[hidden_dep] = False
 
-            required_modules[name] = explicit
+            required_modules[name] = (name in explicit)
 
-            if dep_state.module.xlib is not None:
-                required_libraries.add(dep_state.module.xlib)
+            if module.xlib is not None:
+                required_libraries.add(module.xlib)
 
         return required_modules, required_libraries
 
-    def _set_dependency_state(self, all_modules, name, visit, is_dep=False):
-        """ Set a module's dependency state. """
-
-        dep_state = all_modules[name]
-
-        if dep_state.visit == visit:
-            return
-
-        dep_state.visit = visit
-
-        if dep_state.module.builtin:
-            # This will mean that the explicit and implicit states will remain
-            # None and so the module will be omitted from the list.
-            return
-
-        dep_state.explicit = (name in self.standard_library)
-
-        if dep_state.module.core or is_dep:
-            dep_state.implicit = True
-
-        for dep in dep_state.module.deps:
-            # If the first character of the module is '?' then it should be
-            # excluded if SSL support is disabled.  If the first character is
-            # '!' then it should be excluded if SSL support is enabled.
-            if dep[0] == '?':
-                if 'ssl' not in self.standard_library:
-                    continue
-
-                dep = dep[1:]
-            elif dep[0] == '!':
-                if 'ssl' in self.standard_library:
-                    continue
-
-                dep = dep[1:]
-
-            self._set_dependency_state(all_modules, dep, visit,
-                    (dep_state.explicit or dep_state.implicit))
-
     @classmethod
     def load(cls, file_name):
         """ Return a new project loaded from the given file.  Raise a
@@ -364,6 +331,9 @@ class Project(QObject):
         project.application_script = application.get('script', '')
         project.sys_path = application.get('syspath', '')
 
+        # This was added in version 8.
+        project.lazy_imports = application.get('lazyimports', '')
+
         # Any qmake configuration. This was added in version 5.
         qmake_configuration = application.find('QMakeConfiguration')
 
@@ -573,6 +543,7 @@ class Project(QObject):
             'ispyqt5': str(int(self.application_is_pyqt5)),
             'isconsole': str(int(self.application_is_console)),
             'isbundle': str(int(self.application_is_bundle)),
+            'lazyimports': self.lazy_imports,
             'name': self.application_name,
             'script': self.application_script,
             'syspath': self.sys_path})
@@ -775,17 +746,3 @@ class ExtensionModule():
         self.defines = defines
         self.includepath = includepath
         self.libs = libs
-
-
-class _DepState:
-    """ Encapsulate the state information required when working out module
-    dependencies.
-    """
-
-    def __init__(self, module):
-        """ Initialise the object. """
-
-        self.module = module
-        self.explicit = False
-        self.implicit = False
-        self.visit = -1
@@ -0,0 +1,203 @@
+# Copyright (c) 2017, Riverbank Computing Limited
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+from collections import OrderedDict
+
+from ..metadata import get_python_metadata
+
+
+class StdlibResolver:
+    """ Work out which standard library modules are required by a selection of
+    modules for a particular version of Python.  The dependency graphs are
+    computed once and results are memoised.  A selection that differs from the
+    previous one by a single module is resolved incrementally.
+    """
+
+    # The maximum number of memoised results.
+    _max_results = 32
+
+    def __init__(self, metadata):
+        """ Initialise the object. """
+
+        self.metadata = metadata
+
+        # Builtin modules are never required and their dependencies are
+        # ignored so they are left out of the graphs completely.
+        names = [name for name, module in metadata.items()
+                if not module.builtin]
+
+        self._core = frozenset(
+                [name for name in names if metadata[name].core])
+
+        # There are separate graphs for when SSL support is enabled and when it
+        # is disabled.  Each is a 2-tuple of the forward and reverse graphs.
+        self._graphs = {}
+
+        for ssl in (False, True):
+            forward = {}
+            reverse = {name: [] for name in names}
+
+            for name in names:
+                deps = []
+
+                for dep in metadata[name].deps:
+                    # If the first character of the module is '?' then it
+                    # should be excluded if SSL support is disabled.  If the
+                    # first character is '!' then it should be excluded if SSL
+                    # support is enabled.
+                    if dep[0] == '?':
+                        if not ssl:
+                            continue
+
+                        dep = dep[1:]
+                    elif dep[0] == '!':
+                        if ssl:
+                            continue
+
+                        dep = dep[1:]
+
+                    if dep in reverse:
+                        deps.append(dep)
+                        reverse[dep].append(name)
+
+                forward[name] = deps
+
+            self._graphs[ssl] = (forward, reverse)
+
+        self._results = OrderedDict()
+        self._last = None
+
+    def resolve(self, selection, implicit=()):
+        """ Return a 2-tuple of the frozenset of names of all the modules
+        required by a selection of module names and the frozenset of names of
+        the selected modules that are required.  implicit is a sequence of the
+        names of any additional modules that are implicitly required.
+        """
+
+        nodes = self._graphs[False][0]
+
+        explicit = frozenset([name for name in selection if name in nodes])
+        implicit = frozenset([name for name in implicit if name in nodes])
+        ssl = ('ssl' in selection)
+
+        key = (explicit, implicit, ssl)
+
+        required = self._results.get(key)
+
+        if required is None:
+            roots = explicit | implicit | self._core
+
+            required = self._resolve_incrementally(key, roots)
+            if required is None:
+                required = self._closure(self._graphs[ssl][0], roots)
+
+            self._results[key] = required
+
+            if len(self._results) > self._max_results:
+                self._results.popitem(last=False)
+        else:
+            self._results.move_to_end(key)
+
+        self._last = (key, required)
+
+        return required, explicit
+
+    def _resolve_incrementally(self, key, roots):
+        """ Return the frozenset of required modules derived from the previous
+        result or None if the previous result cannot be used.
+        """
+
+        if self._last is None:
+            return None
+
+        (last_explicit, last_implicit, last_ssl), last_required = self._last
+        explicit, implicit, ssl = key
+
+        if implicit != last_implicit or ssl != last_ssl:
+            return None
+
+        forward, reverse = self._graphs[ssl]
+
+        added = explicit - last_explicit
+        removed = last_explicit - explicit
+
+        if len(added) == 1 and not removed:
+            # Everything that the new module depends on is now also required.
+            return self._closure(forward, added, set(last_required))
+
+        if len(removed) == 1 and not added:
+            # Any module that can only be reached from the removed module may
+            # no longer be required.
+            candidates = self._closure(forward, removed)
+
+            kept = last_required - candidates
+
+            # A candidate is still required if it is a root or if it is a
+            # dependency of a module that is still required.
+            supported = [name for name in candidates
+                    if name in roots or any([dependent in kept
+                            for dependent in reverse[name]])]
+
+            return self._closure(forward, supported, set(kept))
+
+        return None
+
+    @staticmethod
+    def _closure(forward, names, required=None):
+        """ Return the frozenset of modules that are reachable from a sequence
+        of module names.  required is an optional set of modules that are
+        already known to be required.
+        """
+
+        if required is None:
+            required = set()
+
+        stack = [name for name in names if name not in required]
+        required.update(stack)
+
+        while stack:
+            for dep in forward[stack.pop()]:
+                if dep not in required:
+                    required.add(dep)
+                    stack.append(dep)
+
+        return frozenset(required)
+
+
+# The resolvers for each version of Python.
+_resolvers = {}
+
+
+def get_stdlib_resolver(version):
+    """ Return the StdlibResolver instance for a particular version of Python.
+    """
+
+    resolver = _resolvers.get(version)
+    if resolver is None:
+        resolver = StdlibResolver(get_python_metadata(version))
+        _resolvers[version] = resolver
+
+    return resolver
@@ -26,8 +26,8 @@
 
 import argparse
 
-from . import (Builder, MessageHandler, Project, PYQTDEPLOY_RELEASE,
-        UserException)
+from . import (Builder, BuildOptions, MessageHandler, Project,
+        PYQTDEPLOY_RELEASE, UserException)
 
 
 def main():
@@ -37,13 +37,46 @@ def main():
     # Parse the command line.
     parser = argparse.ArgumentParser()
 
+    parser.add_argument('--auto-stdlib',
+            help="find the standard library and PyQt modules by analysing "
+                    "the imports of the application",
+            action='store_true')
+    parser.add_argument('--binary-resource',
+            help="write the resources to a single binary file that is linked "
+                    "directly into the application rather than compiled by "
+                    "rcc",
+            action='store_true')
     parser.add_argument('--build-dir', help="the name of the build directory",
             metavar="DIR")
+    parser.add_argument('--cache-dir',
+            help="the name of the directory containing the cache of frozen "
+                    "Python code",
+            metavar="DIR")
+    parser.add_argument('--cache-size',
+            help="the maximum size of the cache of frozen Python code in "
+                    "megabytes [default: 256]",
+            metavar="MB", type=int)
+    parser.add_argument('--compress',
+            help="the zlib compression level (0 to 9) of the frozen Python "
+                    "code where 0 is no compression [default: decided by rcc]",
+            metavar="LEVEL", type=int, choices=range(10)),
+    parser.add_argument('--import-trace',
+            help="omit the implicitly required standard library modules not "
+                    "imported according to an import trace",
+            metavar="FILE")
     parser.add_argument('--include-dir',
             help="the target Python include directory", metavar="DIR")
+    parser.add_argument('--incremental',
+            help="only update those files in the build directory whose "
+                    "contents have changed",
+            action='store_true')
     parser.add_argument('--interpreter',
             help="the host interpreter executable",
             metavar="EXECUTABLE")
+    parser.add_argument('--jobs',
+            help="the number of files to freeze concurrently [default: the "
+                    "number of CPUs]",
+            metavar="N", type=int),
     parser.add_argument('--no-clean',
             help="do not delete and re-create the build directory before "
                     "starting",
@@ -52,18 +85,42 @@ def main():
             help="the optimisation level where 0 is none, 1 is no asserts, 2 "
                     "is no asserts or docstrings [default: 2]",
             metavar="LEVEL", type=int, choices=range(3), default=2),
+    parser.add_argument('--packed',
+            help="place all frozen Python modules in a single packed resource",
+            action='store_true')
+    parser.add_argument('--profile-imports',
+            help="make the application write a profile of the time taken to "
+                    "import each module",
+            action='store_true')
     parser.add_argument('--python-library', help="the target Python library",
             metavar="LIB")
+    parser.add_argument('--reproducible',
+            help="make sure the build directory contents are always the same "
+                    "for the same inputs and write a manifest of their hashes",
+            action='store_true')
     parser.add_argument('--resources',
-            help="the number of .qrc resource files to generate [default: 1]",
+            help="the number of .qrc resource files to generate, 0 meaning "
+                    "the number is chosen automatically [default: 1]",
             metavar="NUMBER", type=int, default=1),
     parser.add_argument('--source-dir',
             help="the Python source code directory", metavar="DIR")
     parser.add_argument('--standard-library-dir',
             help="the target Python standard library directory", metavar="DIR")
+    parser.add_argument('--strip',
+            help="strip docstrings, filenames or line numbers from the frozen "
+                    "Python code (may be specified more than once)",
+            choices=('docstrings', 'filenames', 'lines'), action='append'),
     parser.add_argument('--sysroot', help="the system image root directory",
             metavar="DIR")
     parser.add_argument('--target', help="the target architecture"),
+    parser.add_argument('--trace',
+            help="write the timings and resource usage of each phase to FILE "
+                    "in the Chrome trace event format",
+            metavar="FILE")
+    parser.add_argument('--trace-files',
+            help="also record the number and size of the files written by "
+                    "each phase (which may be slow)",
+            action='store_true')
     parser.add_argument('--quiet', help="disable progress messages",
             action='store_true')
     parser.add_argument('--verbose', help="enable verbose progress messages",
@@ -77,22 +134,66 @@ def main():
     # Perform the build.
     message_handler = MessageHandler(args.quiet, args.verbose)
 
-    if args.resources < 1:
+    if args.resources < 0:
         message_handler.error(
-                "error: argument --resources: number must be at least 1")
+                "error: argument --resources: number must not be negative")
         return 2
 
+    if args.cache_size is not None and args.cache_size < 0:
+        message_handler.error(
+                "error: argument --cache-size: size must not be negative")
+        return 2
+
+    if args.jobs is not None and args.jobs < 1:
+        message_handler.error(
+                "error: argument --jobs: number must be at least 1")
+        return 2
+
+    if args.trace:
+        message_handler.enable_tracing(count_files=args.trace_files)
+
+    # An incremental build implies --no-clean.
+    if args.incremental:
+        args.clean = False
+
+    options = BuildOptions()
+    options.jobs = args.jobs
+    options.cache_dir = args.cache_dir
+    options.cache_size = args.cache_size
+    options.incremental = args.incremental
+    options.packed = args.packed
+    options.profile_imports = args.profile_imports
+    options.auto_stdlib = args.auto_stdlib
+    options.import_trace = args.import_trace
+    options.strip = args.strip
+    options.compress = args.compress
+    options.reproducible = args.reproducible
+    options.binary_resource = args.binary_resource
+
+    rc = 0
+
     try:
         builder = Builder(Project.load(args.project), args.target,
                 message_handler)
 
-        builder.build(args.opt, args.resources, args.clean, args.sysroot,
-                build_dir=args.build_dir, include_dir=args.include_dir,
-                interpreter=args.interpreter,
-                python_library=args.python_library, source_dir=args.source_dir,
-                standard_library_dir=args.standard_library_dir)
+        with message_handler.phase("build"):
+            builder.build(args.opt, args.resources, args.clean, args.sysroot,
+                    build_dir=args.build_dir, include_dir=args.include_dir,
+                    interpreter=args.interpreter,
+                    python_library=args.python_library,
+                    source_dir=args.source_dir,
+                    standard_library_dir=args.standard_library_dir,
+                    options=options)
     except UserException as e:
         message_handler.exception(e)
-        return 1
+        rc = 1
+
+    if args.trace:
+        try:
+            message_handler.write_trace(args.trace)
+        except OSError as e:
+            message_handler.error(
+                    "unable to write {0}: {1}".format(args.trace, e.strerror))
+            rc = 1
 
-    return 0
+    return rc
@@ -38,8 +38,16 @@ def main():
     # Parse the command line.
     parser = argparse.ArgumentParser()
 
+    parser.add_argument('--cache-dir',
+            help="the name of the directory containing the cache of built "
+                    "components",
+            metavar="DIR")
     parser.add_argument('--component', help="the component name to build",
             action='append')
+    parser.add_argument('--jobs',
+            help="the maximum number of components to build concurrently and "
+                    "of make jobs to run at the same time",
+            metavar="N", type=int, default=1)
     parser.add_argument('--no-clean',
             help="do not remove the temporary build directory",
             action='store_true')
@@ -55,6 +63,14 @@ def main():
     parser.add_argument('--sysroot', help="the system image root directory",
             metavar="DIR")
     parser.add_argument('--target', help="the target architecture"),
+    parser.add_argument('--trace',
+            help="write the timings and resource usage of each phase to FILE "
+                    "in the Chrome trace event format",
+            metavar="FILE")
+    parser.add_argument('--trace-files',
+            help="also record the number and size of the files written by "
+                    "each phase (which may be slow)",
+            action='store_true')
     parser.add_argument('--quiet', help="disable progress messages",
             action='store_true')
     parser.add_argument('--verbose', help="enable verbose progress messages",
@@ -69,6 +85,16 @@ def main():
     # Perform the required action.
     message_handler = MessageHandler(args.quiet, args.verbose)
 
+    if args.jobs < 1:
+        message_handler.error(
+                "error: argument --jobs: number must be at least 1")
+        return 2
+
+    if args.trace:
+        message_handler.enable_tracing(count_files=args.trace_files)
+
+    rc = 0
+
     try:
         sysroot_dir = args.sysroot
         if not sysroot_dir:
@@ -80,9 +106,19 @@ def main():
         if args.options:
             sysroot.show_options(args.component)
         else:
-            sysroot.build_components(args.component, args.no_clean)
+            with message_handler.phase("build"):
+                sysroot.build_components(args.component, args.no_clean,
+                        jobs=args.jobs, cache_dir=args.cache_dir)
     except UserException as e:
         message_handler.exception(e)
-        return 1
+        rc = 1
+
+    if args.trace:
+        try:
+            message_handler.write_trace(args.trace)
+        except OSError as e:
+            message_handler.error(
+                    "unable to write {0}: {1}".format(args.trace, e.strerror))
+            rc = 1
 
-    return 0
+    return rc
@@ -30,6 +30,12 @@ from abc import ABC, abstractmethod
 class ComponentBase(ABC):
     """ The base class for the implementation of a component plugin. """
 
+    # A sequence of the names of the components that must be built before this
+    # one.  Names of components that are not in the specification file are
+    # ignored.  None means that the component depends on every component that
+    # precedes it in the specification file.
+    dependencies = None
+
     # A sequence of ComponentOption instances describing the options that can
     # be specified for the component in the specification file.  These are made
     # available as attributes of the plugin instance.
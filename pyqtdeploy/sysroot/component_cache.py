@@ -0,0 +1,344 @@
+# Copyright (c) 2018, Riverbank Computing Limited
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import hashlib
+import inspect
+import json
+import os
+import platform
+import shlex
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+
+from ..version import PYQTDEPLOY_RELEASE
+
+
+class ComponentCache:
+    """ A persistent cache of the files installed in a system image root
+    directory by each component.  An entry is keyed by everything that affects
+    the build of the component: the version of pyqtdeploy, the plugin's
+    implementation, the values of its options, the sysroot directory, the host
+    and target architectures, the toolchain, the keys of the components it
+    depends on and the contents of the files (usually source archives) it finds
+    when it is built.
+    """
+
+    # The version of the format of the cache which must be changed whenever the
+    # contents of an entry or the way its key is computed changes.
+    FORMAT = 2
+
+    # The environment variables that affect the toolchain.
+    ENVIRONMENT = ('ANDROID_NDK_PLATFORM', 'ANDROID_NDK_ROOT',
+            'ANDROID_NDK_TOOLCHAIN_VERSION', 'ANDROID_SDK_ROOT', 'AR', 'CC',
+            'CFLAGS', 'CPPFLAGS', 'CXX', 'CXXFLAGS', 'DEVELOPER_DIR',
+            'INCLUDE', 'IPHONEOS_DEPLOYMENT_TARGET', 'LDFLAGS', 'LIB', 'LIBS',
+            'MACOSX_DEPLOYMENT_TARGET', 'QMAKESPEC', 'SDKROOT')
+
+    def __init__(self, cache_dir):
+        """ Initialise the cache. """
+
+        self.cache_dir = os.path.join(os.path.abspath(cache_dir),
+                'components')
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        # The hashes of the files found by components.
+        self._file_hashes = {}
+
+        # The key of the toolchain.  This is computed when first needed, ie.
+        # before any component has been built and had the chance to change
+        # the environment.
+        self._toolchain_key = None
+
+    def get_inputs_key(self, component, sysroot, dependency_keys):
+        """ Return the key of everything that affects the build of a component
+        except the files it finds when it is built.  dependency_keys is a dict
+        of the keys of the components it depends on.
+        """
+
+        hasher = _Hasher()
+
+        hasher.add(self.FORMAT, PYQTDEPLOY_RELEASE, component.name,
+                sysroot.sysroot_dir, sysroot.target_arch_name,
+                self._get_toolchain_key(sysroot))
+
+        plugin_type = type(component)
+
+        try:
+            plugin_file = inspect.getsourcefile(plugin_type)
+        except TypeError:
+            plugin_file = None
+
+        hasher.add(plugin_type.__module__, plugin_type.__qualname__,
+                self._hash_file(plugin_file) if plugin_file else None)
+
+        for option in component.options:
+            hasher.add(option.name, repr(getattr(component, option.name)))
+
+        for name in sorted(dependency_keys.keys()):
+            hasher.add(name, dependency_keys[name])
+
+        return hasher.hexdigest()
+
+    def get_key(self, inputs_key, found_files):
+        """ Return the key of an entry given the key of the inputs of the
+        component and the names of the files it found when it was built.
+        """
+
+        hasher = _Hasher()
+
+        hasher.add(inputs_key)
+
+        for file_name in sorted(set(found_files)):
+            hasher.add(file_name, self._hash_file(file_name))
+
+        return hasher.hexdigest()
+
+    def lookup(self, inputs_key):
+        """ Return the key of the entry for a component with the given inputs
+        or None if there is no such entry.
+        """
+
+        try:
+            with open(self._found_files_name(inputs_key)) as f:
+                found_files = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        key = self.get_key(inputs_key, found_files)
+
+        if not os.path.isfile(self._archive_name(key)):
+            return None
+
+        return key
+
+    def restore(self, key, sysroot_dir):
+        """ Restore the files of an entry to a sysroot directory. """
+
+        # The archive is trusted but the default extraction filter of later
+        # versions of Python would reject absolute symbolic links.
+        kwds = {'filter': 'tar'} if hasattr(tarfile, 'tar_filter') else {}
+
+        with tarfile.open(self._archive_name(key)) as tf:
+            tf.extractall(sysroot_dir, **kwds)
+
+    def store(self, inputs_key, found_files, sysroot_dir, file_names):
+        """ Store the named files (relative to a sysroot directory) installed
+        by a component and return the key of the new entry.
+        """
+
+        key = self.get_key(inputs_key, found_files)
+
+        fd, temp_name = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                with tarfile.open(fileobj=f, mode='w:gz',
+                        compresslevel=1) as tf:
+                    for file_name in file_names:
+                        tf.add(os.path.join(sysroot_dir, file_name),
+                                arcname=file_name, recursive=False)
+
+            os.replace(temp_name, self._archive_name(key))
+        except:
+            os.remove(temp_name)
+            raise
+
+        # Record the files found so that the key can be recomputed without
+        # building the component.
+        fd, temp_name = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+
+        with os.fdopen(fd, 'w') as f:
+            json.dump(sorted(set(found_files)), f)
+
+        os.replace(temp_name, self._found_files_name(inputs_key))
+
+        return key
+
+    @staticmethod
+    def snapshot(sysroot_dir, excluded):
+        """ Return a snapshot of the contents of a sysroot directory excluding
+        a sequence of top-level names.  The snapshot is a dict keyed by the
+        name of each file and directory relative to the sysroot directory.
+        """
+
+        snapshot = {}
+
+        for dir_path, dir_names, file_names in os.walk(sysroot_dir):
+            rel_dir = os.path.relpath(dir_path, sysroot_dir)
+
+            if rel_dir == '.':
+                rel_dir = ''
+                dir_names[:] = [d for d in dir_names if d not in excluded]
+                file_names = [f for f in file_names if f not in excluded]
+
+            for name in dir_names:
+                snapshot[os.path.join(rel_dir, name)] = None
+
+            for name in file_names:
+                rel_name = os.path.join(rel_dir, name)
+                st = os.lstat(os.path.join(sysroot_dir, rel_name))
+                snapshot[rel_name] = (st.st_mode, st.st_size, st.st_mtime_ns)
+
+        return snapshot
+
+    @staticmethod
+    def changes(before, after):
+        """ Return the sorted list of the names of the files and directories
+        that are new or have changed between two snapshots.
+        """
+
+        return sorted([name for name, state in after.items()
+                if name not in before or before[name] != state])
+
+    def _archive_name(self, key):
+        """ Return the name of the archive of an entry. """
+
+        return os.path.join(self.cache_dir, key + '.tar.gz')
+
+    def _found_files_name(self, inputs_key):
+        """ Return the name of the file containing the names of the files
+        found when a component with the given inputs was last built.
+        """
+
+        return os.path.join(self.cache_dir, inputs_key + '.json')
+
+    def _get_toolchain_key(self, sysroot):
+        """ Return the key of the toolchain used to build the components. """
+
+        if self._toolchain_key is None:
+            hasher = _Hasher()
+
+            hasher.add(sys.platform, platform.machine(), sysroot.android_api,
+                    sysroot.apple_sdk)
+
+            for name in self.ENVIRONMENT:
+                hasher.add(name, os.environ.get(name))
+
+            hasher.add(_compiler_identity())
+
+            self._toolchain_key = hasher.hexdigest()
+
+        return self._toolchain_key
+
+    def _hash_file(self, file_name):
+        """ Return the hash of the contents of a file (or None if it can't be
+        read).  The hash of a directory (eg. an existing installation) is that
+        of the name, size and modification time of every file it contains.
+        """
+
+        file_hash = self._file_hashes.get(file_name)
+
+        if file_hash is None:
+            hasher = hashlib.sha256()
+
+            try:
+                if os.path.isdir(file_name):
+                    _hash_dir(hasher, file_name)
+                else:
+                    with open(file_name, 'rb') as f:
+                        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                            hasher.update(chunk)
+            except OSError:
+                return None
+
+            file_hash = self._file_hashes[file_name] = hasher.hexdigest()
+
+        return file_hash
+
+
+def _compiler_identity():
+    """ Return a string that identifies the host C and C++ compilers. """
+
+    if sys.platform == 'win32':
+        # cl displays its version when run without arguments.
+        commands = [['cl']]
+    else:
+        commands = [shlex.split(os.environ.get('CC', 'cc')) + ['--version'],
+                shlex.split(os.environ.get('CXX', 'c++')) + ['--version']]
+
+    identity = []
+
+    for argv in commands:
+        exe = shutil.which(argv[0])
+
+        if exe is None:
+            identity.append(argv[0] + ' not found')
+            continue
+
+        try:
+            output = subprocess.run(argv, stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL,
+                    timeout=60).stdout
+        except (OSError, subprocess.SubprocessError) as e:
+            output = str(e).encode('utf-8')
+
+        identity.append(exe)
+        identity.append(output.decode('utf-8', 'replace'))
+
+    return '\n'.join(identity)
+
+
+def _hash_dir(hasher, dir_name):
+    """ Update a hasher with the name, size and modification time of every
+    file in a directory.
+    """
+
+    for dir_path, dir_names, file_names in os.walk(dir_name):
+        dir_names.sort()
+
+        rel_dir = os.path.relpath(dir_path, dir_name)
+
+        for name in sorted(file_names):
+            st = os.lstat(os.path.join(dir_path, name))
+
+            hasher.update(
+                    '{0}\0{1}\0{2}\0'.format(os.path.join(rel_dir, name),
+                            st.st_size, st.st_mtime_ns).encode('utf-8'))
+
+
+class _Hasher:
+    """ Compute a SHA-256 hash of a sequence of values. """
+
+    def __init__(self):
+        """ Initialise the object. """
+
+        self._hasher = hashlib.sha256()
+
+    def add(self, *values):
+        """ Add a number of values. """
+
+        for value in values:
+            self._hasher.update(str(value).encode('utf-8'))
+            self._hasher.update(b'\0')
+
+    def hexdigest(self):
+        """ Return the hash as a string. """
+
+        return self._hasher.hexdigest()
@@ -34,6 +34,9 @@ from ... import ComponentBase, ComponentOption
 class OpenSSLComponent(ComponentBase):
     """ The OpenSSL component. """
 
+    # The components that must be built first.
+    dependencies = []
+
     # The component options.
     options = [
         ComponentOption('no_asm', type=bool,
@@ -153,6 +156,8 @@ class OpenSSLComponent(ComponentBase):
         args = ['perl', 'Configure', 'shared', 'android']
         args.extend(common_options)
 
+        # OpenSSL v1.0 doesn't support parallel builds so run_make() isn't
+        # used.
         sysroot.run(*args)
         sysroot.run(sysroot.host_make, 'depend')
         sysroot.run(sysroot.host_make,
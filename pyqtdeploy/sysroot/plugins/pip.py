@@ -30,6 +30,9 @@ from ... import ComponentBase, ComponentOption
 class pipComponent(ComponentBase):
     """ The pip meta-component. """
 
+    # The components that must be built first.
+    dependencies = ['python']
+
     # The component options.
     options = [
         ComponentOption('packages', type=list, required=True,
@@ -32,6 +32,9 @@ from ... import ComponentBase, ComponentOption
 class PyQt3DComponent(ComponentBase):
     """ The PyQt3D component. """
 
+    # The components that must be built first.
+    dependencies = ['pyqt5']
+
     # The component options.
     options = [
         ComponentOption('source', required=True,
@@ -80,5 +83,5 @@ module_dir = {5}
             args.append('--verbose')
 
         sysroot.run(*args)
-        sysroot.run(sysroot.host_make)
-        sysroot.run(sysroot.host_make, 'install')
+        sysroot.run_make()
+        sysroot.run_make('install')
@@ -32,6 +32,9 @@ from ... import ComponentBase, ComponentOption
 class PyQt5Component(ComponentBase):
     """ The PyQt5 component. """
 
+    # The components that must be built first.
+    dependencies = ['python', 'qt5', 'sip']
+
     # The component options.
     options = [
         ComponentOption('disabled_features', type=list,
@@ -89,14 +92,15 @@ pyqt_modules = {6}
             sysroot.host_qmake, '--sysroot', sysroot.sysroot_dir, '--no-tools',
             '--no-qsci-api', '--no-designer-plugin', '--no-python-dbus',
             '--no-qml-plugin', '--no-stubs', '--configuration', cfg_name,
-            '--sip', sysroot.host_sip, '--confirm-license', '-c', '-j2']
+            '--sip', sysroot.host_sip, '--confirm-license', '-c', '-j',
+            str(max(2, sysroot.jobs))]
 
         if sysroot.verbose_enabled:
             args.append('--verbose')
 
         sysroot.run(*args)
-        sysroot.run(sysroot.host_make)
-        sysroot.run(sysroot.host_make, 'install')
+        sysroot.run_make()
+        sysroot.run_make('install')
 
     def configure(self, sysroot):
         """ Complete the configuration of the component. """
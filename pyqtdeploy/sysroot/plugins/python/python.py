@@ -50,6 +50,13 @@ class PythonComponent(ComponentBase):
                 help="The archive containing the Python source code."),
     ]
 
+    @property
+    def dependencies(self):
+        """ The components that must be built first. """
+
+        # qmake is used to build the target Python from source.
+        return ['qt5'] if self.build_target_from_source else []
+
     def build(self, sysroot):
         """ Build Python for the host and target. """
 
@@ -157,7 +164,10 @@ class PythonComponent(ComponentBase):
         if launcher is not None:
             del os.environ['__PYVENV_LAUNCHER__']
 
-        sysroot.run(sysroot.host_make)
+        sysroot.run_make()
+
+        # The install target of the Python Makefile doesn't support parallel
+        # jobs.
         sysroot.run(sysroot.host_make, 'install')
 
         if launcher is not None:
@@ -211,8 +221,8 @@ class PythonComponent(ComponentBase):
 
         # Do the build.
         sysroot.run(sysroot.host_qmake, 'SYSROOT=' + sysroot.sysroot_dir)
-        sysroot.run(sysroot.host_make)
-        sysroot.run(sysroot.host_make, 'install')
+        sysroot.run_make()
+        sysroot.run_make('install')
 
         # Create a platform-specific dummy _sysconfigdata module.  This allows
         # the sysconfig module to work.  If necessary we can populate it with
@@ -32,6 +32,9 @@ from ... import ComponentBase, ComponentOption
 class QScintillaComponent(ComponentBase):
     """ The QScintilla component. """
 
+    # The components that must be built first.
+    dependencies = ['pyqt5']
+
     # The component options.
     options = [
         ComponentOption('source', required=True,
@@ -51,8 +54,8 @@ class QScintillaComponent(ComponentBase):
         os.chdir('Qt4Qt5')
         sysroot.run(sysroot.host_qmake, 'CONFIG+=staticlib',
                 'DEFINES+=SCI_NAMESPACE')
-        sysroot.run(sysroot.host_make)
-        sysroot.run(sysroot.host_make, 'install')
+        sysroot.run_make()
+        sysroot.run_make('install')
         os.chdir('..')
 
         # Build the static Python bindings.
@@ -89,5 +92,5 @@ module_dir = {4}
             args.append('--verbose')
 
         sysroot.run(*args)
-        sysroot.run(sysroot.host_make)
-        sysroot.run(sysroot.host_make, 'install')
+        sysroot.run_make()
+        sysroot.run_make('install')
@@ -53,6 +53,17 @@ class Qt5Component(ComponentBase):
                 help="Set if the MSVC runtime should be statically linked."),
     ]
 
+    @property
+    def dependencies(self):
+        """ The components that must be built first. """
+
+        # Only a Qt built from source that is linked against OpenSSL needs the
+        # OpenSSL headers and libraries in the sysroot.
+        if self.source and self.ssl == 'openssl-linked':
+            return ['openssl']
+
+        return []
+
     def build(self, sysroot):
         """ Build Qt5 for the target. """
 
@@ -176,8 +187,8 @@ class Qt5Component(ComponentBase):
             args.append('-qt-xcb')
 
         sysroot.run(*args)
-        sysroot.run(sysroot.host_make)
-        sysroot.run(sysroot.host_make, 'install')
+        sysroot.run_make()
+        sysroot.run_make('install')
 
         if original_path is not None:
             os.environ['PATH'] = original_path
@@ -32,6 +32,9 @@ from ... import ComponentBase, ComponentOption
 class SIPComponent(ComponentBase):
     """ The SIP component. """
 
+    # The components that must be built first.
+    dependencies = ['python', 'qt5']
+
     # The component options.
     options = [
         ComponentOption('source', required=True,
@@ -60,8 +63,8 @@ class SIPComponent(ComponentBase):
         sysroot.run(*args)
 
         os.chdir('sipgen')
-        sysroot.run(sysroot.host_make)
-        sysroot.run(sysroot.host_make, 'install')
+        sysroot.run_make()
+        sysroot.run_make('install')
         os.chdir('..')
 
         sysroot.building_for_target = True
@@ -90,5 +93,5 @@ sip_module_dir = {2}
 
         sysroot.run(*args)
         sysroot.run(sysroot.host_qmake)
-        sysroot.run(sysroot.host_make)
-        sysroot.run(sysroot.host_make, 'install')
+        sysroot.run_make()
+        sysroot.run_make('install')
@@ -0,0 +1,242 @@
+# Copyright (c) 2018, Riverbank Computing Limited
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import concurrent.futures
+import hashlib
+import os
+import shutil
+import tarfile
+import tempfile
+import zipfile
+
+
+# The size of the buffers used when reading and writing files.
+_BUFFER_SIZE = 1024 * 1024
+
+
+class SourceCache:
+    """ A persistent cache of unpacked source archives.  An entry is keyed by
+    the hash of the contents of the archive so that it is shared by all
+    components and sysroots that use the same archive.
+    """
+
+    def __init__(self, cache_dir, workers=None):
+        """ Initialise the cache.  workers is the number of threads used to
+        unpack zip files and to copy unpacked archives, None meaning the
+        default.
+        """
+
+        self.cache_dir = os.path.join(os.path.abspath(cache_dir), 'sources')
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self._workers = workers
+
+    def unpack(self, archive, archive_root, dst_dir):
+        """ Copy the top level directory, archive_root, of an archive to a
+        destination directory, unpacking the archive into the cache first if
+        necessary.  Return True if the archive had already been unpacked.
+        """
+
+        entry_dir = os.path.join(self.cache_dir, _hash_file(archive))
+        src_dir = os.path.join(entry_dir, archive_root)
+
+        cached = os.path.isdir(entry_dir)
+
+        if not cached:
+            # Unpack to a temporary directory so that an entry is never
+            # incomplete, even if another process is unpacking the same
+            # archive at the same time.
+            temp_dir = tempfile.mkdtemp(dir=self.cache_dir, suffix='.tmp')
+
+            try:
+                unpack_archive(archive, temp_dir, workers=self._workers)
+
+                try:
+                    os.rename(temp_dir, entry_dir)
+                except OSError:
+                    # Another process got there first.
+                    if not os.path.isdir(entry_dir):
+                        raise
+            finally:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+
+        if not os.path.isdir(src_dir):
+            raise ValueError(
+                    "the archive does not contain a directory called "
+                    "'{0}'".format(archive_root))
+
+        # The components patch their source in place so the unpacked archive
+        # must be copied rather than linked.
+        copy_tree(src_dir, os.path.join(dst_dir, archive_root),
+                workers=self._workers)
+
+        return cached
+
+
+def copy_tree(src_dir, dst_dir, workers=None):
+    """ Copy a directory tree, preserving symbolic links, using a number of
+    threads to copy the files.
+    """
+
+    with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+        futures = []
+
+        for dir_path, dir_names, file_names in os.walk(src_dir):
+            dst_path = os.path.join(dst_dir,
+                    os.path.relpath(dir_path, src_dir))
+            os.makedirs(dst_path, exist_ok=True)
+
+            # os.walk() doesn't follow symbolic links to directories but does
+            # report them as directories.
+            for name in list(dir_names):
+                src_name = os.path.join(dir_path, name)
+
+                if os.path.islink(src_name):
+                    os.symlink(os.readlink(src_name),
+                            os.path.join(dst_path, name))
+                    dir_names.remove(name)
+
+            for name in file_names:
+                src_name = os.path.join(dir_path, name)
+                dst_name = os.path.join(dst_path, name)
+
+                if os.path.islink(src_name):
+                    os.symlink(os.readlink(src_name), dst_name)
+                else:
+                    futures.append(
+                            executor.submit(shutil.copy2, src_name, dst_name))
+
+        # Raise any exception.
+        for future in futures:
+            future.result()
+
+
+def unpack_archive(archive, dst_dir, workers=None):
+    """ Unpack a tar or zip archive to a directory.  A tar archive is read as a
+    stream with large buffers and the members of a zip archive are extracted
+    by a number of threads.
+    """
+
+    if zipfile.is_zipfile(archive):
+        _unpack_zip(archive, dst_dir, workers)
+    else:
+        _unpack_tar(archive, dst_dir)
+
+
+def _hash_file(file_name):
+    """ Return the hash of the contents of a file. """
+
+    hasher = hashlib.sha256()
+
+    with open(file_name, 'rb') as f:
+        for chunk in iter(lambda: f.read(_BUFFER_SIZE), b''):
+            hasher.update(chunk)
+
+    return hasher.hexdigest()
+
+
+def _unpack_tar(archive, dst_dir):
+    """ Unpack a tar archive to a directory. """
+
+    # Later versions of Python have filters that reject members that would be
+    # extracted outside of the destination directory.  Otherwise we reject
+    # them ourselves.
+    kwds = {'filter': 'tar'} if hasattr(tarfile, 'tar_filter') else {}
+
+    # Use the (faster) stream mode so that members are read sequentially.
+    with tarfile.open(archive, mode='r|*', bufsize=_BUFFER_SIZE) as tf:
+        tf.copybufsize = _BUFFER_SIZE
+
+        tf.extractall(dst_dir, members=_safe_members(tf), **kwds)
+
+
+def _check_member_name(name):
+    """ Raise a ValueError if the name of a member of an archive is absolute
+    or refers to a parent directory.
+    """
+
+    parts = name.replace('\\', '/').split('/')
+
+    if parts[0] == '' or ':' in parts[0] or '..' in parts:
+        raise ValueError(
+                "the archive contains an unsafe member '{0}'".format(name))
+
+
+def _safe_members(tf):
+    """ A generator of the members of a tar archive that have been checked to
+    be safe.
+    """
+
+    for member in tf:
+        _check_member_name(member.name)
+
+        yield member
+
+
+def _unpack_zip(archive, dst_dir, workers):
+    """ Unpack a zip archive to a directory. """
+
+    with zipfile.ZipFile(archive) as zf:
+        members = zf.infolist()
+
+    # Create all the directories first so that the threads don't race to
+    # create them.
+    files = []
+
+    for member in members:
+        _check_member_name(member.filename)
+
+        if not member.is_dir():
+            files.append(member)
+
+        parts = member.filename.split('/')[:-1]
+        if parts:
+            os.makedirs(os.path.join(dst_dir, *parts), exist_ok=True)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    # Each thread has its own file object.  Decompression releases the GIL.
+    nr_workers = max(1, min(workers, len(files)))
+
+    with concurrent.futures.ThreadPoolExecutor(nr_workers) as executor:
+        futures = [
+                executor.submit(_unpack_zip_members, archive, dst_dir,
+                        files[i::nr_workers])
+                for i in range(nr_workers)]
+
+        # Raise any exception.
+        for future in futures:
+            future.result()
+
+
+def _unpack_zip_members(archive, dst_dir, members):
+    """ Unpack a sequence of members of a zip archive to a directory. """
+
+    with zipfile.ZipFile(archive) as zf:
+        for member in members:
+            zf.extract(member, dst_dir)
@@ -25,10 +25,17 @@
 
 
 import glob
+import json
+import multiprocessing
+import multiprocessing.connection
 import os
+import select
 import shutil
 import subprocess
 import sys
+import tempfile
+import threading
+import traceback
 
 from ..file_utilities import (copy_embedded_file as fu_copy_embedded_file,
         create_file as fu_create_file, extract_version as fu_extract_version,
@@ -39,6 +46,8 @@ from ..platforms import Architecture
 from ..user_exception import UserException
 from ..windows import get_py_install_path
 
+from .component_cache import ComponentCache
+from .source_cache import SourceCache, unpack_archive
 from .specification import Specification
 
 
@@ -69,10 +78,34 @@ class Sysroot:
         self._target.configure()
         self._building_for_target = True
 
-    def build_components(self, component_names, no_clean):
+        # The names of the files found by the component being built.
+        self._found_files = None
+
+        # The cache keys of the components installed in the sysroot.
+        self._component_keys = {}
+
+        # The maximum number of jobs and, on POSIX hosts, the file descriptors
+        # of the GNU make jobserver shared by all the components being built.
+        self._jobs = 1
+        self._jobserver = None
+        self._jom = None
+
+        # The thread reading a token from the jobserver and the file
+        # descriptors of the pipe it uses to say that it has one.
+        self._token_reader = None
+        self._token_notifier = None
+
+        # The cache of unpacked source archives.
+        self._source_cache = None
+
+    def build_components(self, component_names, no_clean, jobs=1,
+            cache_dir=None):
         """ Build a sequence of components.  If no names are given then create
-        the system image root directory and build everything.  Raise a
-        UserException if there is an error.
+        the system image root directory and build everything.  Up to jobs
+        components that do not depend on each other are built concurrently.
+        cache_dir is the name of the directory containing the cache of built
+        components and unpacked source archives, None meaning no cache is
+        used.  Raise a UserException if there is an error.
         """
 
         # Handle the options now we know they are needed.
@@ -85,26 +118,55 @@ class Sysroot:
 
         if component_names:
             components = self._components_from_names(component_names)
+            self._read_component_keys()
         else:
             components = self.components
+            self._component_keys = {}
             self.create_dir(self.sysroot_dir, empty=True)
             os.makedirs(self.host_bin_dir)
             os.makedirs(self.target_include_dir)
             os.makedirs(self.target_lib_dir)
             os.makedirs(self.target_src_dir)
 
+        self._all_dependencies = self._get_all_dependencies()
+        dependencies = self._get_dependencies(components)
+
+        if cache_dir is not None:
+            try:
+                cache = ComponentCache(cache_dir)
+                self._source_cache = SourceCache(cache_dir)
+            except OSError as e:
+                self.error(
+                        "unable to create the cache in {0}".format(
+                                cache_dir),
+                        detail=str(e))
+        else:
+            cache = None
+            self._source_cache = None
+
         # Create a new build directory.
         self.create_dir(self._build_dir, empty=True)
         cwd = os.getcwd()
 
-        # Build the components.
-        for component in components:
-            os.chdir(self._build_dir)
-            component.build(self)
+        self._start_jobserver(jobs)
 
-        # Remove the build directory if requested.
-        os.chdir(cwd)
+        # Build the components.  Concurrent builds need each component to be
+        # built in a separate (forked) process because a build changes the
+        # current directory and the environment.
+        try:
+            concurrent = (jobs > 1 and len(components) > 1 and
+                    'fork' in multiprocessing.get_all_start_methods())
+
+            if concurrent:
+                self._build_concurrently(components, dependencies, jobs,
+                        cache)
+            else:
+                self._build_serially(components, dependencies, cache)
+        finally:
+            os.chdir(cwd)
+            self._stop_jobserver()
 
+        # Remove the build directory if requested.
         if not no_clean:
             self.delete_dir(self._build_dir)
 
@@ -136,6 +198,470 @@ class Sysroot:
 
         return components
 
+    def _get_dependencies(self, components):
+        """ Return a dict keyed by the name of each of a sequence of components
+        being built.  The value is the set of names of the other components in
+        the sequence that must be built first.
+        """
+
+        building = set([component.name for component in components])
+
+        return {component.name:
+                        self._all_dependencies[component.name] & building
+                for component in components}
+
+    def _get_all_dependencies(self):
+        """ Return a dict keyed by the name of each component in the
+        specification.  The value is the set of names of all the components
+        that it depends on, directly or indirectly.
+        """
+
+        names = [component.name for component in self.components]
+
+        # Get the direct dependencies of every component in the specification.
+        direct = {}
+
+        for i, component in enumerate(self.components):
+            if component.dependencies is None:
+                direct[component.name] = names[:i]
+            else:
+                direct[component.name] = [name
+                        for name in component.dependencies if name in names]
+
+        # Get the indirect dependencies.  These matter if only some components
+        # are being built.
+        indirect = {}
+
+        def visit(name, visiting):
+            deps = indirect.get(name)
+
+            if deps is None:
+                if name in visiting:
+                    self.error(
+                            "component '{0}' depends on itself".format(name))
+
+                visiting.append(name)
+
+                deps = set()
+
+                for dep in direct[name]:
+                    deps.add(dep)
+                    deps.update(visit(dep, visiting))
+
+                visiting.pop()
+
+                indirect[name] = deps
+
+            return deps
+
+        return {name: visit(name, []) for name in names}
+
+    def _build_component(self, component):
+        """ Build a component in its own build directory and return the names
+        of the files that it found.
+        """
+
+        build_dir = os.path.join(self._build_dir, component.name)
+        self.create_dir(build_dir)
+        os.chdir(build_dir)
+
+        self._found_files = []
+
+        try:
+            with self._message_handler.phase("build " + component.name,
+                    self.sysroot_dir):
+                component.build(self)
+
+            return self._found_files
+        finally:
+            self._found_files = None
+
+    # The name of the file in the sysroot containing the cache keys of the
+    # components installed in it.
+    _component_keys_file_name = 'components.json'
+
+    def _read_component_keys(self):
+        """ Read the cache keys of the components installed in the sysroot. """
+
+        try:
+            with open(os.path.join(self.sysroot_dir,
+                    self._component_keys_file_name)) as f:
+                self._component_keys = json.load(f)
+        except (OSError, ValueError):
+            self._component_keys = {}
+
+    def _write_component_keys(self):
+        """ Write the cache keys of the components installed in the sysroot.
+        """
+
+        with self.create_file(os.path.join(self.sysroot_dir,
+                self._component_keys_file_name)) as f:
+            json.dump(self._component_keys, f, indent=4, sort_keys=True)
+
+    def _take_snapshot(self, cache):
+        """ Return a snapshot of the contents of the sysroot, or None if no
+        cache is being used.
+        """
+
+        if cache is None:
+            return None
+
+        return cache.snapshot(self.sysroot_dir,
+                (os.path.basename(self._build_dir),
+                        self._component_keys_file_name))
+
+    def _get_inputs_key(self, component, cache):
+        """ Return the key of the inputs of a component, or None if a key
+        cannot be computed because one of the components it depends on is not
+        in the cache.
+        """
+
+        dependency_keys = {}
+
+        for name in self._all_dependencies[component.name]:
+            key = self._component_keys.get(name)
+            if key is None:
+                return None
+
+            dependency_keys[name] = key
+
+        return cache.get_inputs_key(component, self, dependency_keys)
+
+    def _restore_component(self, component, cache):
+        """ Restore a component from the cache if possible.  Return True if it
+        was restored.
+        """
+
+        if cache is None:
+            return False
+
+        inputs_key = self._get_inputs_key(component, cache)
+        if inputs_key is None:
+            return False
+
+        key = cache.lookup(inputs_key)
+        if key is None:
+            return False
+
+        self.progress("Restoring {0} from the cache".format(component.name))
+
+        try:
+            with self._message_handler.phase("restore " + component.name,
+                    self.sysroot_dir):
+                cache.restore(key, self.sysroot_dir)
+        except Exception as e:
+            self.error(
+                    "unable to restore '{0}' from the cache".format(
+                            component.name),
+                    detail=str(e))
+
+        self._component_keys[component.name] = key
+        self._write_component_keys()
+
+        return True
+
+    def _cache_component(self, component, cache, found_files, snapshot):
+        """ Add a component that has been built to the cache.  snapshot is the
+        snapshot of the sysroot taken before it was built, or None if the
+        component's files cannot be identified.
+        """
+
+        key = None
+
+        if cache is not None:
+            inputs_key = self._get_inputs_key(component, cache)
+
+            if inputs_key is not None:
+                if snapshot is None:
+                    key = cache.get_key(inputs_key, found_files)
+                else:
+                    self.verbose(
+                            "Adding {0} to the cache".format(component.name))
+
+                    changes = cache.changes(snapshot,
+                            self._take_snapshot(cache))
+
+                    try:
+                        key = cache.store(inputs_key, found_files,
+                                self.sysroot_dir, changes)
+                    except Exception as e:
+                        # The cache is only an optimisation.
+                        self.verbose(
+                                "Unable to add {0} to the cache: {1}".format(
+                                        component.name, str(e)))
+                        key = cache.get_key(inputs_key, found_files)
+
+        # A component without a key means that the components that depend on it
+        # cannot use the cache.
+        if key is None:
+            if self._component_keys.pop(component.name, None) is None:
+                return
+        else:
+            self._component_keys[component.name] = key
+
+        self._write_component_keys()
+
+    def _start_jobserver(self, jobs):
+        """ Create the jobserver that limits the total number of jobs run by
+        all the make invocations of all the components being built.
+        """
+
+        self._jobs = jobs
+
+        if jobs <= 1:
+            return
+
+        if self._host.platform.name == 'win':
+            # nmake cannot run jobs in parallel but jom (a compatible
+            # replacement) can.  There are no concurrent component builds on
+            # Windows so it doesn't need to share a jobserver.
+            self._jom = shutil.which('jom')
+            return
+
+        # This is the protocol used by GNU make.  Every make has an implicit
+        # job and must acquire a token (a byte read from the pipe) for each
+        # additional job.  The file descriptors are inherited by the forked
+        # processes used for concurrent builds.  Each of these (apart from
+        # the one using our implicit job) also holds a token while it is
+        # running.
+        reader, writer = os.pipe()
+        os.write(writer, b'+' * (jobs - 1))
+        self._jobserver = (reader, writer)
+
+        self._token_notifier = os.pipe()
+
+    def _acquire_job(self):
+        """ Acquire a token from the jobserver, without waiting if none is
+        available, and return True if one was acquired.  If one wasn't then
+        the first file descriptor of _token_notifier will become readable when
+        one has been.
+        """
+
+        # A make may take a token between us seeing that one is available and
+        # reading it, and the read would then block until a make gives one
+        # back.  Therefore the read is done in a separate thread so that we
+        # can continue to handle the builds that finish in the meantime.
+        if self._token_reader is None:
+            self._token_reader = threading.Thread(target=self._read_token,
+                    daemon=True)
+            self._token_reader.start()
+
+            # Give the thread the chance to take a token that is already
+            # available.
+            self._token_reader.join(0.01)
+
+        notifier = self._token_notifier[0]
+
+        if not select.select([notifier], [], [], 0)[0]:
+            return False
+
+        os.read(notifier, 1)
+
+        self._token_reader.join()
+        self._token_reader = None
+
+        return True
+
+    def _read_token(self):
+        """ Read a token from the jobserver and say that it has been read.
+        This is run in a separate thread.
+        """
+
+        os.read(self._jobserver[0], 1)
+        os.write(self._token_notifier[1], b'+')
+
+    def _release_job(self):
+        """ Give back a token to the jobserver. """
+
+        os.write(self._jobserver[1], b'+')
+
+    def _stop_jobserver(self):
+        """ Close the jobserver. """
+
+        if self._jobserver is not None:
+            # Any thread reading a token must be given one so that it can
+            # finish.  The tokens don't matter as the jobserver is finished
+            # with.
+            if self._token_reader is not None:
+                os.write(self._jobserver[1], b'+')
+                self._token_reader.join()
+                self._token_reader = None
+
+            for fd in self._jobserver + self._token_notifier:
+                os.close(fd)
+
+            self._jobserver = None
+            self._token_notifier = None
+
+        self._jobs = 1
+        self._jom = None
+
+    def _build_serially(self, components, dependencies, cache):
+        """ Build a sequence of components one at a time. """
+
+        built = set()
+        pending = list(components)
+
+        while pending:
+            # Build the first component whose dependencies have been built.
+            # Note that this preserves the order of the specification file as
+            # far as possible.
+            for component in pending:
+                if dependencies[component.name] <= built:
+                    break
+
+            pending.remove(component)
+
+            if not self._restore_component(component, cache):
+                snapshot = self._take_snapshot(cache)
+                found_files = self._build_component(component)
+                self._cache_component(component, cache, found_files, snapshot)
+
+            built.add(component.name)
+
+    def _build_concurrently(self, components, dependencies, jobs, cache):
+        """ Build a sequence of components concurrently with each one being
+        built in a forked process.  The files installed by a component can
+        only be identified (and so the component cached) if no other component
+        was being built or restored at the same time.
+        """
+
+        context = multiprocessing.get_context('fork')
+
+        built = set()
+        pending = list(components)
+        running = {}
+        snapshots = {}
+        error = None
+
+        # Set if our implicit job isn't being used by a build.
+        implicit_job = True
+
+        try:
+            while True:
+                # Start as many components as possible unless a build has
+                # failed.
+                restored = False
+                need_job = False
+
+                if error is None:
+                    for component in list(pending):
+                        if len(running) >= jobs:
+                            break
+
+                        if not dependencies[component.name] <= built:
+                            continue
+
+                        index = pending.index(component)
+                        pending.remove(component)
+
+                        if self._restore_component(component, cache):
+                            # Anything already running can no longer be
+                            # cached.
+                            for name in snapshots:
+                                snapshots[name] = None
+
+                            built.add(component.name)
+                            restored = True
+                            continue
+
+                        # A build uses our implicit job if it is free,
+                        # otherwise it needs a token so that the total number
+                        # of jobs isn't exceeded.
+                        if implicit_job:
+                            implicit_job = False
+                            has_token = False
+                        elif self._acquire_job():
+                            has_token = True
+                        else:
+                            pending.insert(index, component)
+                            need_job = True
+                            break
+
+                        self.verbose(
+                                "Starting build of {0}".format(
+                                        component.name))
+
+                        # The files installed by concurrent builds cannot be
+                        # told apart.
+                        if running:
+                            for name in snapshots:
+                                snapshots[name] = None
+
+                            snapshots[component.name] = None
+                        else:
+                            snapshots[component.name] = self._take_snapshot(
+                                    cache)
+
+                        reader, writer = context.Pipe(duplex=False)
+                        process = context.Process(target=_build_in_process,
+                                args=(self, component, writer))
+                        process.start()
+                        writer.close()
+
+                        running[reader] = (component, process, has_token)
+
+                # Components that were restored may allow others to start.
+                if restored:
+                    continue
+
+                if not running:
+                    break
+
+                # Wait for at least one build to finish or, if a build is
+                # waiting to start, for a token to become available.
+                waitables = list(running)
+
+                if need_job:
+                    waitables.append(self._token_notifier[0])
+
+                for reader in multiprocessing.connection.wait(waitables):
+                    if reader not in running:
+                        continue
+
+                    component, process, has_token = running.pop(reader)
+
+                    try:
+                        text, detail, found_files, spans = reader.recv()
+                    except EOFError:
+                        text = "the build of '{0}' terminated " \
+                                "unexpectedly".format(component.name)
+                        detail = ''
+                        spans = None
+
+                    if spans:
+                        self._message_handler.add_spans(spans)
+
+                    reader.close()
+                    process.join()
+
+                    if has_token:
+                        self._release_job()
+                    else:
+                        implicit_job = True
+
+                    if text is None:
+                        self.verbose(
+                                "Finished build of {0}".format(
+                                        component.name))
+
+                        self._cache_component(component, cache, found_files,
+                                snapshots[component.name])
+
+                        built.add(component.name)
+                    elif error is None:
+                        # Allow any other builds to finish before reporting the
+                        # error.
+                        error = UserException(text, detail=detail)
+        finally:
+            # Don't leave any orphans if we are being interrupted.
+            for component, process, _ in running.values():
+                process.terminate()
+                process.join()
+
+        if error is not None:
+            raise error
+
     ###########################################################################
     # The following are part of the public API for component plugins that are
     # distributed as part of pyqtdeploy.  Therefore they are not documented.
@@ -380,7 +906,14 @@ class Sysroot:
                         "'{0}' matched several files and directories".format(
                                 name))
 
-            return os.path.normpath(names[0])
+            found = os.path.normpath(names[0])
+
+            # Remember what was found so that it is part of the component's
+            # cache key.
+            if self._found_files is not None:
+                self._found_files.append(found)
+
+            return found
 
         if required:
             self.error(
@@ -410,7 +943,7 @@ class Sysroot:
     def host_arch_name(self):
         """ The name of the host architecture. """
 
-        return self._host.arch_name
+        return self._host.name
 
     @property
     def host_bin_dir(self):
@@ -435,6 +968,12 @@ class Sysroot:
 
         return self._host.platform.make
 
+    @property
+    def jobs(self):
+        """ The maximum number of jobs that may be run at the same time. """
+
+        return self._jobs
+
     @property
     def host_platform_name(self):
         """ The name of the host platform. """
@@ -550,20 +1089,52 @@ class Sysroot:
         self._message_handler.verbose_message(
                 "Running '{0}'".format(' '.join(args)))
 
-        if capture:
-            try:
-                stdout = subprocess.check_output(args,
-                        universal_newlines=True, stderr=subprocess.PIPE)
-            except subprocess.CalledProcessError as e:
-                self.error("execution of '{0}' failed".format(args[0]),
-                        detail=e.stderr)
+        with self._message_handler.phase("run " + os.path.basename(args[0])):
+            if capture:
+                try:
+                    stdout = subprocess.check_output(args,
+                            universal_newlines=True, stderr=subprocess.PIPE)
+                except subprocess.CalledProcessError as e:
+                    self.error("execution of '{0}' failed".format(args[0]),
+                            detail=e.stderr)
 
-            return stdout.strip()
+                return stdout.strip()
 
-        subprocess.check_call(args)
+            subprocess.check_call(args)
 
         return None
 
+    def run_make(self, *args):
+        """ Run the host make, running up to jobs jobs at the same time. """
+
+        if self._jom is not None:
+            self.run(self._jom, '/J', str(self._jobs), *args)
+            return
+
+        if self._jobserver is None:
+            self.run(self.host_make, *args)
+            return
+
+        argv = (self.host_make, ) + args
+
+        self._message_handler.verbose_message(
+                "Running '{0}'".format(' '.join(argv)))
+
+        # Older versions of GNU make use --jobserver-fds and newer ones use
+        # --jobserver-auth.  Both ignore the one they don't understand.
+        makeflags = '-j --jobserver-fds={0},{1} --jobserver-auth={0},{1}'
+        makeflags = makeflags.format(*self._jobserver)
+
+        env = dict(os.environ)
+        user_makeflags = env.get('MAKEFLAGS')
+        if user_makeflags:
+            makeflags += ' ' + user_makeflags
+        env['MAKEFLAGS'] = makeflags
+
+        with self._message_handler.phase(
+                "run " + os.path.basename(self.host_make)):
+            subprocess.check_call(argv, env=env, pass_fds=self._jobserver)
+
     @property
     def target_arch_name(self):
         """ The name of the target architecture. """
@@ -667,18 +1238,7 @@ class Sysroot:
         directory (not it's pathname) is returned.
         """
 
-        # Windows (maybe just 32-bits) has a problem extracting the Qt source
-        # archive (maybe the long pathnames).  As a work around we extract it
-        # to the directory containing the archive and then move it later.
-        archive_dir, archive_name = os.path.split(archive)
-        original_cwd = os.getcwd()
-        os.chdir(archive_dir)
-
-        # Unpack the archive.
-        try:
-            shutil.unpack_archive(archive_name)
-        except Exception as e:
-            self.error("unable to unpack {0}".format(archive), detail=str(e))
+        archive_dir, archive_name = os.path.split(os.path.abspath(archive))
 
         # Assume that the name of the extracted directory is the same as the
         # archive without the extension.
@@ -692,19 +1252,42 @@ class Sysroot:
             if archive_root:
                 break
         else:
-            # This should never happen if we have got this far.
             self.error("'{0}' has an unknown extension".format(archive))
 
-        # Validate the assumption by checking the expected directory exists.
-        if not os.path.isdir(archive_root):
-            self.error(
-                    "unpacking {0} did not create a directory called '{1}' as expected".format(archive, archive_root))
-
-        # Move the extracted archive.
-        archive_root_path = os.path.join(original_cwd, archive_root)
+        archive_root_path = os.path.abspath(archive_root)
         self.delete_dir(archive_root_path)
-        os.rename(archive_root, archive_root_path)
-        os.chdir(original_cwd)
+
+        try:
+            if self._source_cache is not None:
+                if self._source_cache.unpack(archive, archive_root,
+                        os.getcwd()):
+                    self.verbose(
+                            "Copied {0} from the source cache".format(
+                                    archive_root))
+            else:
+                # Windows (maybe just 32-bits) has a problem extracting the Qt
+                # source archive (maybe the long pathnames).  As a work around
+                # we extract it to the directory containing the archive and
+                # then move it.
+                temp_dir = tempfile.mkdtemp(dir=archive_dir, suffix='.tmp')
+
+                try:
+                    unpack_archive(archive, temp_dir)
+
+                    # Validate the assumption by checking the expected
+                    # directory exists.
+                    temp_root = os.path.join(temp_dir, archive_root)
+
+                    if not os.path.isdir(temp_root):
+                        raise ValueError(
+                                "the archive does not contain a directory "
+                                "called '{0}'".format(archive_root))
+
+                    os.rename(temp_root, archive_root_path)
+                finally:
+                    shutil.rmtree(temp_dir, ignore_errors=True)
+        except Exception as e:
+            self.error("unable to unpack {0}".format(archive), detail=str(e))
 
         # Change to the extracted directory if required.
         if chdir:
@@ -743,3 +1326,28 @@ class Sysroot:
         """ Raise an exception about a missing component. """
 
         self.error("the sysroot specification must contain an entry for '{0}' before anything that depends on it".format(name))
+
+
+def _build_in_process(sysroot, component, connection):
+    """ Build a component in a forked process and send a 4-tuple of the text
+    and detail of any error, the names of the files found by the component
+    and the spans of any traced phases back through a connection.
+    """
+
+    # Only send the spans of this process.
+    message_handler = sysroot._message_handler
+    if message_handler.spans is not None:
+        message_handler.spans = []
+
+    try:
+        result = (None, None, sysroot._build_component(component))
+    except UserException as e:
+        result = (e.text, e.detail, None)
+    except Exception:
+        result = ("unable to build '{0}'".format(component.name),
+                traceback.format_exc(), None)
+
+    result += (message_handler.spans, )
+
+    connection.send(result)
+    connection.close()
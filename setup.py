@@ -24,6 +24,8 @@
 # POSSIBILITY OF SUCH DAMAGE.
 
 
+import importlib
+import importlib.util
 import os
 import sys
 
@@ -34,6 +36,40 @@ if sys.hexversion < 0x03050000:
 
 
 from setuptools import find_packages, setup
+from setuptools.command.build_py import build_py
+
+
+class pyqtdeploy_build_py(build_py):
+    """ Extend build_py to compile the standard library meta-data. """
+
+    def run(self):
+        """ Run the command. """
+
+        super().run()
+
+        table_name = os.path.join(self.build_lib, 'pyqtdeploy', 'metadata',
+                'python_metadata.table')
+
+        self.execute(self._write_metadata_table, (table_name, ),
+                "compiling the standard library meta-data to " + table_name)
+
+    @staticmethod
+    def _write_metadata_table(table_name):
+        """ Write the table of standard library meta-data. """
+
+        # Import the meta-data sub-package on its own because importing
+        # pyqtdeploy itself requires PyQt5.
+        metadata_dir = os.path.join('pyqtdeploy', 'metadata')
+        spec = importlib.util.spec_from_file_location('_pyqtdeploy_metadata',
+                os.path.join(metadata_dir, '__init__.py'),
+                submodule_search_locations=[metadata_dir])
+        metadata = importlib.util.module_from_spec(spec)
+        sys.modules[spec.name] = metadata
+        spec.loader.exec_module(metadata)
+
+        table = importlib.import_module(
+                '_pyqtdeploy_metadata.python_metadata_table')
+        table.write_table(table_name)
 
 
 # Get the version number.
@@ -66,6 +102,7 @@ setup(
         url='https://www.riverbankcomputing.com/software/pyqtdeploy/',
         license='BSD',
         platforms=['X11', 'OS/X', 'Windows'],
+        cmdclass={'build_py': pyqtdeploy_build_py},
         packages=find_packages(),
         package_data={
             'pyqtdeploy.builder': ['lib/*.*', 'lib/*/*.*'],
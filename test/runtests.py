@@ -1,16 +1,54 @@
 #!/usr/bin/env python3
 
+import concurrent.futures
 import glob
+import hashlib
 import os
 import shutil
 import subprocess
 import sys
+import threading
+import time
+from xml.etree import ElementTree
 
 
 class UserException(Exception):
     """ An exception used for reporting user-triggered errors. """
 
 
+class TestResult:
+    """ Encapsulate the result of running a single test. """
+
+    # The possible outcomes of a test.
+    PASSED = 'passed'
+    FAILED = 'failed'
+    SKIPPED = 'skipped'
+
+    def __init__(self, tests, test):
+        """ Initialise the object. """
+
+        self.tests = tests
+        self.test = test
+        self.outcome = self.PASSED
+        self.message = ''
+        self.log_file = None
+
+        # The (name, duration) of each phase of the test.
+        self.phases = []
+
+    @property
+    def duration(self):
+        """ The total time taken by the test. """
+
+        return sum([duration for _, duration in self.phases])
+
+    @property
+    def name(self):
+        """ The name of the test. """
+
+        return os.path.basename(self.test)
+
+
 class TargetTests:
     """ Encapsulate a set of tests for a particular target. """
 
@@ -29,17 +67,28 @@ class TargetTests:
 
         self.target = target
 
-        self._tests = [test] if test else self._find_tests()
+        self.tests = [test] if test else self._find_tests()
 
-    def call(self, args, verbose, failure_message):
-        """ Call a sub-process. """
+    def call(self, args, failure_message, result, phase, log, cwd=None):
+        """ Call a sub-process as a phase of a test and record how long it
+        took.
+        """
 
-        if verbose:
-            print("Running: '{}'".format(' '.join(args)))
+        if log.verbose:
+            log.write("Running: '{}'".format(' '.join(args)))
+
+        start = time.monotonic()
 
         try:
-            subprocess.check_call(args)
-        except subprocess.CalledProcessError:
+            returncode = subprocess.call(args, cwd=cwd, stdout=log.stdout,
+                    stderr=subprocess.STDOUT)
+        except OSError as e:
+            log.write(str(e))
+            returncode = -1
+        finally:
+            result.phases.append((phase, time.monotonic() - start))
+
+        if returncode != 0:
             raise UserException(failure_message)
 
     @classmethod
@@ -55,13 +104,7 @@ class TargetTests:
 
         return test_type(target, os.path.abspath(test))
 
-    def run(self, no_clean, verbose):
-        """ Run the tests. """
-
-        for test in self._tests:
-            self.run_test(test, no_clean, verbose)
-
-    def run_test(self, test, no_clean, verbose):
+    def run_test(self, test, options, log, result):
         """ Re-implemented to run a single test. """
 
         raise NotImplementedError
@@ -78,7 +121,14 @@ class TargetTests:
                             os.path.join('tests', target_dir,
                                     '*' + self.test_extension)))
 
-        return tests
+        return sorted(tests)
+
+    def sysroot_dir(self, test_name):
+        """ Return the name of the sysroot directory built by a test. """
+
+        return os.path.abspath(
+                os.path.join('sysroot',
+                        '{0}-{1}'.format(self.target, test_name)))
 
 
 class TargetSysrootTests(TargetTests):
@@ -88,34 +138,106 @@ class TargetSysrootTests(TargetTests):
     # The filename exyension of pyqtdeploy-sysroot tests.
     test_extension = '.json'
 
-    def run_test(self, test, no_clean, verbose):
+    # The name of the file in a sysroot containing the hash of the inputs of
+    # the test that built it.
+    stamp_name = 'runtests.stamp'
+
+    def run_test(self, test, options, log, result):
         """ Run a pyqtdeploy-sysroot test. """
 
-        print("Building sysroot from {}".format(test))
+        log.write("Building sysroot from {}".format(test))
 
         # The name of the sysroot directory to be built.
         test_name = os.path.basename(test).split('.')[0]
-        sysroot = os.path.join('sysroot',
-                '{0}-{1}'.format(self.target, test_name))
+        sysroot = self.sysroot_dir(test_name)
+        source_dir = os.path.abspath(os.path.join('..', 'demo', 'src'))
+        stamp_name = os.path.join(sysroot, self.stamp_name)
+
+        # Reuse the sysroot if it was successfully built from the same inputs.
+        stamp = self._get_stamp(test, source_dir)
+
+        if not options.rebuild:
+            try:
+                with open(stamp_name) as f:
+                    if f.read() == stamp:
+                        log.write(
+                                "Reusing sysroot {} built from the same "
+                                "inputs".format(sysroot))
+                        result.phases.append(('reuse', 0.0))
+                        return
+            except OSError:
+                pass
+
+        # Make sure a failed build is never reused.
+        try:
+            os.remove(stamp_name)
+        except OSError:
+            pass
 
         # Run pyqtdeploy-sysroot.
         args = ['pyqtdeploy-sysroot']
 
-        if no_clean:
+        if options.cache_dir:
+            args.extend(['--cache-dir', options.cache_dir])
+
+        if options.no_clean:
             args.append('--no-clean')
 
-        if verbose:
+        if options.verbose:
             args.append('--verbose')
 
-        args.extend(['--source-dir', os.path.join('..', 'demo', 'src')])
+        args.extend(['--source-dir', source_dir])
         args.extend(['--target', self.target])
         args.extend(['--sysroot', sysroot])
-        args.append(test)
+        args.append(os.path.abspath(test))
+
+        self.call(args, "Build of sysroot from {} failed".format(test),
+                result, 'pyqtdeploy-sysroot', log)
+
+        with open(stamp_name, 'w') as f:
+            f.write(stamp)
 
-        self.call(args, verbose,
-                "Build of sysroot from {} failed".format(test))
+        log.write("Build of sysroot from {} successful".format(test))
 
-        print("Build of sysroot from {} successful".format(test))
+    def _get_stamp(self, test, source_dir):
+        """ Return the hash of everything that affects the sysroot built by a
+        test.
+        """
+
+        hasher = hashlib.sha256()
+
+        hasher.update(self.target.encode())
+
+        with open(test, 'rb') as f:
+            hasher.update(f.read())
+
+        # Include the implementation of pyqtdeploy itself.  Source archives
+        # are identified by their size and modification time.
+        pyqtdeploy_dir = os.path.abspath(os.path.join('..', 'pyqtdeploy'))
+
+        roots = ((pyqtdeploy_dir, True), (source_dir, False))
+
+        for root_dir, hash_contents in roots:
+            for dir_path, dir_names, file_names in os.walk(root_dir):
+                dir_names.sort()
+
+                for file_name in sorted(file_names):
+                    if file_name.endswith('.pyc'):
+                        continue
+
+                    path = os.path.join(dir_path, file_name)
+                    hasher.update(os.path.relpath(path, root_dir).encode())
+
+                    if hash_contents:
+                        with open(path, 'rb') as f:
+                            hasher.update(f.read())
+                    else:
+                        st = os.stat(path)
+                        hasher.update(
+                                '{0} {1}'.format(st.st_size,
+                                        st.st_mtime_ns).encode())
+
+        return hasher.hexdigest()
 
 
 class TargetStdlibTests(TargetTests):
@@ -125,45 +247,290 @@ class TargetStdlibTests(TargetTests):
     # The filename exyension of pyqtdeploy-build tests.
     test_extension = '.pdy'
 
-    def run_test(self, test, no_clean, verbose):
+    # The name of the sysroot test that builds the sysroot used by these
+    # tests.
+    sysroot_test_name = 'python_stdlib'
+
+    def run_test(self, test, options, log, result):
         """ Run a pyqtdeploy-build test. """
 
-        print("Building application from {}".format(test))
+        log.write("Building application from {}".format(test))
 
         # The name of the sysroot directory to use.
-        sysroot = os.path.join('sysroot',
-                '{}-python_stdlib'.format(self.target))
+        sysroot = self.sysroot_dir(self.sysroot_test_name)
+
+        # Each test has its own build directory so that tests can be run
+        # concurrently.
+        test_name = os.path.basename(test).split('.')[0]
+        build_dir = os.path.abspath(
+                os.path.join('build', '{0}-{1}'.format(self.target,
+                        test_name)))
 
         # Run pyqtdeploy-build.
         args = ['pyqtdeploy-build']
 
-        if no_clean:
+        if options.cache_dir:
+            args.extend(
+                    ['--cache-dir', os.path.join(options.cache_dir, 'frozen')])
+
+        if options.no_clean:
             args.append('--no-clean')
 
-        if verbose:
+        if options.verbose:
             args.append('--verbose')
 
+        args.extend(['--build-dir', build_dir])
         args.extend(['--target', self.target])
         args.extend(['--sysroot', sysroot])
-        args.append(test)
+        args.append(os.path.abspath(test))
 
-        self.call(args, verbose,
-                "pyqtdeploy-build using {} failed".format(test))
+        self.call(args, "pyqtdeploy-build using {} failed".format(test),
+                result, 'pyqtdeploy-build', log)
 
-        # Change to the build directory and run qmake and make.
-        build_dir = 'build-' + self.target
-        qmake = os.path.abspath(os.path.join(sysroot, 'host', 'bin', 'qmake'))
+        # Run qmake and make in the build directory.
+        qmake = os.path.join(sysroot, 'host', 'bin', 'qmake')
         make = 'nmake' if sys.platform == 'win32' else 'make'
 
-        os.chdir(build_dir)
-        self.call([qmake], verbose, "qmake failed")
-        self.call([make], verbose, "make failed")
-        os.chdir('..')
+        self.call([qmake], "qmake failed", result, 'qmake', log,
+                cwd=build_dir)
+        self.call([make], "make failed", result, 'make', log, cwd=build_dir)
 
-        if not no_clean:
+        if not options.no_clean:
             shutil.rmtree(build_dir)
 
-        print("Build of application from {} successful".format(test))
+        log.write("Build of application from {} successful".format(test))
+
+
+# Serialise the writing of progress to stdout.
+_stdout_lock = threading.Lock()
+
+
+def progress(message):
+    """ Write a progress message to stdout. """
+
+    with _stdout_lock:
+        print(message, flush=True)
+
+
+class TestLog:
+    """ Encapsulate the output of a test.  Unless tests are run concurrently
+    it is written to stdout, otherwise it is written to a log file.
+    """
+
+    def __init__(self, log_file, verbose):
+        """ Initialise the object. """
+
+        self.log_file = log_file
+        self.verbose = verbose
+
+        if log_file is None:
+            self.stdout = None
+        else:
+            os.makedirs(os.path.dirname(log_file), exist_ok=True)
+            self.stdout = open(log_file, 'w')
+
+    def close(self):
+        """ Close the log. """
+
+        if self.stdout is not None:
+            self.stdout.close()
+
+    def write(self, message):
+        """ Write a message to the log. """
+
+        if self.stdout is None:
+            progress(message)
+        else:
+            self.stdout.write(message + '\n')
+            self.stdout.flush()
+
+
+class TestRunner:
+    """ Run a matrix of tests concurrently using a pool of workers. """
+
+    def __init__(self, options):
+        """ Initialise the object. """
+
+        self._options = options
+
+        self.results = []
+
+    def run(self, target_tests):
+        """ Run a sequence of TargetTests instances.  A pyqtdeploy-build test
+        is only started when the sysroot it uses has been built (if it is
+        being built at all).
+        """
+
+        # Get the individual tests and the sysroots they depend on.
+        sysroot_tests = {}
+        stdlib_tests = []
+
+        for tests in target_tests:
+            for test in tests.tests:
+                if isinstance(tests, TargetSysrootTests):
+                    name = os.path.basename(test).split('.')[0]
+                    sysroot_tests[(tests.target, name)] = (tests, test)
+                else:
+                    stdlib_tests.append((tests, test))
+
+        waiting = {}
+        ready = []
+
+        for tests, test in stdlib_tests:
+            key = (tests.target, tests.sysroot_test_name)
+
+            if key in sysroot_tests:
+                waiting.setdefault(key, []).append((tests, test))
+            else:
+                ready.append((tests, test))
+
+        with concurrent.futures.ThreadPoolExecutor(
+                self._options.jobs) as executor:
+            # The sysroot tests are started first.
+            pending = {}
+
+            for key, (tests, test) in sysroot_tests.items():
+                pending[executor.submit(self._run_test, tests, test)] = key
+
+            for tests, test in ready:
+                pending[executor.submit(self._run_test, tests, test)] = None
+
+            while pending:
+                done, _ = concurrent.futures.wait(pending,
+                        return_when=concurrent.futures.FIRST_COMPLETED)
+
+                for future in done:
+                    key = pending.pop(future)
+                    result = future.result()
+                    self.results.append(result)
+
+                    # Start (or skip) the tests waiting for the sysroot.
+                    for tests, test in waiting.pop(key, []):
+                        if result.outcome == TestResult.PASSED:
+                            pending[executor.submit(self._run_test, tests,
+                                    test)] = None
+                        else:
+                            skipped = TestResult(tests, test)
+                            skipped.outcome = TestResult.SKIPPED
+                            skipped.message = (
+                                    "sysroot {} was not built".format(
+                                            result.name))
+                            self.results.append(skipped)
+
+    def report(self):
+        """ Display the timing report and return True if all the tests
+        passed.
+        """
+
+        print()
+        print("{0:<10}  {1:<45}  {2:<8}  {3:>9}  {4}".format("Target",
+                "Test", "Outcome", "Time (s)", "Phases (s)"))
+
+        for result in self._sorted_results():
+            phases = ', '.join(
+                    ["{0} {1:.1f}".format(phase, duration)
+                            for phase, duration in result.phases])
+
+            print("{0:<10}  {1:<45}  {2:<8}  {3:9.1f}  {4}".format(
+                    result.tests.target, result.name, result.outcome,
+                    result.duration, phases))
+
+            if result.message:
+                print("    {}".format(result.message))
+
+                if result.log_file:
+                    print("    see {}".format(result.log_file))
+
+        return all([r.outcome == TestResult.PASSED for r in self.results])
+
+    def write_junit(self, junit_file):
+        """ Write the results as a JUnit XML file. """
+
+        suites = ElementTree.Element('testsuites')
+        by_suite = {}
+
+        for result in self._sorted_results():
+            by_suite.setdefault(
+                    (result.tests.target, type(result.tests).__name__),
+                    []).append(result)
+
+        for (target, suite_name), results in by_suite.items():
+            suite = ElementTree.SubElement(suites, 'testsuite',
+                    name='{0}.{1}'.format(target, suite_name),
+                    tests=str(len(results)),
+                    failures=str(self._count(results, TestResult.FAILED)),
+                    skipped=str(self._count(results, TestResult.SKIPPED)),
+                    time='{0:.3f}'.format(sum([r.duration for r in results])))
+
+            for result in results:
+                case = ElementTree.SubElement(suite, 'testcase',
+                        classname='{0}.{1}'.format(target, suite_name),
+                        name=result.name,
+                        time='{0:.3f}'.format(result.duration))
+
+                properties = ElementTree.SubElement(case, 'properties')
+
+                for phase, duration in result.phases:
+                    ElementTree.SubElement(properties, 'property',
+                            name='phase.' + phase,
+                            value='{0:.3f}'.format(duration))
+
+                if result.outcome == TestResult.FAILED:
+                    failure = ElementTree.SubElement(case, 'failure',
+                            message=result.message)
+
+                    if result.log_file:
+                        with open(result.log_file) as f:
+                            failure.text = f.read()
+                elif result.outcome == TestResult.SKIPPED:
+                    ElementTree.SubElement(case, 'skipped',
+                            message=result.message)
+
+        ElementTree.ElementTree(suites).write(junit_file, encoding='utf-8',
+                xml_declaration=True)
+
+    def _run_test(self, tests, test):
+        """ Run a single test and return its result. """
+
+        result = TestResult(tests, test)
+
+        if self._options.jobs > 1:
+            result.log_file = os.path.abspath(
+                    os.path.join('logs',
+                            '{0}-{1}.log'.format(tests.target, result.name)))
+
+        log = TestLog(result.log_file, self._options.verbose)
+
+        if log.log_file:
+            progress("Starting {0} for {1}".format(test, tests.target))
+
+        try:
+            tests.run_test(test, self._options, log, result)
+        except UserException as e:
+            result.outcome = TestResult.FAILED
+            result.message = str(e)
+            log.write(result.message)
+        finally:
+            log.close()
+
+        if log.log_file:
+            progress("Finished {0} for {1}: {2}".format(test, tests.target,
+                    result.outcome))
+
+        return result
+
+    @staticmethod
+    def _count(results, outcome):
+        """ Return the number of results with a particular outcome. """
+
+        return len([r for r in results if r.outcome == outcome])
+
+    def _sorted_results(self):
+        """ Return the results sorted by target and test. """
+
+        return sorted(self.results,
+                key=lambda r: (r.tests.target,
+                        not isinstance(r.tests, TargetSysrootTests), r.name))
 
 
 if __name__ == '__main__':
@@ -173,9 +540,22 @@ if __name__ == '__main__':
     # Parse the command line.
     parser = argparse.ArgumentParser()
 
+    parser.add_argument('--cache-dir',
+            help="the directory containing the cache shared by all tests")
+    parser.add_argument('--jobs',
+            help="the maximum number of tests to run concurrently [default: "
+                    "1]",
+            metavar="N", type=int, default=1)
+    parser.add_argument('--junit',
+            help="write the results and timings as a JUnit XML file",
+            metavar="FILE")
     parser.add_argument('--no-clean',
             help="do not remove the temporary build directories",
             action='store_true')
+    parser.add_argument('--rebuild',
+            help="rebuild sysroots even if they were built from the same "
+                    "inputs",
+            action='store_true')
     parser.add_argument('--test',
             help="the JSON specification file or project file")
     parser.add_argument('--target', help="the target platform")
@@ -184,14 +564,30 @@ if __name__ == '__main__':
 
     args = parser.parse_args()
 
+    if args.jobs < 1:
+        parser.error("argument --jobs: number must be at least 1")
+
+    # Make names relative to the current directory before it changes.
+    if args.cache_dir:
+        args.cache_dir = os.path.abspath(args.cache_dir)
+
+    if args.junit:
+        args.junit = os.path.abspath(args.junit)
+
     # Anchor everything from the directory containing this script.
     os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
     # Run a specific test or all of them.
     if args.test:
-        TargetTests.factory(args.target, args.test).run(args.no_clean,
-                args.verbose)
+        target_tests = [TargetTests.factory(args.target, args.test)]
     else:
-        # The sysroot tests must be run first.
-        TargetSysrootTests(args.target).run(args.no_clean, args.verbose)
-        TargetStdlibTests(args.target).run(args.no_clean, args.verbose)
+        target_tests = [TargetSysrootTests(args.target),
+                TargetStdlibTests(args.target)]
+
+    runner = TestRunner(args)
+    runner.run(target_tests)
+
+    if args.junit:
+        runner.write_junit(args.junit)
+
+    sys.exit(0 if runner.report() else 1)
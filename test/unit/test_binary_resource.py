@@ -0,0 +1,140 @@
+import os
+import struct
+import tempfile
+import unittest
+import zlib
+
+from PyQt5.QtCore import QFile, QIODevice, QResource
+
+from pyqtdeploy.builder.binary_resource import qt_hash, write_binary_resource
+
+
+class BinaryResourceTests(unittest.TestCase):
+    """ Test the writing of Qt binary resources. """
+
+    def setUp(self):
+        """ Create a temporary directory for the resources. """
+
+        self._temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        """ Remove the temporary directory. """
+
+        self._temp_dir.cleanup()
+
+    def test_header(self):
+        """ Test the header describes the sections that follow it. """
+
+        resource = self._write([('a.txt', b'abc', None)])
+
+        magic, version, tree_offset, payload_offset, names_offset = (
+                struct.unpack('>4sIIII', resource[:20]))
+
+        self.assertEqual(magic, b'qres')
+        self.assertEqual(version, 1)
+        self.assertEqual(payload_offset, 20)
+        self.assertEqual(resource[payload_offset:names_offset],
+                struct.pack('>I', 3) + b'abc')
+
+        # The tree is the root directory followed by the file.
+        self.assertEqual(len(resource) - tree_offset, 14 + 14)
+
+        # The names section contains the single name.
+        encoded = 'a.txt'.encode('utf-16-be')
+        self.assertEqual(resource[names_offset:tree_offset],
+                struct.pack('>HI', 5, qt_hash('a.txt')) + encoded)
+
+    def test_shared_names(self):
+        """ Test a name used more than once is only written once. """
+
+        resource = self._write(
+                [('a/a', b'1', None), ('b/a', b'2', None),
+                        ('a/b', b'3', None)])
+
+        _, _, tree_offset, _, names_offset = struct.unpack('>4sIIII',
+                resource[:20])
+
+        self.assertEqual(tree_offset - names_offset, 2 * (6 + 2))
+
+    def test_compression(self):
+        """ Test that data is only compressed if it gets small enough. """
+
+        data = b'x' * 1000
+        resource = self._write(
+                [('small', data, (9, 1)), ('never', data, None),
+                        ('huge', data, (9, 100))])
+
+        nr_compressed = 0
+        tree_offset = struct.unpack('>I', resource[8:12])[0]
+        payload_offset = struct.unpack('>I', resource[12:16])[0]
+
+        for node in range(1, 4):
+            start = tree_offset + node * 14
+            _, flags, _, _, data_offset = struct.unpack('>IHHHI',
+                    resource[start:start + 14])
+
+            if flags & 0x01:
+                nr_compressed += 1
+
+                start = payload_offset + data_offset
+                size = struct.unpack('>I', resource[start:start + 4])[0]
+                compressed = resource[start + 4:start + 4 + size]
+
+                self.assertEqual(struct.unpack('>I', compressed[:4])[0], 1000)
+                self.assertEqual(zlib.decompress(compressed[4:]), data)
+
+        self.assertEqual(nr_compressed, 1)
+
+    def test_qt_hash(self):
+        """ Test the hash of some simple names. """
+
+        self.assertEqual(qt_hash(''), 0)
+        self.assertEqual(qt_hash('a'), 0x61)
+        self.assertEqual(qt_hash('ab'), (0x61 << 4) + 0x62)
+
+    def test_registered_by_qt(self):
+        """ Test that Qt can read every file in the resource. """
+
+        contents = {
+            'main.pyo':                 b'main' * 100,
+            'pkg/__init__.pyo':         b'',
+            'pkg/sub/module.pyo':       os.urandom(500),
+            'pkg/sub/data.txt':         b'text ' * 1000,
+            'pyqtdeploy.pdya':          b'archive',
+        }
+
+        for nr in range(50):
+            contents['many/module{0}.pyo'.format(nr)] = str(nr).encode()
+
+        resource = self._write([(name, data, (-1, 10))
+                for name, data in contents.items()])
+
+        map_root = '/test_registered_by_qt'
+        self.assertTrue(QResource.registerResourceData(resource, map_root))
+
+        try:
+            for name, data in contents.items():
+                f = QFile(':' + map_root + '/' + name)
+                self.assertTrue(f.open(QIODevice.ReadOnly), name)
+                self.assertEqual(bytes(f.readAll()), data, name)
+                f.close()
+
+            self.assertFalse(QFile.exists(':' + map_root + '/missing'))
+        finally:
+            QResource.unregisterResourceData(resource, map_root)
+
+    def _write(self, contents):
+        """ Write a binary resource and check it is the same as that returned.
+        """
+
+        file_name = os.path.join(self._temp_dir.name, 'test.rcc')
+        resource = write_binary_resource(file_name, contents)
+
+        with open(file_name, 'rb') as f:
+            self.assertEqual(f.read(), resource)
+
+        return resource
+
+
+if __name__ == '__main__':
+    unittest.main()
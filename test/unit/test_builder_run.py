@@ -0,0 +1,100 @@
+import sys
+import time
+import unittest
+
+from pyqtdeploy import Builder, MessageHandler, Project, UserException
+
+
+# A command that runs until it is killed.
+SLOW = [sys.executable, '-c', 'import time; time.sleep(60)']
+
+# A command that finishes quickly once it has been left to run.
+FAST = [sys.executable, '-c', 'import time; time.sleep(0.5)']
+
+
+class BuilderRunTests(unittest.TestCase):
+    """ Test the running of commands by a builder. """
+
+    def setUp(self):
+        """ Create a builder. """
+
+        self._builder = Builder(Project(), None, MessageHandler(True, False))
+
+    def test_concurrent(self):
+        """ Test that commands run at the same time. """
+
+        start = time.monotonic()
+
+        processes = [self._builder.start(FAST, "Unable to run")
+                for _ in range(4)]
+        self._builder.wait(*processes)
+
+        self.assertLess(time.monotonic() - start, 4 * 0.5)
+
+    def test_cancel_one(self):
+        """ Test that cancelling one of two concurrent commands doesn't affect
+        the other.
+        """
+
+        slow = self._builder.start(SLOW, "Unable to run slow")
+        fast = self._builder.start(FAST, "Unable to run fast")
+
+        self._builder.cancel(slow)
+
+        with self.assertRaises(UserException) as cm:
+            self._builder.wait(slow)
+
+        self.assertEqual(cm.exception.text, "The build was cancelled")
+
+        # The other command is still running and succeeds.
+        self.assertFalse(fast.poll(0))
+        self._builder.wait(fast)
+
+    def test_cancel_all(self):
+        """ Test that cancelling with no arguments cancels every command that
+        hasn't been waited for.
+        """
+
+        first = self._builder.start(SLOW, "Unable to run first")
+        second = self._builder.start(SLOW, "Unable to run second")
+
+        self._builder.cancel()
+
+        with self.assertRaises(UserException) as cm:
+            self._builder.wait(first, second)
+
+        self.assertEqual(cm.exception.text, "The build was cancelled")
+
+    def test_stale_cancel(self):
+        """ Test that a cancel doesn't affect commands started afterwards. """
+
+        self._builder.run(FAST, "Unable to run")
+        self._builder.cancel()
+
+        cancelled = self._builder.start(SLOW, "Unable to run slow")
+        self._builder.cancel()
+
+        with self.assertRaises(UserException):
+            self._builder.wait(cancelled)
+
+        # Neither of the earlier cancels apply.
+        self._builder.run(FAST, "Unable to run")
+
+    def test_failure(self):
+        """ Test that a failed command kills the others. """
+
+        failing = self._builder.start([sys.executable, '-c', 'exit(1)'],
+                "Unable to run failing")
+        slow = self._builder.start(SLOW, "Unable to run slow")
+
+        start = time.monotonic()
+
+        with self.assertRaises(UserException) as cm:
+            self._builder.wait(failing, slow)
+
+        self.assertEqual(cm.exception.text, "Unable to run failing")
+        self.assertLess(time.monotonic() - start, 30)
+
+
+if __name__ == '__main__':
+    unittest.main()
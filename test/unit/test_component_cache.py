@@ -0,0 +1,257 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from pyqtdeploy.sysroot.component import ComponentOption
+from pyqtdeploy.sysroot.component_cache import ComponentCache
+
+
+class _Sysroot:
+    """ The parts of a sysroot used by the cache. """
+
+    def __init__(self, sysroot_dir):
+        """ Initialise the object. """
+
+        self.sysroot_dir = sysroot_dir
+        self.target_arch_name = 'linux-64'
+        self.android_api = None
+        self.apple_sdk = None
+
+
+class _Component:
+    """ The parts of a component used by the cache. """
+
+    options = [ComponentOption('version'), ComponentOption('static')]
+
+    def __init__(self, name='zlib', version='1.2.11', static=True):
+        """ Initialise the object. """
+
+        self.name = name
+        self.version = version
+        self.static = static
+
+
+@mock.patch('pyqtdeploy.sysroot.component_cache._compiler_identity',
+        lambda: 'cc 1.0')
+class ComponentCacheTests(unittest.TestCase):
+    """ Test the cache of components. """
+
+    def setUp(self):
+        """ Create the cache, sysroot and source directories. """
+
+        self._temp_dir = tempfile.TemporaryDirectory()
+
+        self._cache_dir = os.path.join(self._temp_dir.name, 'cache')
+        self._sysroot = _Sysroot(os.path.join(self._temp_dir.name, 'sysroot'))
+        self._source_dir = os.path.join(self._temp_dir.name, 'source')
+
+        os.makedirs(self._sysroot.sysroot_dir)
+        os.makedirs(self._source_dir)
+
+    def tearDown(self):
+        """ Remove the directories. """
+
+        self._temp_dir.cleanup()
+
+    def test_inputs_key(self):
+        """ Test the inputs key changes when an input changes. """
+
+        key = self._inputs_key(_Component())
+
+        self.assertEqual(self._inputs_key(_Component()), key)
+        self.assertNotEqual(self._inputs_key(_Component(name='bzip2')), key)
+        self.assertNotEqual(self._inputs_key(_Component(version='1.2.10')),
+                key)
+        self.assertNotEqual(self._inputs_key(_Component(static=False)), key)
+        self.assertNotEqual(
+                self._inputs_key(_Component(), dependency_keys={'a': 'b'}),
+                key)
+
+        self._sysroot.target_arch_name = 'android-32'
+        self.assertNotEqual(self._inputs_key(_Component()), key)
+
+    def test_format(self):
+        """ Test the inputs key changes when the format changes. """
+
+        key = self._inputs_key(_Component())
+
+        with mock.patch.object(ComponentCache, 'FORMAT',
+                ComponentCache.FORMAT + 1):
+            self.assertNotEqual(self._inputs_key(_Component()), key)
+
+    def test_environment(self):
+        """ Test the inputs key changes when the toolchain's environment
+        changes.
+        """
+
+        key = self._inputs_key(_Component())
+
+        with mock.patch.dict(os.environ, {'CFLAGS': '-O0'}):
+            self.assertNotEqual(self._inputs_key(_Component()), key)
+
+        with mock.patch.dict(os.environ, {'PATH': '/nowhere'}):
+            self.assertEqual(self._inputs_key(_Component()), key)
+
+    def test_compiler(self):
+        """ Test the inputs key changes when the compiler changes. """
+
+        key = self._inputs_key(_Component())
+
+        with mock.patch(
+                'pyqtdeploy.sysroot.component_cache._compiler_identity',
+                lambda: 'cc 2.0'):
+            self.assertNotEqual(self._inputs_key(_Component()), key)
+
+    def test_toolchain_key_memoised(self):
+        """ Test the toolchain is identified before any component can change
+        the environment.
+        """
+
+        cache = ComponentCache(self._cache_dir)
+        key = cache.get_inputs_key(_Component(), self._sysroot, {})
+
+        with mock.patch.dict(os.environ, {'CC': 'clang'}):
+            self.assertEqual(
+                    cache.get_inputs_key(_Component(), self._sysroot, {}),
+                    key)
+
+    def test_found_file(self):
+        """ Test the key changes when the contents of a found file change. """
+
+        archive = self._write_source('zlib-1.2.11.tar.gz', b'1234')
+
+        key = self._key([archive])
+
+        self.assertEqual(self._key([archive, archive]), key)
+        self.assertNotEqual(self._key([]), key)
+
+        self._write_source('zlib-1.2.11.tar.gz', b'4321')
+        self.assertNotEqual(self._key([archive]), key)
+
+    def test_found_directory(self):
+        """ Test the key changes when the contents of a found directory
+        change.
+        """
+
+        install_dir = os.path.join(self._source_dir, 'Qt')
+        self._write_source('Qt/lib/libQt5Core.a', b'1234')
+
+        key = self._key([install_dir])
+
+        # A new file.
+        self._write_source('Qt/lib/libQt5Gui.a', b'1234')
+        new_key = self._key([install_dir])
+        self.assertNotEqual(new_key, key)
+
+        # A file with a different size.
+        self._write_source('Qt/lib/libQt5Gui.a', b'12345')
+        self.assertNotEqual(self._key([install_dir]), new_key)
+
+        # A renamed file.
+        os.rename(os.path.join(install_dir, 'lib', 'libQt5Gui.a'),
+                os.path.join(install_dir, 'lib', 'libQt5Widgets.a'))
+        self.assertNotEqual(self._key([install_dir]), new_key)
+
+    def test_store_and_restore(self):
+        """ Test an entry can be stored, found and restored. """
+
+        archive = self._write_source('zlib-1.2.11.tar.gz', b'1234')
+        sysroot_dir = self._sysroot.sysroot_dir
+
+        cache = ComponentCache(self._cache_dir)
+        inputs_key = cache.get_inputs_key(_Component(), self._sysroot, {})
+
+        self.assertIsNone(cache.lookup(inputs_key))
+
+        before = cache.snapshot(sysroot_dir, ['src'])
+
+        self._write(os.path.join(sysroot_dir, 'include', 'zlib.h'), b'h')
+        self._write(os.path.join(sysroot_dir, 'lib', 'libz.a'), b'a')
+        self._write(os.path.join(sysroot_dir, 'src', 'zlib.c'), b'c')
+        os.symlink('libz.a', os.path.join(sysroot_dir, 'lib', 'libz.so'))
+
+        changes = cache.changes(before, cache.snapshot(sysroot_dir, ['src']))
+
+        self.assertEqual(changes,
+                ['include', 'include/zlib.h', 'lib', 'lib/libz.a',
+                        'lib/libz.so'])
+
+        key = cache.store(inputs_key, [archive], sysroot_dir, changes)
+
+        # A new cache instance can find the entry.
+        cache = ComponentCache(self._cache_dir)
+        inputs_key = cache.get_inputs_key(_Component(), self._sysroot, {})
+
+        self.assertEqual(cache.lookup(inputs_key), key)
+
+        restored_dir = os.path.join(self._temp_dir.name, 'restored')
+        cache.restore(key, restored_dir)
+
+        with open(os.path.join(restored_dir, 'lib', 'libz.a'), 'rb') as f:
+            self.assertEqual(f.read(), b'a')
+
+        self.assertEqual(
+                os.readlink(os.path.join(restored_dir, 'lib', 'libz.so')),
+                'libz.a')
+        self.assertFalse(os.path.exists(os.path.join(restored_dir, 'src')))
+
+        # The entry is not used if a found file changes.
+        self._write_source('zlib-1.2.11.tar.gz', b'4321')
+
+        cache = ComponentCache(self._cache_dir)
+        self.assertIsNone(cache.lookup(inputs_key))
+
+    def test_changes(self):
+        """ Test that a modified file is detected. """
+
+        file_name = os.path.join(self._sysroot.sysroot_dir, 'lib', 'libz.a')
+        self._write(file_name, b'a')
+
+        before = ComponentCache.snapshot(self._sysroot.sysroot_dir, [])
+
+        # Make sure the modification time changes.
+        stat = os.stat(file_name)
+        os.utime(file_name,
+                ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+
+        after = ComponentCache.snapshot(self._sysroot.sysroot_dir, [])
+
+        self.assertEqual(ComponentCache.changes(before, after), ['lib/libz.a'])
+
+    def _inputs_key(self, component, dependency_keys=None):
+        """ Return the inputs key of a component using a new cache. """
+
+        cache = ComponentCache(self._cache_dir)
+
+        return cache.get_inputs_key(component, self._sysroot,
+                dependency_keys or {})
+
+    def _key(self, found_files):
+        """ Return the key of an entry using a new cache. """
+
+        cache = ComponentCache(self._cache_dir)
+
+        return cache.get_key(self._inputs_key(_Component()), found_files)
+
+    def _write_source(self, name, data):
+        """ Write a file in the source directory and return its name. """
+
+        file_name = os.path.join(self._source_dir, name)
+        self._write(file_name, data)
+
+        return file_name
+
+    @staticmethod
+    def _write(file_name, data):
+        """ Write some data to a file creating any intermediate directories.
+        """
+
+        os.makedirs(os.path.dirname(file_name), exist_ok=True)
+
+        with open(file_name, 'wb') as f:
+            f.write(data)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+import unittest
+from unittest import mock
+
+from pyqtdeploy import UserException
+from pyqtdeploy.sysroot import ComponentBase
+from pyqtdeploy.sysroot.sysroot import Sysroot
+
+
+class _Component(ComponentBase):
+    """ A component that depends on every component before it. """
+
+    def __init__(self, name):
+        """ Initialise the object. """
+
+        self.name = name
+
+    def build(self, sysroot):
+        """ Build the component. """
+
+
+class _ExplicitComponent(_Component):
+    """ A component with an explicit sequence of dependencies. """
+
+    def __init__(self, name, dependencies):
+        """ Initialise the object. """
+
+        super().__init__(name)
+
+        self.dependencies = dependencies
+
+
+class _PythonComponent(_Component):
+    """ A component whose dependencies depend on its configuration in the same
+    way as the python plugin.
+    """
+
+    def __init__(self, name, build_target_from_source):
+        """ Initialise the object. """
+
+        super().__init__(name)
+
+        self.build_target_from_source = build_target_from_source
+
+    @property
+    def dependencies(self):
+        """ The components that must be built first. """
+
+        return ['qt5'] if self.build_target_from_source else []
+
+
+class _Specification:
+    """ The parts of a specification used when ordering components. """
+
+    def __init__(self, components):
+        """ Initialise the object. """
+
+        self.components = components
+
+
+class ComponentOrderTests(unittest.TestCase):
+    """ Test the ordering of component builds according to their dependencies.
+    """
+
+    def test_implicit(self):
+        """ Test that by default a component depends on every earlier one. """
+
+        sysroot = self._create_sysroot([_Component('a'), _Component('b'),
+                _Component('c')])
+
+        self.assertEqual(sysroot._get_all_dependencies(),
+                {'a': set(), 'b': {'a'}, 'c': {'a', 'b'}})
+
+    def test_explicit(self):
+        """ Test that explicit dependencies are followed and unknown names are
+        ignored.
+        """
+
+        components = [_ExplicitComponent('openssl', ['zlib', 'unknown']),
+                _ExplicitComponent('qt5', ['openssl']),
+                _ExplicitComponent('zlib', []),
+                _ExplicitComponent('sip', ())]
+
+        sysroot = self._create_sysroot(components)
+
+        self.assertEqual(sysroot._get_all_dependencies(),
+                {'openssl': {'zlib'}, 'qt5': {'openssl', 'zlib'},
+                        'zlib': set(), 'sip': set()})
+
+        self.assertEqual(self._build_order(sysroot, components),
+                ['zlib', 'openssl', 'qt5', 'sip'])
+
+    def test_property(self):
+        """ Test that dependencies implemented as a property are followed. """
+
+        from_source = _PythonComponent('python', True)
+        existing = _PythonComponent('python', False)
+
+        for python, order in ((from_source, ['qt5', 'python']),
+                (existing, ['python', 'qt5'])):
+            components = [python, _ExplicitComponent('qt5', [])]
+            sysroot = self._create_sysroot(components)
+
+            self.assertEqual(self._build_order(sysroot, components), order)
+
+    def test_indirect(self):
+        """ Test that indirect dependencies order a subset of components. """
+
+        components = [_ExplicitComponent('pyqt5', ['sip']),
+                _ExplicitComponent('sip', ['python']),
+                _ExplicitComponent('python', [])]
+
+        sysroot = self._create_sysroot(components)
+
+        self.assertEqual(
+                self._build_order(sysroot, [components[0], components[2]]),
+                ['python', 'pyqt5'])
+
+    def test_cycle(self):
+        """ Test that a cycle of dependencies is reported. """
+
+        sysroot = self._create_sysroot([_ExplicitComponent('a', ['c']),
+                _ExplicitComponent('b', ['a']),
+                _ExplicitComponent('c', ['b'])])
+
+        with self.assertRaises(UserException) as cm:
+            sysroot._get_all_dependencies()
+
+        self.assertIn("depends on itself", cm.exception.text)
+
+    def test_self(self):
+        """ Test that a component that depends on itself is reported. """
+
+        sysroot = self._create_sysroot([_ExplicitComponent('a', ['a'])])
+
+        with self.assertRaises(UserException):
+            sysroot._get_all_dependencies()
+
+    @staticmethod
+    def _create_sysroot(components):
+        """ Return a sysroot for a sequence of components without reading a
+        specification.
+        """
+
+        sysroot = Sysroot.__new__(Sysroot)
+        sysroot._specification = _Specification(components)
+
+        return sysroot
+
+    @staticmethod
+    def _build_order(sysroot, components):
+        """ Build a sequence of components one at a time and return the names
+        in the order they were built.
+        """
+
+        built = []
+
+        sysroot._all_dependencies = sysroot._get_all_dependencies()
+        dependencies = sysroot._get_dependencies(components)
+
+        with mock.patch.multiple(sysroot,
+                _build_component=lambda c: built.append(c.name),
+                _restore_component=lambda component, cache: False,
+                _take_snapshot=lambda cache: None,
+                _cache_component=lambda *args: None):
+            sysroot._build_serially(components, dependencies, None)
+
+        return built
+
+
+if __name__ == '__main__':
+    unittest.main()
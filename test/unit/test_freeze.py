@@ -0,0 +1,427 @@
+import csv
+import importlib.machinery
+import importlib.util
+import marshal
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+
+# The name of the freeze script that is run by the builder.
+FREEZE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..',
+        'pyqtdeploy', 'builder', 'lib', 'freeze.python')
+
+
+def load_freeze():
+    """ Load the freeze script that is run by the builder. """
+
+    loader = importlib.machinery.SourceFileLoader('freeze', FREEZE)
+    module = importlib.util.module_from_spec(
+            importlib.util.spec_from_loader('freeze', loader))
+    loader.exec_module(module)
+
+    return module
+
+
+freeze = load_freeze()
+
+
+# The source code used by most of the tests.
+SOURCE = b'''"""The module docstring."""
+
+def documented():
+    """A function docstring."""
+
+def function(arg):
+    """Another function docstring."""
+
+    return ('a long shared constant', arg, 1.5, 0.0)
+
+class Klass:
+    """A class docstring."""
+
+    def method(self):
+        return ('a long shared constant', -0.0, self)
+'''
+
+
+class FreezeTestCase(unittest.TestCase):
+    """ The base class for tests of the freeze script. """
+
+    def setUp(self):
+        """ Create a temporary directory containing the source code. """
+
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._py_filename = self._write('module.py', SOURCE)
+
+    def tearDown(self):
+        """ Restore the state of the freeze script and remove the temporary
+        directory.
+        """
+
+        freeze._cache = None
+        freeze._strip = ()
+        freeze._marshal_version = marshal.version
+
+        self._temp_dir.cleanup()
+
+    def _path(self, name):
+        """ Return the name of a file in the temporary directory. """
+
+        return os.path.join(self._temp_dir.name, name)
+
+    def _write(self, name, source):
+        """ Write some source code and return the name of the file. """
+
+        file_name = self._path(name)
+
+        with open(file_name, 'wb') as f:
+            f.write(source)
+
+        return file_name
+
+
+class FreezeCacheTests(FreezeTestCase):
+    """ Test the cache of frozen code. """
+
+    def test_cache(self):
+        """ Test that frozen code is found in the cache. """
+
+        cache_dir = self._path('cache')
+        freeze._init_process(cache_dir, (), False)
+
+        job = (self._path('module.pyo'), self._py_filename, 'module', 'data')
+
+        self.assertEqual(freeze._freeze_job(job), (None, False))
+
+        with open(job[0], 'rb') as f:
+            code = f.read()
+
+        self.assertEqual(freeze._freeze_job(job), (None, True))
+
+        with open(job[0], 'rb') as f:
+            self.assertEqual(f.read(), code)
+
+        # A change to the source isn't found.
+        self._write('module.py', SOURCE + b'\nx = 1\n')
+        self.assertEqual(freeze._freeze_job(job), (None, False))
+
+    def test_cache_key(self):
+        """ Test that the key changes when anything affecting the code
+        changes.
+        """
+
+        cache_dir = self._path('cache')
+
+        freeze._init_process(cache_dir, (), False)
+        key = freeze._cache.key(SOURCE, 'module')
+
+        self.assertEqual(freeze._cache.key(SOURCE, 'module'), key)
+        self.assertNotEqual(freeze._cache.key(SOURCE + b' ', 'module'), key)
+        self.assertNotEqual(freeze._cache.key(SOURCE, 'other'), key)
+
+        freeze._init_process(cache_dir, ('docstrings', ), False)
+        self.assertNotEqual(freeze._cache.key(SOURCE, 'module'), key)
+
+        freeze._init_process(cache_dir, (), True)
+
+        if marshal.version != freeze.REPRODUCIBLE_MARSHAL_VERSION:
+            self.assertNotEqual(freeze._cache.key(SOURCE, 'module'), key)
+
+    def test_cache_eviction(self):
+        """ Test that the least recently used entries are evicted. """
+
+        cache = freeze.FreezeCache(self._path('cache'))
+        now = time.time()
+
+        for nr in range(10):
+            key = '%064x' % nr
+            cache.put(key, b'x' * 100)
+
+            # Make the first entries the least recently used.
+            os.utime(cache._entry_name(key), (now + nr, now + nr))
+
+        cache.evict(450)
+
+        present = [nr for nr in range(10)
+                if cache.get('%064x' % nr) is not None]
+
+        self.assertEqual(present, [6, 7, 8, 9])
+
+
+class FreezeTests(FreezeTestCase):
+    """ Test the freezing of Python source code. """
+
+    def test_unchanged(self):
+        """ Test the frozen code behaves like the source. """
+
+        freeze._init_process(None, (), False)
+
+        module = self._exec(self._freeze())
+
+        self.assertEqual(module['__doc__'], "The module docstring.")
+        self.assertEqual(module['documented'].__doc__, "A function docstring.")
+        self.assertEqual(module['function'](2),
+                ('a long shared constant', 2, 1.5, 0.0))
+        self.assertEqual(module['Klass']().method()[:2],
+                ('a long shared constant', -0.0))
+
+    def test_strip_docstrings(self):
+        """ Test the stripping of docstrings. """
+
+        freeze._init_process(None, ('docstrings', ), False)
+
+        module = self._exec(self._freeze())
+
+        self.assertIsNone(module.get('__doc__'))
+        self.assertIsNone(module['documented'].__doc__)
+        self.assertIsNone(module['documented']())
+        self.assertIsNone(module['function'].__doc__)
+        self.assertIsNone(module['Klass'].__doc__)
+        self.assertEqual(module['function'](2),
+                ('a long shared constant', 2, 1.5, 0.0))
+
+        # The docstrings mustn't be left in the code objects.
+        self.assertNotIn(b'docstring', self._freeze())
+
+    def test_strip_filenames(self):
+        """ Test the stripping of file names. """
+
+        freeze._init_process(None, ('filenames', ), False)
+
+        co = marshal.loads(
+                freeze._get_marshalled_code(self._py_filename,
+                        '/some/where/module.py'))
+
+        for code in self._code_objects(co):
+            self.assertEqual(code.co_filename, 'module.py')
+
+    @unittest.skipIf(sys.hexversion >= 0x030a0000,
+            "line numbers are only stripped before Python v3.10")
+    def test_strip_lines(self):
+        """ Test the stripping of line numbers. """
+
+        freeze._init_process(None, ('lines', ), False)
+
+        co = marshal.loads(self._freeze())
+
+        for code in self._code_objects(co):
+            self.assertEqual(code.co_lnotab, b'')
+
+    def test_shared_constants(self):
+        """ Test that equal constants are shared. """
+
+        freeze._init_process(None, (), False)
+
+        constants = {}
+
+        # Create equal objects that are not the same object.
+        first = ''.join(['a long ', 'shared constant'])
+        second = ''.join(['a long shared ', 'constant'])
+        self.assertIsNot(first, second)
+
+        self.assertIs(freeze._share_constant(first, constants), first)
+        self.assertIs(freeze._share_constant(second, constants), first)
+
+        # Equal tuples are shared once their items are.
+        first_tuple = (first, 1.5)
+        second_tuple = (second, 1.5)
+
+        self.assertIs(freeze._share_constant(first_tuple, constants),
+                first_tuple)
+        self.assertIs(freeze._share_constant(second_tuple, constants),
+                first_tuple)
+
+        # 0.0 and -0.0 are equal but must be kept distinct.
+        zero = freeze._share_constant(0.0, constants)
+        negative_zero = freeze._share_constant(-0.0, constants)
+        self.assertEqual(str(zero), '0.0')
+        self.assertEqual(str(negative_zero), '-0.0')
+
+        # Small constants are not worth sharing.
+        first_int = int('1000')
+        second_int = int('1000')
+        self.assertIsNot(first_int, second_int)
+
+        self.assertIs(freeze._share_constant(first_int, constants), first_int)
+        self.assertIs(freeze._share_constant(second_int, constants),
+                second_int)
+
+    def test_unshared_constants(self):
+        """ Test that constants are not shared when the marshal format has no
+        references.
+        """
+
+        freeze._init_process(None, (), True)
+
+        constants = {}
+
+        first = ''.join(['a long ', 'shared constant'])
+        second = ''.join(['a long shared ', 'constant'])
+
+        self.assertIs(freeze._share_constant(first, constants), first)
+        self.assertIs(freeze._share_constant(second, constants), second)
+        self.assertFalse(constants)
+
+    def test_reproducible(self):
+        """ Test that reproducible code doesn't use references. """
+
+        freeze._init_process(None, (), True)
+
+        code = self._freeze()
+
+        self.assertEqual(freeze._marshal_version,
+                freeze.REPRODUCIBLE_MARSHAL_VERSION)
+
+        # Without references the code is the same as that marshalled directly.
+        co = compile(SOURCE, 'module', 'exec')
+        self.assertEqual(code, marshal.dumps(co, 2))
+
+    def test_as_c(self):
+        """ Test the freezing of source code as C. """
+
+        freeze._init_process(None, (), False)
+
+        c_filename = self._path('frozen_main.h')
+        freeze.freeze_as_c(self._py_filename, c_filename, 'pyqtdeploy_main')
+
+        with open(c_filename) as f:
+            c_source = f.read()
+
+        self.assertTrue(
+                c_source.startswith(
+                        'static unsigned char frozen_pyqtdeploy_main[] = {'))
+
+        data = bytes([int(b) for b in re.findall(r'(\d+),', c_source)])
+        self.assertEqual(marshal.loads(data).co_filename, 'module.py')
+
+    def test_syntax_error(self):
+        """ Test that a syntax error is reported. """
+
+        freeze._init_process(None, (), False)
+
+        py_filename = self._write('bad.py', b'def (:\n')
+
+        with self.assertRaises(freeze.FreezeError):
+            freeze._get_marshalled_code(py_filename, 'bad')
+
+    def _code_objects(self, co):
+        """ Return a list of a code object and those nested in it. """
+
+        code_objects = [co]
+
+        for const in co.co_consts:
+            if hasattr(const, 'co_consts'):
+                code_objects.extend(self._code_objects(const))
+
+        return code_objects
+
+    @staticmethod
+    def _exec(code):
+        """ Execute some marshalled code and return the module's namespace.
+        """
+
+        namespace = {'__name__': 'module'}
+        exec(marshal.loads(code), namespace)
+
+        return namespace
+
+    def _freeze(self):
+        """ Return the frozen code of the test source. """
+
+        return freeze._get_marshalled_code(self._py_filename, 'module')
+
+
+class FreezeJobsTests(FreezeTestCase):
+    """ Test the freezing of a number of files concurrently. """
+
+    def test_concurrent(self):
+        """ Test that freezing concurrently gives the same results. """
+
+        jobs = []
+
+        for nr in range(20):
+            name = 'module{0}'.format(nr)
+            py_filename = self._write(name + '.py',
+                    SOURCE + 'x = {0}\n'.format(nr).encode())
+            jobs.append([name, py_filename, name, 'C' if nr == 0 else 'data'])
+
+        serial_out, serial = self._run(jobs, 'serial', 1)
+        concurrent_out, concurrent = self._run(jobs, 'concurrent', 4)
+
+        # The progress messages are in the order of the jobs.
+        self.assertEqual(concurrent_out, serial_out)
+        self.assertEqual(concurrent, serial)
+
+        namespace = {}
+        exec(marshal.loads(concurrent[1]), namespace)
+        self.assertEqual(namespace['x'], 1)
+
+    def test_error(self):
+        """ Test that an error stops the freezing. """
+
+        jobs = []
+
+        for nr in range(10):
+            name = 'module{0}'.format(nr)
+            source = b'def (:\n' if nr == 5 else SOURCE
+            py_filename = self._write(name + '.py', source)
+            jobs.append([self._path(name + '.out'), py_filename, name,
+                    'data'])
+
+        process = self._run_freeze(self._write_jobs(jobs, 'error'), 4)
+
+        self.assertEqual(process.returncode, 1)
+        self.assertIn('module5', process.stderr)
+        self.assertTrue(
+                process.stdout.endswith(
+                        "Freezing %s...\n" % self._path('module5.py')))
+
+    def _run(self, jobs, subdir, nr_jobs):
+        """ Freeze some jobs into a sub-directory and return the output of
+        the script and the frozen code of each job.
+        """
+
+        out_dir = self._path(subdir)
+        os.mkdir(out_dir)
+
+        jobs = [[os.path.join(out_dir, name + '.out'), py_filename, name,
+                        conversion]
+                for _, py_filename, name, conversion in jobs]
+
+        process = self._run_freeze(self._write_jobs(jobs, subdir), nr_jobs)
+        self.assertEqual(process.returncode, 0, process.stderr)
+
+        frozen = []
+
+        for job in jobs:
+            with open(job[0], 'rb') as f:
+                frozen.append(f.read())
+
+        return process.stdout, frozen
+
+    def _run_freeze(self, jobs_file, nr_jobs):
+        """ Run the freeze script and return the completed process. """
+
+        return subprocess.run(
+                [sys.executable, FREEZE, '--jobs', str(nr_jobs), jobs_file],
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                universal_newlines=True)
+
+    def _write_jobs(self, jobs, name):
+        """ Write a jobs file and return its name. """
+
+        jobs_file = self._path(name + '.csv')
+
+        with open(jobs_file, 'w', newline='') as f:
+            csv.writer(f).writerows(jobs)
+
+        return jobs_file
+
+
+if __name__ == '__main__':
+    unittest.main()
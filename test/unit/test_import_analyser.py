@@ -0,0 +1,215 @@
+import os
+import tempfile
+import unittest
+
+from pyqtdeploy.project import Project, QrcDirectory, QrcFile
+from pyqtdeploy.project import import_analyser
+from pyqtdeploy.project.import_analyser import analyse_imports
+from pyqtdeploy.user_exception import UserException
+
+
+class ParseImportsTests(unittest.TestCase):
+    """ Test the parsing of the imports of a single module. """
+
+    def test_absolute(self):
+        """ Test absolute imports. """
+
+        names = self._parse('''
+import os, os.path
+import xml.dom.minidom as minidom
+from collections import OrderedDict, abc
+from __future__ import print_function
+
+def f():
+    import json
+''')
+
+        self.assertEqual(sorted(names),
+                ['collections', 'collections.OrderedDict', 'collections.abc',
+                        'json', 'os', 'os.path', 'xml.dom.minidom'])
+
+    def test_relative(self):
+        """ Test relative imports are made absolute. """
+
+        source = '''
+from . import sibling
+from .sub import helper
+from .. import parent_module
+from ... import too_far
+'''
+
+        self.assertEqual(sorted(self._parse(source, 'app.core')),
+                ['app', 'app.sibling', 'app.sub', 'app.sub.helper'])
+
+        # A package's own module is the base of its relative imports.
+        self.assertEqual(sorted(self._parse(source, 'app.pkg', True)),
+                ['app', 'app.parent_module', 'app.pkg', 'app.pkg.sibling',
+                        'app.pkg.sub', 'app.pkg.sub.helper'])
+
+    def test_dynamic(self):
+        """ Test calls to import_module() and __import__() with a literal name.
+        """
+
+        names = self._parse('''
+import importlib
+importlib.import_module('json')
+__import__('csv')
+importlib.import_module(name)
+importlib.import_module('.relative', 'app')
+''')
+
+        self.assertEqual(sorted(names), ['csv', 'importlib', 'json'])
+
+    def test_scan_fallback(self):
+        """ Test source that cannot be parsed is scanned instead. """
+
+        names = self._parse('''
+import urllib2, os  # A comment.
+from .compat import (text_type,
+        binary_type)
+print "Python v2"
+''', 'app.core')
+
+        self.assertEqual(sorted(names),
+                ['app.compat', 'app.compat.text_type', 'os', 'urllib2'])
+
+    def test_unreadable(self):
+        """ Test the error returned for a missing file. """
+
+        path, names, error = import_analyser._parse_imports(
+                ('app', '/no/such/file.py', False))
+
+        self.assertEqual(path, '/no/such/file.py')
+        self.assertIsNone(names)
+        self.assertIsNotNone(error)
+
+    def _parse(self, source, module_name='__main__', is_package=False):
+        """ Return the names imported by some source code. """
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'module.py')
+
+            with open(path, 'w') as f:
+                f.write(source)
+
+            _, names, error = import_analyser._parse_imports(
+                    (module_name, path, is_package))
+
+        self.assertIsNone(error)
+
+        return names
+
+
+class AnalyseImportsTests(unittest.TestCase):
+    """ Test the analysis of the imports of a project. """
+
+    def setUp(self):
+        """ Create a project with an application package. """
+
+        self._temp_dir = tempfile.TemporaryDirectory()
+
+        self._write('app/__init__.py', 'from . import core\n')
+        self._write('app/core.py',
+                'import json\nfrom .sub import helper\nimport third\n')
+        self._write('app/sub/__init__.py', '')
+        self._write('app/sub/helper.py',
+                'from .. import core\nfrom PyQt5 import QtWidgets\n'
+                'import missing_module\n')
+        self._write('site/third/__init__.py', 'import csv\n')
+
+        self._project = Project()
+
+        app = self._project.application_package
+        app.name = self._path('app')
+        app.contents = [QrcFile('__init__.py'), QrcFile('core.py'),
+                self._directory('sub', '__init__.py', 'helper.py')]
+
+        site = self._project.application_package.copy()
+        site.name = self._path('site')
+        site.contents = [self._directory('third', '__init__.py')]
+        self._project.other_packages = [site]
+
+    def tearDown(self):
+        """ Remove the temporary directory. """
+
+        self._temp_dir.cleanup()
+
+    def test_script(self):
+        """ Test the imports of an application script. """
+
+        self._write('main.py', 'import app\nimport sys, os\n')
+        self._project.application_script = self._path('main.py')
+
+        self.assertEqual(analyse_imports(self._project, jobs=1),
+                (['csv', 'json', 'os'], ['QtWidgets'], ['missing_module']))
+
+    def test_entry_point(self):
+        """ Test the imports of an application entry point. """
+
+        self._project.application_entry_point = 'app.core:main'
+
+        self.assertEqual(analyse_imports(self._project, jobs=1),
+                (['csv', 'json'], ['QtWidgets'], ['missing_module']))
+
+    def test_missing_entry_point(self):
+        """ Test that a non-local entry point module is reported. """
+
+        self._project.application_package.name = None
+        self._project.application_entry_point = 'elsewhere.module:main'
+
+        self.assertEqual(analyse_imports(self._project, jobs=1),
+                ([], [], ['elsewhere']))
+
+    def test_concurrent(self):
+        """ Test that parsing concurrently gives the same results. """
+
+        self._project.application_entry_point = 'app:main'
+
+        serial = analyse_imports(self._project, jobs=1)
+
+        saved = import_analyser._MIN_CONCURRENT_FILES
+        import_analyser._MIN_CONCURRENT_FILES = 1
+
+        try:
+            self.assertEqual(
+                    analyse_imports(self._project, jobs=2, use_threads=True),
+                    serial)
+            self.assertEqual(analyse_imports(self._project, jobs=2), serial)
+        finally:
+            import_analyser._MIN_CONCURRENT_FILES = saved
+
+    def test_unreadable(self):
+        """ Test that an unreadable module is reported. """
+
+        os.remove(self._path('app/core.py'))
+        self._project.application_entry_point = 'app:main'
+
+        with self.assertRaises(UserException):
+            analyse_imports(self._project, jobs=1)
+
+    @staticmethod
+    def _directory(name, *file_names):
+        """ Return a directory containing a number of files. """
+
+        directory = QrcDirectory(name)
+        directory.contents = [QrcFile(file_name) for file_name in file_names]
+
+        return directory
+
+    def _path(self, name):
+        """ Return the name of a file in the temporary directory. """
+
+        return os.path.join(self._temp_dir.name, name)
+
+    def _write(self, name, source):
+        """ Write a source file in the temporary directory. """
+
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with open(path, 'w') as f:
+            f.write(source)
+
+
+if __name__ == '__main__':
+    unittest.main()
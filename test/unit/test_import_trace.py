@@ -0,0 +1,138 @@
+import json
+import os
+import tempfile
+import unittest
+
+from pyqtdeploy import Builder, MessageHandler, Project, UserException
+
+
+# A trace produced by -X importtime with other output mixed in.
+IMPORTTIME_TRACE = '''Starting the application
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 | _io
+import time:        85 |        300 |   encodings.utf_8
+import time:        40 |         40 |     json.decoder
+import time: not a number | 10 | ignored
+import time:        17 |         17 | email.mime.text
+The application has finished
+'''
+
+# A trace produced by an application built with --profile-imports.
+JSON_TRACE = [
+    {"module": "_io", "depth": 1, "find_us": 1, "read_us": 2,
+            "unmarshal_us": 3, "exec_us": 4, "self_us": 10,
+            "cumulative_us": 10},
+    {"module": "json.decoder", "depth": 2, "find_us": 1, "read_us": 2,
+            "unmarshal_us": 3, "exec_us": 4, "self_us": 10,
+            "cumulative_us": 10},
+    {"module": "email.mime.text", "depth": 1, "find_us": 1, "read_us": 2,
+            "unmarshal_us": 3, "exec_us": 4, "self_us": 10,
+            "cumulative_us": 10},
+]
+
+
+class _Module:
+    """ The parts of a StdlibModule used when pruning. """
+
+    def __init__(self, core=False):
+        """ Initialise the object. """
+
+        self.core = core
+
+
+class ImportTraceTests(unittest.TestCase):
+    """ Test the reading of import traces and the pruning of modules. """
+
+    def setUp(self):
+        """ Create a builder and a directory for the traces. """
+
+        self._temp_dir = tempfile.TemporaryDirectory()
+
+        self._builder = Builder(Project(), None, MessageHandler(True, False))
+
+    def tearDown(self):
+        """ Remove the directory for the traces. """
+
+        self._temp_dir.cleanup()
+
+    def test_importtime(self):
+        """ Test reading the format produced by -X importtime. """
+
+        imported = Builder._read_import_trace(
+                self._write('trace.txt', IMPORTTIME_TRACE))
+
+        self.assertEqual(imported, {'_io', 'encodings', 'encodings.utf_8',
+                'json', 'json.decoder', 'email', 'email.mime',
+                'email.mime.text'})
+
+    def test_json(self):
+        """ Test reading the JSON format produced by --profile-imports. """
+
+        imported = Builder._read_import_trace(
+                self._write('trace.json', json.dumps(JSON_TRACE)))
+
+        self.assertEqual(imported, {'_io', 'json', 'json.decoder', 'email',
+                'email.mime', 'email.mime.text'})
+
+    def test_invalid_json(self):
+        """ Test that an invalid JSON trace is reported. """
+
+        with self.assertRaises(UserException):
+            Builder._read_import_trace(self._write('trace.json', '[{"mod'))
+
+    def test_missing(self):
+        """ Test that a missing trace is reported. """
+
+        with self.assertRaises(UserException):
+            Builder._read_import_trace(
+                    os.path.join(self._temp_dir.name, 'missing.txt'))
+
+    def test_prune(self):
+        """ Test that only implicitly required modules that weren't imported
+        are pruned.
+        """
+
+        required_py = {
+            # Imported.
+            'json': _Module(),
+            'json.decoder': _Module(),
+            'email.mime.text': _Module(),
+            # Not imported.
+            'json.encoder': _Module(),
+            'csv': _Module(),
+            # Not imported but explicitly checked.
+            'shutil': _Module(),
+            # Not imported but the parent of an imported module.
+            'email': _Module(),
+            'email.mime': _Module(),
+            # Not imported but always needed by the interpreter.
+            'importlib': _Module(core=True),
+            'sys': _Module(),
+            # Not imported but can't be matched against the trace.
+            'encodings.*': _Module(),
+        }
+
+        required_modules = {name: False for name in required_py}
+        required_modules['shutil'] = True
+
+        self._builder._prune_modules(required_py, required_modules,
+                self._write('trace.json', json.dumps(JSON_TRACE[1:])))
+
+        self.assertEqual(sorted(required_py.keys()),
+                ['email', 'email.mime', 'email.mime.text', 'encodings.*',
+                        'importlib', 'json', 'json.decoder', 'shutil',
+                        'sys'])
+
+    def _write(self, name, trace):
+        """ Write a trace and return its file name. """
+
+        trace_file = os.path.join(self._temp_dir.name, name)
+
+        with open(trace_file, 'w') as f:
+            f.write(trace)
+
+        return trace_file
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from pyqtdeploy import Builder, MessageHandler, Project
+
+
+class UpdateBuildDirTests(unittest.TestCase):
+    """ Test the updating of a build directory by an incremental build. """
+
+    def setUp(self):
+        """ Create a builder and the staging and build directories. """
+
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._staging_dir = os.path.join(self._temp_dir.name, 'staging')
+        self._build_dir = os.path.join(self._temp_dir.name, 'build')
+
+        os.mkdir(self._build_dir)
+
+        self._builder = Builder(Project(), None, MessageHandler(True, False))
+
+    def tearDown(self):
+        """ Remove the directories. """
+
+        self._temp_dir.cleanup()
+
+    def test_update(self):
+        """ Test that only changed files are rewritten and removed files are
+        deleted.
+        """
+
+        self._stage({
+            'unchanged.cpp': b'unchanged',
+            'changed.cpp': b'before',
+            'sub/removed.h': b'removed',
+        })
+
+        # Make any rewrite detectable from the modification times.
+        old_time = 1000000000
+
+        for name in ('unchanged.cpp', 'changed.cpp'):
+            os.utime(os.path.join(self._build_dir, name),
+                    (old_time, old_time))
+
+        self._stage({
+            'unchanged.cpp': b'unchanged',
+            'changed.cpp': b'after',
+        })
+
+        self.assertEqual(
+                os.path.getmtime(
+                        os.path.join(self._build_dir, 'unchanged.cpp')),
+                old_time)
+        self.assertNotEqual(
+                os.path.getmtime(os.path.join(self._build_dir, 'changed.cpp')),
+                old_time)
+        self.assertEqual(self._read('changed.cpp'), b'after')
+
+        # The removed file and its now empty directory have gone.
+        self.assertFalse(os.path.exists(os.path.join(self._build_dir, 'sub')))
+
+        self.assertEqual(self._manifest_names(),
+                ['changed.cpp', 'unchanged.cpp'])
+
+    def test_unrecorded(self):
+        """ Test that files not created by a build are left alone. """
+
+        with open(os.path.join(self._build_dir, 'user.txt'), 'wb') as f:
+            f.write(b'user')
+
+        self._stage({'file.cpp': b'file'})
+        self._stage({})
+
+        self.assertEqual(sorted(os.listdir(self._build_dir)),
+                ['pyqtdeploy.manifest', 'user.txt'])
+        self.assertEqual(self._manifest_names(), [])
+
+    def test_old_manifest(self):
+        """ Test that a manifest without hashes is understood. """
+
+        self._stage({'old.cpp': b'old'})
+
+        with open(os.path.join(self._build_dir, 'pyqtdeploy.manifest'),
+                'w') as f:
+            f.write('old.cpp\n')
+
+        self._stage({})
+
+        self.assertFalse(
+                os.path.exists(os.path.join(self._build_dir, 'old.cpp')))
+
+    def _stage(self, files):
+        """ Create a staging directory containing some files and update the
+        build directory from it.
+        """
+
+        os.mkdir(self._staging_dir)
+
+        for name, data in files.items():
+            file_name = os.path.join(self._staging_dir, name)
+            os.makedirs(os.path.dirname(file_name), exist_ok=True)
+
+            with open(file_name, 'wb') as f:
+                f.write(data)
+
+        self._builder._update_build_dir(self._staging_dir, self._build_dir)
+
+        shutil.rmtree(self._staging_dir)
+
+    def _read(self, name):
+        """ Return the contents of a file in the build directory. """
+
+        with open(os.path.join(self._build_dir, name), 'rb') as f:
+            return f.read()
+
+    def _manifest_names(self):
+        """ Return the names of the files in the manifest. """
+
+        manifest = self._read('pyqtdeploy.manifest').decode()
+
+        return [line[66:] for line in manifest.split('\n') if line]
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,257 @@
+import os
+import select
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from pyqtdeploy import MessageHandler
+from pyqtdeploy.platforms import Architecture
+from pyqtdeploy.sysroot.sysroot import Sysroot
+
+
+class _Component:
+    """ The parts of a component used when building. """
+
+    def __init__(self, name, duration):
+        """ Initialise the object. """
+
+        self.name = name
+        self.duration = duration
+
+
+def _create_sysroot(jobs):
+    """ Return a sysroot with a jobserver for a number of jobs without reading
+    a specification.
+    """
+
+    sysroot = Sysroot.__new__(Sysroot)
+
+    sysroot._host = Architecture.architecture()
+    sysroot._message_handler = MessageHandler(True, False)
+    sysroot._jobs = 1
+    sysroot._jobserver = None
+    sysroot._jom = None
+    sysroot._token_reader = None
+    sysroot._token_notifier = None
+
+    sysroot._start_jobserver(jobs)
+
+    return sysroot
+
+
+@unittest.skipIf(sys.platform == 'win32', "there is no jobserver on Windows")
+class JobserverTests(unittest.TestCase):
+    """ Test the GNU make jobserver shared by concurrent component builds. """
+
+    def setUp(self):
+        """ Create a sysroot with a jobserver. """
+
+        self._sysroot = _create_sysroot(3)
+
+    def tearDown(self):
+        """ Stop the jobserver. """
+
+        self._sysroot._stop_jobserver()
+
+    def test_tokens(self):
+        """ Test that there is one token less than the number of jobs. """
+
+        self.assertTrue(self._sysroot._acquire_job())
+        self.assertTrue(self._sysroot._acquire_job())
+        self.assertFalse(self._sysroot._acquire_job())
+
+        self._sysroot._release_job()
+        self._wait_for_token()
+
+        self.assertTrue(self._sysroot._acquire_job())
+
+    def test_stolen_token(self):
+        """ Test that acquiring a token doesn't block if a make takes all the
+        tokens.
+        """
+
+        # Take the tokens as a make would.
+        os.read(self._sysroot._jobserver[0], 2)
+
+        start = time.monotonic()
+        self.assertFalse(self._sysroot._acquire_job())
+        self.assertFalse(self._sysroot._acquire_job())
+        self.assertLess(time.monotonic() - start, 1)
+
+        # The make gives one back.
+        os.write(self._sysroot._jobserver[1], b'+')
+        self._wait_for_token()
+
+        self.assertTrue(self._sysroot._acquire_job())
+
+    def test_stop_while_reading(self):
+        """ Test that the jobserver can be stopped while a token is being read.
+        """
+
+        os.read(self._sysroot._jobserver[0], 2)
+
+        self.assertFalse(self._sysroot._acquire_job())
+
+        self._sysroot._stop_jobserver()
+
+        self.assertIsNone(self._sysroot._token_reader)
+        self.assertIsNone(self._sysroot._jobserver)
+
+    def _wait_for_token(self):
+        """ Wait for a token to be read. """
+
+        self.assertTrue(
+                select.select([self._sysroot._token_notifier[0]], [], [],
+                        5)[0])
+
+
+@unittest.skipIf(sys.platform == 'win32', "there is no jobserver on Windows")
+class ConcurrentBuildTests(unittest.TestCase):
+    """ Test the number of components built at the same time. """
+
+    def setUp(self):
+        """ Create a file to record the builds. """
+
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._log = os.path.join(self._temp_dir.name, 'builds.log')
+
+    def tearDown(self):
+        """ Remove the file recording the builds. """
+
+        self._temp_dir.cleanup()
+
+    def test_implicit_job_reused(self):
+        """ Test that our implicit job is used by a later build when the build
+        using it finishes first.
+        """
+
+        # 'short' uses the implicit job and 'long' uses the only token.
+        # 'next' must use the implicit job once 'short' has finished.
+        times = self._build([_Component('short', 0.1),
+                _Component('long', 2.0), _Component('next', 0.1)], 2)
+
+        self.assertLess(times['next'][0], times['long'][1])
+
+    def test_jobs_limit(self):
+        """ Test that no more than jobs components are built at the same time.
+        """
+
+        times = self._build([_Component(str(nr), 0.3) for nr in range(6)], 2)
+
+        # Find the largest number of builds running at any time, ending a
+        # build before starting another at the same time.
+        events = sorted([(start, 1) for start, _ in times.values()] +
+                [(end, -1) for _, end in times.values()])
+
+        concurrent = max_concurrent = 0
+
+        for _, change in events:
+            concurrent += change
+            max_concurrent = max(max_concurrent, concurrent)
+
+        self.assertEqual(max_concurrent, 2)
+
+    def _build(self, components, jobs):
+        """ Build some components concurrently and return a dict of the start
+        and end time of each keyed by its name.
+        """
+
+        log = self._log
+
+        def build_component(component):
+            start = time.monotonic()
+            time.sleep(component.duration)
+
+            with open(log, 'a') as f:
+                f.write('{0} {1} {2}\n'.format(component.name, start,
+                        time.monotonic()))
+
+            return []
+
+        sysroot = _create_sysroot(jobs)
+
+        try:
+            with mock.patch.multiple(sysroot,
+                    _build_component=build_component,
+                    _restore_component=lambda component, cache: False,
+                    _cache_component=lambda *args: None):
+                sysroot._build_concurrently(components,
+                        {c.name: set() for c in components}, jobs, None)
+        finally:
+            sysroot._stop_jobserver()
+
+        times = {}
+
+        with open(log) as f:
+            for line in f:
+                name, start, end = line.split()
+                times[name] = (float(start), float(end))
+
+        self.assertEqual(set(times.keys()), {c.name for c in components})
+
+        return times
+
+
+class RunMakeTests(unittest.TestCase):
+    """ Test the running of make. """
+
+    def test_serial(self):
+        """ Test that make is run normally for a single job. """
+
+        sysroot = _create_sysroot(1)
+
+        argv, kwargs = self._run_make(sysroot)
+
+        self.assertEqual(argv, [sysroot.host_make, 'install'])
+        self.assertEqual(kwargs, {})
+
+    @unittest.skipIf(sys.platform == 'win32',
+            "there is no jobserver on Windows")
+    def test_jobserver(self):
+        """ Test that make is told about the jobserver for more than one job.
+        """
+
+        sysroot = _create_sysroot(4)
+
+        try:
+            with mock.patch.dict(os.environ, {'MAKEFLAGS': 'V=1'}):
+                argv, kwargs = self._run_make(sysroot)
+
+            reader, writer = sysroot._jobserver
+        finally:
+            sysroot._stop_jobserver()
+
+        self.assertEqual(argv, [sysroot.host_make, 'install'])
+        self.assertEqual(kwargs['pass_fds'], (reader, writer))
+        self.assertEqual(kwargs['env']['MAKEFLAGS'],
+                '-j --jobserver-fds={0},{1} --jobserver-auth={0},{1} '
+                'V=1'.format(reader, writer))
+
+    def test_jom(self):
+        """ Test that jom is used to run jobs in parallel on Windows. """
+
+        sysroot = _create_sysroot(1)
+        sysroot._jobs = 4
+        sysroot._jom = 'jom'
+
+        argv, kwargs = self._run_make(sysroot)
+
+        self.assertEqual(argv, ['jom', '/J', '4', 'install'])
+        self.assertEqual(kwargs, {})
+
+    @staticmethod
+    def _run_make(sysroot):
+        """ Run make to install and return the arguments it was run with. """
+
+        with mock.patch('subprocess.check_call') as check_call:
+            sysroot.run_make('install')
+
+        args, kwargs = check_call.call_args
+
+        return list(args[0]), kwargs
+
+
+if __name__ == '__main__':
+    unittest.main()
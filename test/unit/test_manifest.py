@@ -0,0 +1,109 @@
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from pyqtdeploy import Builder, MessageHandler, Project
+
+
+# The contents of the files in the build directory keyed by their names
+# using '/' as the separator.
+FILES = {
+    'main.cpp': b'main',
+    'Makefile': b'makefile',
+    'resources/pyqtdeploy.qrc': b'qrc',
+    'resources/stdlib/os.pyo': b'os',
+    'resources/stdlib/xml/__init__.pyo': b'',
+    'resources/stdlib/xml-z.pyo': b'xml-z',
+}
+
+
+class ManifestTests(unittest.TestCase):
+    """ Test the manifest of the build directory. """
+
+    def setUp(self):
+        """ Create a builder and a build directory. """
+
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._build_dir = self._temp_dir.name
+
+        for name, data in FILES.items():
+            file_name = os.path.join(self._build_dir, *name.split('/'))
+            os.makedirs(os.path.dirname(file_name), exist_ok=True)
+
+            with open(file_name, 'wb') as f:
+                f.write(data)
+
+        self._builder = Builder(Project(), None, MessageHandler(True, False))
+
+    def tearDown(self):
+        """ Remove the build directory. """
+
+        self._temp_dir.cleanup()
+
+    def test_format(self):
+        """ Test that each line is the hash and the relative name of a file
+        with '/' separators on every platform.
+        """
+
+        lines = self._write()
+
+        names = []
+
+        for line in lines:
+            match = re.fullmatch(r'([0-9a-f]{64})  (\S.*)', line)
+            self.assertIsNotNone(match, line)
+
+            digest, name = match.groups()
+            self.assertNotIn('\\', name)
+            self.assertEqual(digest, hashlib.sha256(FILES[name]).hexdigest())
+
+            names.append(name)
+
+        self.assertEqual(names, sorted(FILES.keys()))
+
+    def test_rewritten(self):
+        """ Test that the manifest isn't included in a later manifest. """
+
+        first = self._write()
+
+        self.assertEqual(self._write(), first)
+
+    def test_line_endings(self):
+        """ Test that the lines end with a single '\\n' on every platform. """
+
+        self._write()
+
+        with open(os.path.join(self._build_dir, 'pyqtdeploy.manifest'),
+                'rb') as f:
+            manifest = f.read()
+
+        self.assertNotIn(b'\r', manifest)
+        self.assertTrue(manifest.endswith(b'\n'))
+
+    @unittest.skipIf(shutil.which('sha256sum') is None,
+            "sha256sum is not available")
+    def test_sha256sum(self):
+        """ Test that the manifest can be checked by sha256sum. """
+
+        self._write()
+
+        subprocess.check_output(['sha256sum', '--check', '--strict',
+                'pyqtdeploy.manifest'], cwd=self._build_dir)
+
+    def _write(self):
+        """ Write the manifest and return its lines. """
+
+        self._builder._write_manifest(self._build_dir, self._build_dir,
+                self._builder._get_build_files(self._build_dir))
+
+        with open(os.path.join(self._build_dir, 'pyqtdeploy.manifest'),
+                encoding='UTF-8') as f:
+            return f.read().split('\n')[:-1]
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from pyqtdeploy.metadata import (python_metadata_table,
+        supported_python_versions)
+from pyqtdeploy.metadata.python_metadata import get_python_metadata_records
+from pyqtdeploy.metadata.stdlib_module import version_from_tuple
+
+
+class MetadataTableTests(unittest.TestCase):
+    """ Test the compiled table of the standard library meta-data. """
+
+    def setUp(self):
+        """ Write a table compiled from a copy of the source. """
+
+        self._temp_dir = tempfile.TemporaryDirectory()
+
+        self._source_name = os.path.join(self._temp_dir.name,
+                'python_metadata.py')
+        shutil.copyfile(python_metadata_table._source_name, self._source_name)
+
+        self._table_name = os.path.join(self._temp_dir.name,
+                'python_metadata.table')
+
+        patcher = mock.patch.multiple(python_metadata_table,
+                _source_name=self._source_name,
+                _table_name=self._table_name, _metadata_cache={})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        python_metadata_table.write_table(self._table_name)
+
+    def tearDown(self):
+        """ Remove the table. """
+
+        self._temp_dir.cleanup()
+
+    def test_round_trip(self):
+        """ Test that the table contains the same records as the source for
+        every supported version.
+        """
+
+        for version in supported_python_versions:
+            nr = version_from_tuple(version)
+
+            self.assertEqual(python_metadata_table._read_records(nr),
+                    get_python_metadata_records(nr), version)
+
+    def test_metadata(self):
+        """ Test that the meta-data is created from the table. """
+
+        version = supported_python_versions[0]
+        records = get_python_metadata_records(version_from_tuple(version))
+
+        with mock.patch('pyqtdeploy.metadata.python_metadata.'
+                'get_python_metadata_records') as from_source:
+            metadata = python_metadata_table.get_python_metadata(version)
+
+        from_source.assert_not_called()
+
+        self.assertEqual({name: module.record
+                        for name, module in metadata.items()},
+                records)
+
+        # The meta-data is cached.
+        self.assertIs(python_metadata_table.get_python_metadata(version),
+                metadata)
+
+    def test_stale(self):
+        """ Test that a table compiled from a different source is ignored and
+        the source is used instead.
+        """
+
+        with open(self._source_name, 'a') as f:
+            f.write('\n# A change.\n')
+
+        version = supported_python_versions[0]
+        nr = version_from_tuple(version)
+
+        self.assertIsNone(python_metadata_table._read_records(nr))
+
+        with mock.patch('pyqtdeploy.metadata.python_metadata.'
+                'get_python_metadata_records',
+                wraps=get_python_metadata_records) as from_source:
+            metadata = python_metadata_table.get_python_metadata(version)
+
+        from_source.assert_called_once_with(nr)
+
+        self.assertEqual({name: module.record
+                        for name, module in metadata.items()},
+                get_python_metadata_records(nr))
+
+    def test_missing_source(self):
+        """ Test that the table is authoritative if the source is missing. """
+
+        os.remove(self._source_name)
+
+        nr = version_from_tuple(supported_python_versions[0])
+
+        self.assertEqual(python_metadata_table._read_records(nr),
+                get_python_metadata_records(nr))
+
+    def test_unsupported_version(self):
+        """ Test that a version not in the table isn't found. """
+
+        self.assertIsNone(
+                python_metadata_table._read_records(
+                        version_from_tuple((1, 0, 0))))
+
+    def test_corrupt(self):
+        """ Test that a corrupt table is ignored. """
+
+        with open(self._table_name, 'r+b') as f:
+            f.write(b'\xff\xff\xff\xff')
+
+        nr = version_from_tuple(supported_python_versions[0])
+
+        self.assertIsNone(python_metadata_table._read_records(nr))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+import os
+import re
+import tempfile
+import unittest
+
+from pyqtdeploy import Builder, MessageHandler, Project
+
+
+class FNV1aTests(unittest.TestCase):
+    """ Test the hash function used by the module index. """
+
+    def test_empty(self):
+        """ Test that the hash of nothing is the offset basis. """
+
+        self.assertEqual(Builder._fnv1a(b''), 0x811c9dc5)
+
+    def test_vectors(self):
+        """ Test against the published FNV-1a 32 bit test vectors. """
+
+        self.assertEqual(Builder._fnv1a(b'a'), 0xe40c292c)
+        self.assertEqual(Builder._fnv1a(b'b'), 0xe70c2de5)
+        self.assertEqual(Builder._fnv1a(b'foo'), 0xa9f37ed7)
+        self.assertEqual(Builder._fnv1a(b'foobar'), 0xbf9cf968)
+
+
+class ModuleIndexTests(unittest.TestCase):
+    """ Test the generation of the module index. """
+
+    def setUp(self):
+        """ Create a builder and a build directory. """
+
+        self._temp_dir = tempfile.TemporaryDirectory()
+
+        self._project = Project()
+        self._builder = Builder(self._project, None,
+                MessageHandler(True, False))
+        self._builder._build_dir = self._temp_dir.name
+
+    def tearDown(self):
+        """ Remove the build directory. """
+
+        self._temp_dir.cleanup()
+
+    def test_kinds(self):
+        """ Test that every module, package and directory can be found. """
+
+        index = self._write(['app.pyo', 'pkg/__init__.pyo', 'pkg/mod.pyo',
+                'ns/sub/mod.pyo', 'data/file.txt'])
+
+        self.assertEqual(self._lookup(index, 'app'), (3, 0))
+        self.assertEqual(self._lookup(index, 'pkg'), (2, 0))
+        self.assertEqual(self._lookup(index, 'pkg/mod'), (3, 0))
+        self.assertEqual(self._lookup(index, 'ns'), (1, 0))
+        self.assertEqual(self._lookup(index, 'ns/sub'), (1, 0))
+        self.assertEqual(self._lookup(index, 'ns/sub/mod'), (3, 0))
+        self.assertEqual(self._lookup(index, 'data'), (1, 0))
+
+        self.assertIsNone(self._lookup(index, 'missing'))
+        self.assertIsNone(self._lookup(index, 'data/file.txt'))
+
+        # The load factor is no more than 0.5.
+        self.assertGreaterEqual(len(index), 2 * 8)
+
+    def test_collision(self):
+        """ Test that modules whose hashes collide are found by a linear probe.
+        """
+
+        # Find three names that hash to the same slot of the smallest table.
+        names = []
+        nr = 0
+
+        while len(names) < 3:
+            name = 'm{0}'.format(nr)
+
+            if Builder._fnv1a(name.encode()) & 7 == 0:
+                names.append(name)
+
+            nr += 1
+
+        index = self._write([name + '.pyo' for name in names])
+
+        self.assertEqual(len(index), 8)
+
+        # Each name is placed at the first free slot after its hash, in sorted
+        # order.
+        self.assertEqual([entry[0] for entry in index[:3]], sorted(names))
+
+        for name in names:
+            self.assertEqual(self._lookup(index, name), (3, 0))
+
+    def test_lazy(self):
+        """ Test that the modules of a lazily imported package are marked. """
+
+        self._project.python_target_version = (3, 6, 0)
+        self._project.lazy_imports = 'pkg'
+
+        index = self._write(['pkg/__init__.pyo', 'pkg/mod.pyo',
+                'pkgother.pyo'])
+
+        self.assertEqual(self._lookup(index, 'pkg'), (2, 1))
+        self.assertEqual(self._lookup(index, 'pkg/mod'), (3, 1))
+        self.assertEqual(self._lookup(index, 'pkgother'), (3, 0))
+
+    def _write(self, resource_contents):
+        """ Write the module index for some resource contents and return the
+        list of its entries.  Each entry is None or a 3-tuple of the name, kind
+        and lazy flag.
+        """
+
+        self._builder._write_module_index(resource_contents)
+
+        with open(os.path.join(self._temp_dir.name,
+                'pyqtdeploy_module_index.h')) as f:
+            header = f.read()
+
+        size = int(re.search(r'#define PYQTDEPLOY_MODULE_INDEX_SIZE\s+(\d+)',
+                header).group(1))
+
+        index = []
+
+        for name, kind, lazy in re.findall(
+                r'^    \{(0|"[^"]*"), (\d+), (\d+)\},$', header, re.M):
+            if name == '0':
+                index.append(None)
+            else:
+                index.append((name[1:-1], int(kind), int(lazy)))
+
+        self.assertEqual(len(index), size)
+
+        # The size must be a power of 2 for the mask to work.
+        self.assertEqual(size & (size - 1), 0)
+
+        return index
+
+    @staticmethod
+    def _lookup(index, name):
+        """ Return the kind and lazy flag of a name found in the same way as
+        find_module_index() in pdytools_module.cpp or None if it wasn't found.
+        """
+
+        mask = len(index) - 1
+        i = Builder._fnv1a(name.encode('utf-8')) & mask
+
+        while index[i] is not None:
+            entry_name, kind, lazy = index[i]
+
+            if entry_name == name:
+                return kind, lazy
+
+            i = (i + 1) & mask
+
+        return None
+
+
+if __name__ == '__main__':
+    unittest.main()
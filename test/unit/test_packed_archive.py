@@ -0,0 +1,128 @@
+import os
+import struct
+import tempfile
+import unittest
+import zlib
+
+from pyqtdeploy import Builder, MessageHandler, Project
+
+
+class PackedArchiveTests(unittest.TestCase):
+    """ Test the writing of the packed archive of frozen modules. """
+
+    def setUp(self):
+        """ Create a builder and a resources directory. """
+
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._resources_dir = self._temp_dir.name
+
+        self._builder = Builder(Project(), None, MessageHandler(True, False))
+
+    def tearDown(self):
+        """ Remove the resources directory. """
+
+        self._temp_dir.cleanup()
+
+    def test_uncompressed(self):
+        """ Test an archive where no module is compressed. """
+
+        modules = self._create_modules()
+        entries = self._pack(modules, 0)
+
+        self.assertEqual(entries, {name: (data, 0)
+                for name, data in modules.items()})
+
+    def test_compressed(self):
+        """ Test an archive where only those modules that get smaller are
+        compressed.
+        """
+
+        modules = self._create_modules()
+        entries = self._pack(modules, 9)
+
+        self.assertEqual(set(entries.keys()), set(modules.keys()))
+
+        for name, (data, uncompressed_size) in entries.items():
+            original = modules[name]
+
+            if name in ('incompressible.pyo', 'package/__init__.pyo'):
+                self.assertEqual(uncompressed_size, 0)
+                self.assertEqual(data, original)
+            else:
+                # This is the format used by qCompress().
+                self.assertEqual(uncompressed_size, len(original))
+                self.assertEqual(struct.unpack('>I', data[:4])[0],
+                        len(original))
+                self.assertEqual(zlib.decompress(data[4:]), original)
+
+    def _create_modules(self):
+        """ Create some frozen modules in the resources directory and return a
+        dict of their contents keyed by their names.
+        """
+
+        modules = {
+            'compressible.pyo': b'compressible ' * 100,
+            'incompressible.pyo': os.urandom(200),
+            'Upper.pyo': b'upper ' * 50,
+            'package/__init__.pyo': b'',
+            'package/sub.pyo': b'sub ' * 50,
+            'café.pyo': b'cafe ' * 50,
+        }
+
+        for name, data in modules.items():
+            module_file = os.path.join(self._resources_dir, name)
+            os.makedirs(os.path.dirname(module_file), exist_ok=True)
+
+            with open(module_file, 'wb') as f:
+                f.write(data)
+
+        return modules
+
+    def _pack(self, modules, compress):
+        """ Write a packed archive of some modules and return a dict of the
+        data and uncompressed size of each entry keyed by its name.
+        """
+
+        self._builder._write_packed_archive(self._resources_dir,
+                list(modules.keys()), compress)
+
+        # The modules have been removed.
+        self.assertEqual(os.listdir(self._resources_dir),
+                ['pyqtdeploy.pdya'])
+
+        with open(os.path.join(self._resources_dir, 'pyqtdeploy.pdya'),
+                'rb') as f:
+            archive = f.read()
+
+        magic, version, nr_entries = struct.unpack('<4s2I', archive[:12])
+
+        self.assertEqual(magic, b'PDYA')
+        self.assertEqual(version, 2)
+        self.assertEqual(nr_entries, len(modules))
+
+        entries = {}
+        names = []
+
+        for i in range(nr_entries):
+            entry = archive[12 + i * 20:12 + (i + 1) * 20]
+            (name_offset, name_len, data_offset, data_len,
+                    uncompressed_size) = struct.unpack('<5I', entry)
+
+            self.assertLessEqual(name_offset + name_len, len(archive))
+            self.assertLessEqual(data_offset + data_len, len(archive))
+
+            name = archive[name_offset:name_offset + name_len]
+            names.append(name)
+
+            entries[name.decode('utf-8')] = (
+                    archive[data_offset:data_offset + data_len],
+                    uncompressed_size)
+
+        # The runtime does a binary search of the encoded names.
+        self.assertEqual(names, sorted(names))
+
+        return entries
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import sys
+import unittest
+from unittest import mock
+
+from pyqtdeploy import (Builder, BuildOptions, MessageHandler, Project,
+        UserException)
+
+
+class RunFreezeTests(unittest.TestCase):
+    """ Test the running of the freeze script. """
+
+    def setUp(self):
+        """ Create a builder. """
+
+        self._builder = Builder(Project(), None, MessageHandler(True, False))
+
+    def test_interpreter_hexversion(self):
+        """ Test that the version of the host interpreter is found. """
+
+        self.assertEqual(
+                Builder._get_interpreter_hexversion(sys.executable),
+                sys.hexversion)
+
+    def test_missing_interpreter(self):
+        """ Test that a missing host interpreter is reported. """
+
+        with self.assertRaises(UserException):
+            Builder._get_interpreter_hexversion('no-such-python')
+
+    def test_strip_lines(self):
+        """ Test that stripping line number tables is only allowed when the
+        host interpreter supports it.
+        """
+
+        options = BuildOptions()
+        options.strip = ['docstrings', 'lines']
+
+        if sys.hexversion >= 0x030a0000:
+            with self.assertRaises(UserException):
+                argv = self._run_freeze(options)
+        else:
+            argv = self._run_freeze(options)
+            self.assertIn('docstrings,lines', argv)
+
+    def test_strip_other(self):
+        """ Test that other information can always be stripped. """
+
+        options = BuildOptions()
+        options.strip = ['filenames', 'docstrings']
+
+        argv = self._run_freeze(options)
+
+        self.assertEqual(argv[-3:], ['--strip', 'docstrings,filenames',
+                'jobs.csv'])
+
+    def _run_freeze(self, options):
+        """ Run the freeze script and return the command line it would be run
+        with.
+        """
+
+        with mock.patch.object(self._builder, 'run') as run:
+            self._builder._run_freeze('freeze.py', sys.executable,
+                    'jobs.csv', 0, options)
+
+        return run.call_args[0][0]
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+import io
+import os
+import tarfile
+import tempfile
+import unittest
+import zipfile
+
+from pyqtdeploy.sysroot.source_cache import (copy_tree, SourceCache,
+        unpack_archive)
+
+
+class SourceCacheTests(unittest.TestCase):
+    """ Test the cache of unpacked source archives. """
+
+    # The contents of the test archives.
+    CONTENTS = {
+        'zlib-1.2.11/README':               b'readme',
+        'zlib-1.2.11/src/zlib.c':           b'int main() {}\n' * 100,
+        'zlib-1.2.11/src/empty.h':          b'',
+    }
+
+    def setUp(self):
+        """ Create a temporary directory. """
+
+        self._temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        """ Remove the temporary directory. """
+
+        self._temp_dir.cleanup()
+
+    def test_tar(self):
+        """ Test a tar archive is unpacked and cached. """
+
+        self._check_unpack(self._write_tar('zlib.tar.gz', self.CONTENTS))
+
+    def test_zip(self):
+        """ Test a zip archive is unpacked and cached. """
+
+        self._check_unpack(self._write_zip('zlib.zip', self.CONTENTS))
+
+    def test_shared_entry(self):
+        """ Test that archives with the same contents share an entry. """
+
+        cache = SourceCache(self._path('cache'))
+
+        first = self._write_tar('first.tar.gz', self.CONTENTS)
+        second = self._path('second.tar.gz')
+
+        with open(first, 'rb') as f_in, open(second, 'wb') as f_out:
+            f_out.write(f_in.read())
+
+        self.assertFalse(cache.unpack(first, 'zlib-1.2.11', self._path('a')))
+        self.assertTrue(cache.unpack(second, 'zlib-1.2.11', self._path('b')))
+
+    def test_missing_root(self):
+        """ Test an archive without the expected top level directory. """
+
+        cache = SourceCache(self._path('cache'))
+        archive = self._write_tar('zlib.tar.gz', self.CONTENTS)
+
+        with self.assertRaises(ValueError):
+            cache.unpack(archive, 'zlib-1.2.12', self._path('dst'))
+
+    def test_unsafe_tar_members(self):
+        """ Test that a tar archive with unsafe members is rejected. """
+
+        for name in ('../evil', 'zlib/../../evil', '/tmp/evil'):
+            archive = self._write_tar('unsafe.tar', {name: b'evil'})
+
+            with self.assertRaises(ValueError, msg=name):
+                unpack_archive(archive, self._path('dst'))
+
+            self.assertFalse(os.path.exists(self._path('evil')), name)
+
+    def test_unsafe_zip_members(self):
+        """ Test that a zip archive with unsafe members is rejected. """
+
+        for name in ('../evil', 'zlib/../../evil', '/tmp/evil', 'C:/evil',
+                '..\\evil'):
+            archive = self._write_zip('unsafe.zip', {name: b'evil'})
+
+            with self.assertRaises(ValueError, msg=name):
+                unpack_archive(archive, self._path('dst'))
+
+            self.assertFalse(os.path.exists(self._path('evil')), name)
+
+    def test_copy_tree(self):
+        """ Test a directory tree is copied with its symbolic links. """
+
+        src_dir = self._path('src')
+        os.makedirs(os.path.join(src_dir, 'lib', 'sub'))
+
+        with open(os.path.join(src_dir, 'lib', 'libz.so.1'), 'wb') as f:
+            f.write(b'so')
+
+        os.symlink('libz.so.1', os.path.join(src_dir, 'lib', 'libz.so'))
+        os.symlink('lib', os.path.join(src_dir, 'lib64'))
+
+        dst_dir = self._path('dst')
+        copy_tree(src_dir, dst_dir, workers=2)
+
+        self.assertEqual(os.readlink(os.path.join(dst_dir, 'lib', 'libz.so')),
+                'libz.so.1')
+        self.assertEqual(os.readlink(os.path.join(dst_dir, 'lib64')), 'lib')
+        self.assertTrue(os.path.isdir(os.path.join(dst_dir, 'lib', 'sub')))
+
+        with open(os.path.join(dst_dir, 'lib', 'libz.so.1'), 'rb') as f:
+            self.assertEqual(f.read(), b'so')
+
+    def _check_unpack(self, archive):
+        """ Check an archive is unpacked correctly. """
+
+        cache = SourceCache(self._path('cache'), workers=2)
+
+        first = self._path('first')
+        self.assertFalse(cache.unpack(archive, 'zlib-1.2.11', first))
+        self._check_contents(first)
+
+        # Modify the copy to make sure the cached entry isn't affected.
+        with open(os.path.join(first, 'zlib-1.2.11', 'README'), 'wb') as f:
+            f.write(b'patched')
+
+        second = self._path('second')
+        self.assertTrue(cache.unpack(archive, 'zlib-1.2.11', second))
+        self._check_contents(second)
+
+        # Nothing is left behind in the cache other than the entry.
+        self.assertEqual(len(os.listdir(cache.cache_dir)), 1)
+
+    def _check_contents(self, dst_dir):
+        """ Check the contents of an unpacked archive. """
+
+        for name, data in self.CONTENTS.items():
+            with open(os.path.join(dst_dir, name), 'rb') as f:
+                self.assertEqual(f.read(), data, name)
+
+    def _path(self, name):
+        """ Return the name of a file in the temporary directory. """
+
+        return os.path.join(self._temp_dir.name, name)
+
+    def _write_tar(self, name, contents):
+        """ Write a tar archive and return its name. """
+
+        archive = self._path(name)
+
+        mode = 'w:gz' if name.endswith('.gz') else 'w'
+
+        with tarfile.open(archive, mode) as tf:
+            for member_name, data in contents.items():
+                info = tarfile.TarInfo(member_name)
+                info.size = len(data)
+                tf.addfile(info, io.BytesIO(data))
+
+        return archive
+
+    def _write_zip(self, name, contents):
+        """ Write a zip archive and return its name. """
+
+        archive = self._path(name)
+
+        with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for member_name, data in contents.items():
+                zf.writestr(zipfile.ZipInfo(member_name), data)
+
+        return archive
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import random
+import unittest
+
+from pyqtdeploy.metadata import get_python_metadata, supported_python_versions
+from pyqtdeploy.project.stdlib_resolver import StdlibResolver
+
+
+def reference_resolve(metadata, selection, implicit=()):
+    """ Return the modules required by a selection by walking the dependencies
+    of every module from scratch in the way pyqtdeploy used to.
+    """
+
+    ssl = ('ssl' in selection)
+    required = set()
+
+    def visit(name):
+        module = metadata.get(name)
+
+        if module is None or module.builtin or name in required:
+            return
+
+        required.add(name)
+
+        for dep in module.deps:
+            if dep[0] == '?':
+                if not ssl:
+                    continue
+
+                dep = dep[1:]
+            elif dep[0] == '!':
+                if ssl:
+                    continue
+
+                dep = dep[1:]
+
+            visit(dep)
+
+    for name, module in metadata.items():
+        if name in selection or name in implicit or module.core:
+            visit(name)
+
+    explicit = set([name for name in selection if name in required])
+
+    return required, explicit
+
+
+class StdlibResolverTests(unittest.TestCase):
+    """ Test the resolution of standard library dependencies. """
+
+    def test_equivalence(self):
+        """ Test the resolver gives the same results as the reference for a
+        random walk of selections that exercises the incremental updates.
+        """
+
+        rand = random.Random(42)
+
+        for version in (supported_python_versions[0], (3, 5, 0), (2, 7, 0)):
+            metadata = get_python_metadata(version)
+            resolver = StdlibResolver(metadata)
+            names = sorted(metadata.keys())
+
+            selection = set()
+
+            for _ in range(300):
+                action = rand.random()
+
+                if action < 0.45 or not selection:
+                    selection.add(rand.choice(names))
+                elif action < 0.9:
+                    selection.remove(rand.choice(sorted(selection)))
+                elif action < 0.95:
+                    selection ^= {'ssl'}
+                else:
+                    selection = set(rand.sample(names, 5))
+
+                implicit = ['importlib.util'] if action < 0.1 else []
+
+                self._check(resolver, metadata, selection, implicit)
+
+    def test_memoised(self):
+        """ Test that repeating a selection gives the same results. """
+
+        metadata = get_python_metadata(supported_python_versions[0])
+        resolver = StdlibResolver(metadata)
+
+        for selection in (['ssl', 'json'], ['json'], ['ssl', 'json']):
+            self._check(resolver, metadata, selection)
+
+    def test_ssl(self):
+        """ Test that SSL specific dependencies are honoured. """
+
+        metadata = get_python_metadata(supported_python_versions[0])
+        resolver = StdlibResolver(metadata)
+
+        without_ssl, _ = resolver.resolve(['socket'])
+        with_ssl, _ = resolver.resolve(['socket', 'ssl'])
+
+        self.assertNotIn('_ssl', without_ssl)
+        self.assertIn('_ssl', with_ssl)
+
+    def test_builtins_omitted(self):
+        """ Test that builtin modules are never required. """
+
+        metadata = get_python_metadata(supported_python_versions[0])
+        resolver = StdlibResolver(metadata)
+
+        builtins = [name for name, module in metadata.items()
+                if module.builtin]
+
+        required, explicit = resolver.resolve(builtins)
+
+        self.assertFalse(required & set(builtins))
+        self.assertFalse(explicit)
+
+    def _check(self, resolver, metadata, selection, implicit=()):
+        """ Check the resolver against the reference for a selection. """
+
+        required, explicit = resolver.resolve(selection, implicit)
+        ref_required, ref_explicit = reference_resolve(metadata, selection,
+                implicit)
+
+        self.assertEqual(set(required), ref_required, sorted(selection))
+        self.assertEqual(set(explicit), ref_explicit, sorted(selection))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from pyqtdeploy import MessageHandler
+
+
+class TraceTests(unittest.TestCase):
+    """ Test the tracing of the phases of a build. """
+
+    def setUp(self):
+        """ Create a message handler and a directory for the trace. """
+
+        self._temp_dir = tempfile.TemporaryDirectory()
+
+        self._message_handler = MessageHandler(True, False)
+        self._message_handler.enable_tracing()
+
+    def tearDown(self):
+        """ Remove the directory for the trace. """
+
+        self._temp_dir.cleanup()
+
+    def test_disabled(self):
+        """ Test that no spans are recorded if tracing is disabled. """
+
+        message_handler = MessageHandler(True, False)
+
+        with message_handler.phase("phase"):
+            pass
+
+        self.assertIsNone(message_handler.spans)
+
+    def test_nested(self):
+        """ Test the events of nested phases. """
+
+        with self._message_handler.phase("outer"):
+            time.sleep(0.01)
+
+            with self._message_handler.phase("inner"):
+                time.sleep(0.02)
+
+            time.sleep(0.01)
+
+        outer, inner = self._write_trace()
+
+        self.assertEqual(outer['name'], "outer")
+        self.assertEqual(inner['name'], "inner")
+
+        for event in (outer, inner):
+            self.assertEqual(event['ph'], 'X')
+            self.assertEqual(event['pid'], os.getpid())
+            self.assertEqual(event['tid'], os.getpid())
+            self.assertIsInstance(event['ts'], int)
+            self.assertIsInstance(event['dur'], int)
+            self.assertEqual(set(event['args'].keys()),
+                    {'cpu', 'children_cpu', 'peak_rss'})
+
+        # The times are in microseconds.
+        self.assertGreaterEqual(inner['dur'], 20000)
+        self.assertGreaterEqual(outer['dur'], inner['dur'] + 20000)
+        self.assertLess(outer['dur'], 10000000)
+
+        # The inner phase is within the outer one allowing for the rounding
+        # and the different clocks used for the start and the duration.
+        slop = 5000
+        self.assertGreaterEqual(inner['ts'], outer['ts'])
+        self.assertLessEqual(inner['ts'] + inner['dur'],
+                outer['ts'] + outer['dur'] + slop)
+
+    def test_added_spans(self):
+        """ Test that the spans of other processes are ordered by their start
+        time and keep their process.
+        """
+
+        with self._message_handler.phase("build"):
+            pass
+
+        start = self._message_handler.spans[0]['start']
+
+        self._message_handler.add_spans([
+                self._span("build zlib", 1, start + 1.0),
+                self._span("build openssl", 2, start - 1.0)])
+
+        events = self._write_trace()
+
+        self.assertEqual([e['name'] for e in events],
+                ["build openssl", "build", "build zlib"])
+        self.assertEqual([(e['pid'], e['tid']) for e in events],
+                [(2, 2), (os.getpid(), os.getpid()), (1, 1)])
+        self.assertEqual(events[0]['ts'], int((start - 1.0) * 1000000))
+        self.assertEqual(events[0]['dur'], 500000)
+
+    def test_count_files(self):
+        """ Test that the files written by a phase are counted if requested.
+        """
+
+        self._message_handler.enable_tracing(count_files=True)
+
+        output_dir = os.path.join(self._temp_dir.name, 'output')
+        os.mkdir(output_dir)
+
+        with open(os.path.join(output_dir, 'unchanged'), 'wb') as f:
+            f.write(b'unchanged')
+
+        with self._message_handler.phase("write", output_dir):
+            os.mkdir(os.path.join(output_dir, 'sub'))
+
+            with open(os.path.join(output_dir, 'sub', 'new'), 'wb') as f:
+                f.write(b'12345')
+
+        event, = self._write_trace()
+
+        self.assertEqual(event['args']['files'], 1)
+        self.assertEqual(event['args']['bytes'], 5)
+
+    @staticmethod
+    def _span(name, pid, start):
+        """ Return a span as created by another process. """
+
+        return {'name': name, 'pid': pid, 'start': start, 'wall': 0.5,
+                'cpu': 0.25, 'children_cpu': 0.0, 'peak_rss': None}
+
+    def _write_trace(self):
+        """ Write the trace and return its events. """
+
+        trace_file = os.path.join(self._temp_dir.name, 'trace.json')
+        self._message_handler.write_trace(trace_file)
+
+        with open(trace_file) as f:
+            trace = json.load(f)
+
+        self.assertEqual(set(trace.keys()), {'traceEvents', 'displayTimeUnit'})
+
+        return trace['traceEvents']
+
+
+if __name__ == '__main__':
+    unittest.main()
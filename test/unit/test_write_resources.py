@@ -0,0 +1,159 @@
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+from xml.etree import ElementTree
+
+from pyqtdeploy import Builder, MessageHandler, Project
+
+
+class WriteResourcesTests(unittest.TestCase):
+    """ Test the splitting of the resource contents between .qrc files. """
+
+    def setUp(self):
+        """ Create a builder and a resources directory. """
+
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._resources_dir = self._temp_dir.name
+
+        self._builder = Builder(Project(), None, MessageHandler(True, False))
+
+    def tearDown(self):
+        """ Remove the resources directory. """
+
+        self._temp_dir.cleanup()
+
+    def test_single(self):
+        """ Test that a single resource has the original name. """
+
+        contents = self._create_contents([10, 20, 30])
+
+        names = self._write(contents, 1)
+
+        self.assertEqual(names, ['pyqtdeploy.qrc'])
+        self.assertEqual(self._read(names[0]), contents)
+
+    def test_balanced(self):
+        """ Test that each resource has roughly the same total size and the
+        contents remain contiguous.
+        """
+
+        rand = random.Random(42)
+
+        for nr_resources in (2, 3, 7, 16):
+            sizes = [rand.randint(0, 10000) for _ in range(200)]
+            sizes[rand.randrange(len(sizes))] = 50000
+
+            # Make the sizes increase so that splitting by number would be
+            # unbalanced.
+            sizes = [size * nr // 10 for nr, size in enumerate(sizes)]
+
+            contents = self._create_contents(sizes)
+            names = self._write(contents, nr_resources)
+
+            self.assertEqual(names,
+                    ['pyqtdeploy{0}.qrc'.format(nr)
+                            for nr in range(nr_resources)])
+
+            shards = [self._read(name) for name in names]
+
+            # The concatenated shards are the original contents in order.
+            self.assertEqual(sum(shards, []), contents)
+
+            # A resource can only be larger than its share by half of each of
+            # the contents at its ends.
+            share = sum(sizes) / nr_resources
+
+            for shard in shards:
+                ends = self._size(shard[:1]) + self._size(shard[-1:])
+                self.assertLessEqual(self._size(shard), share + ends / 2)
+
+    def test_more_resources_than_contents(self):
+        """ Test that the number of resources is limited by the number of
+        contents.
+        """
+
+        contents = self._create_contents([10, 20, 30])
+
+        names = self._write(contents, 10)
+
+        self.assertEqual(len(names), 3)
+        self.assertEqual([self._read(name) for name in names],
+                [[c] for c in contents])
+
+    def test_empty_contents(self):
+        """ Test that contents with no size are still written. """
+
+        contents = self._create_contents([0] * 4)
+
+        names = self._write(contents, 2)
+
+        self.assertEqual(sum([self._read(name) for name in names], []),
+                contents)
+
+    def test_automatic(self):
+        """ Test the number of resources chosen automatically. """
+
+        contents = self._create_contents([1000] * 20)
+
+        # The contents are too small to be worth splitting.
+        self.assertEqual(len(self._write(contents, 0)), 1)
+
+        with mock.patch.object(Builder, '_min_resource_size', 3000):
+            with mock.patch('os.cpu_count', lambda: 4):
+                self.assertEqual(len(self._write(contents, 0)), 4)
+
+            with mock.patch('os.cpu_count', lambda: 64):
+                self.assertEqual(len(self._write(contents, 0)), 7)
+
+    def test_compression(self):
+        """ Test that the compression of frozen modules is specified. """
+
+        contents = self._create_contents([10, 20], suffix='.pyo')
+
+        name = self._write(contents, 1, compress=9)[0]
+
+        tree = ElementTree.parse(os.path.join(self._resources_dir, name))
+
+        for element in tree.iter('file'):
+            self.assertEqual(element.get('compress'), '9')
+            self.assertEqual(element.get('threshold'), '1')
+
+    def _create_contents(self, sizes, suffix='.py'):
+        """ Create files of the given sizes and return their names. """
+
+        contents = []
+
+        for nr, size in enumerate(sizes):
+            name = 'module{0:03}{1}'.format(nr, suffix)
+
+            with open(os.path.join(self._resources_dir, name), 'wb') as f:
+                f.write(b'x' * size)
+
+            contents.append(name)
+
+        return contents
+
+    def _read(self, name):
+        """ Return the contents of a .qrc file. """
+
+        tree = ElementTree.parse(os.path.join(self._resources_dir, name))
+
+        return [element.text for element in tree.iter('file')]
+
+    def _size(self, contents):
+        """ Return the total size of some contents. """
+
+        return sum([os.path.getsize(os.path.join(self._resources_dir, c))
+                for c in contents])
+
+    def _write(self, contents, nr_resources, compress=None):
+        """ Write the .qrc files and return their names. """
+
+        return self._builder._write_resources(self._resources_dir, contents,
+                nr_resources, compress)
+
+
+if __name__ == '__main__':
+    unittest.main()